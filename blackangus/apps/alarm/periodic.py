@@ -20,23 +20,15 @@ class AlarmPeriodicApp(BasePeriodicApp):
         self.client = client
 
     async def action(self):
-        # 기준 시간과 알람 목록을 가져오고
+        # 기준 시간이 지난 알람만 가져온다. (enabled_time 인덱스를 탄다.)
         current_time = pendulum.now(tz='Asia/Seoul')
-        alarms = await AlarmModel.find(
+        targets = await AlarmModel.find(
             {
                 'enabled': True,
+                'time': {'$lte': current_time},
             }
         ).to_list()
 
-        logging.info(f'총 알람 {len(alarms)}개 체크')
-
-        # 울려야할 알람 목록을 가져온 뒤,
-        targets = []
-        for alarm in alarms:
-            alarm_time = pendulum.instance(alarm.time, tz='Asia/Seoul')
-            if alarm_time.timestamp() <= current_time.timestamp():
-                targets.append(alarm)
-
         logging.info(f'알람 실행 {len(targets)}개')
 
         # 하나씩 알람을 실행한다.
@@ -6,7 +6,7 @@ import pendulum
 from discord import Client, Embed, Message, Color
 from blackangus.apps.base import PresentedResponseApp
 from blackangus.config import Config
-from blackangus.models.alarm import AlarmModel
+from blackangus.models.alarm import AlarmModel, AlarmListView
 from blackangus.utils.crontab import get_next_crontab_time
 
 
@@ -121,16 +121,16 @@ class AlarmCommandApp(PresentedResponseApp):
 
     @staticmethod
     async def register(command: Dict[str, Any]) -> Embed:
-        prev_alarms = await AlarmModel.find(
+        # 문서를 읽지 않고 개수만 센다.
+        prev_count = await AlarmModel.find(
             {
-                'user_id': command['user_id'],
+                'created_by': command['user_id'],
                 'name': command['name'],
                 'enabled': True,
-            },
-            limit=1,
-        ).to_list()
+            }
+        ).count()
 
-        if len(prev_alarms) != 0:
+        if prev_count != 0:
             return Embed(
                 color=Color.red(),
                 title='알람 등록 실패',
@@ -171,23 +171,22 @@ class AlarmCommandApp(PresentedResponseApp):
 
     @staticmethod
     async def unregister(command: Dict[str, Any]) -> Embed:
-        alarm = await AlarmModel.find(
+        # 찾아서 지우는 것을 서버에서 한 번에 한다.
+        result = await AlarmModel.find_one(
             {
-                'user_id': command['user_id'],
+                'created_by': command['user_id'],
                 'name': command['name'],
                 'enabled': True,
-            },
-            limit=1,
-        ).to_list()
+            }
+        ).delete()
 
-        if len(alarm) == 0:
+        if result is None or result.deleted_count == 0:
             return Embed(
                 color=Color.red(),
                 title='알람 삭제 실패',
                 description='해당 사용자가 해당 이름으로 등록한 알람이 없습니다.',
             )
 
-        await alarm[0].delete()
         return Embed(
             color=Color.green(),
             title='알람 삭제 완료',
@@ -198,9 +197,11 @@ class AlarmCommandApp(PresentedResponseApp):
     async def list(command: Dict[str, Any]) -> Embed:
         alarms = await AlarmModel.find(
             {
-                'user_id': command['user_id'],
+                'created_by': command['user_id'],
                 'enabled': True,
-            }
+            },
+            projection_model=AlarmListView,
+            sort='name',
         ).to_list()
 
         if len(alarms) == 0:
@@ -219,7 +220,7 @@ class AlarmCommandApp(PresentedResponseApp):
         for alarm in alarms:
             text = (
                 f'반복 알람: {alarm.crontab}'
-                if not alarm.is_repeat
+                if alarm.is_repeat
                 else f'일회성 알람: {pendulum.instance(alarm.time, tz="Asia/Seoul").to_datetime_string()}'  # type: ignore
             )
             embed = embed.add_field(name=alarm.name, value=text, inline=False)
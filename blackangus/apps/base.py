@@ -5,6 +5,7 @@ import discord
 from discord import Client, Embed
 
 from blackangus.config import Config
+from blackangus.utils.metrics import measure_stage
 
 
 class AppException(Exception):
@@ -14,9 +15,22 @@ class AppException(Exception):
 class BaseResponseApp(metaclass=ABCMeta):
     disabled = False
 
+    # 디스패처가 앱마다 따로 두는 작업 큐의 기본값입니다.
+    # 설정 파일의 bot.app_limits에서 앱 클래스 이름으로 덮어쓸 수 있습니다.
+    concurrency: int = 4
+    queue_size: int = 32
+    timeout: float = 30.0
+
     config: Config
     client: Client
 
+    def is_target(self, context: discord.Message) -> bool:
+        """
+        이 앱이 처리할 메세지인지 가볍게 확인합니다.
+        디스패처는 여기서 True인 메세지만 앱의 작업 큐에 넣습니다.
+        """
+        return not self.disabled
+
     @abstractmethod
     async def action(self, context: discord.Message):
         pass
@@ -49,26 +63,30 @@ class PresentedResponseApp(BaseResponseApp, metaclass=ABCMeta):
     ) -> Tuple[Optional[str], Optional[Embed]]:
         pass
 
-    async def action(self, context: discord.Message):
+    def is_target(self, context: discord.Message) -> bool:
         # 플래그로 비활성화
         if self.disabled:
-            return
+            return False
 
         # 키워드랑 prefix로 조합하기
         prefix: str = self.prefix or self.config.bot.prefix
-        if not any(
-            map(
-                lambda x: context.clean_content.startswith(f'{prefix}{x}'),
-                self.commands,
-            )
-        ):
+        return context.clean_content.startswith(
+            tuple(f'{prefix}{x}' for x in self.commands)
+        )
+
+    async def action(self, context: discord.Message):
+        if not self.is_target(context):
             return
 
         # parse, presenter, send
-        command = await self.parse_command(context)
+        name = type(self).__name__
+        with measure_stage(name, 'parse_command'):
+            command = await self.parse_command(context)
         if not command:
             return
 
-        (content, embed) = await self.present(command)
+        with measure_stage(name, 'present'):
+            (content, embed) = await self.present(command)
         if content is not None or embed is not None:
-            await context.channel.send(content=content, embed=embed)
+            with measure_stage(name, 'send'):
+                await context.channel.send(content=content, embed=embed)
@@ -2,14 +2,28 @@ import logging
 from io import BytesIO
 import shlex
 import traceback
-from typing import Optional, Dict, Any, Tuple
+import math
+from typing import Optional, Dict, Any, List, Tuple
 
 import discord
 from discord import Embed, Client, Color, File
 
 from blackangus.apps.base import PresentedResponseApp
 from blackangus.config import Config
-from blackangus.services.emoticon.main import EmoticonService
+from blackangus.services.emoticon import EmoticonException
+from blackangus.services.emoticon.main import (
+    EmoticonMutation,
+    EmoticonMutationType,
+    EmoticonService,
+)
+from blackangus.services.registry import get_service
+
+
+# 임베드 설명은 4096자까지라서 이름(최대 10자)을 넉넉하게 200개씩 보여줍니다.
+LIST_PAGE_SIZE = 200
+
+# 임베드 필드 값은 1024자까지 들어갑니다.
+MAX_FIELD_LENGTH = 1024
 
 
 class EmoticonCommandApp(PresentedResponseApp):
@@ -20,7 +34,7 @@ class EmoticonCommandApp(PresentedResponseApp):
     def __init__(self, config: Config, client: Client):
         self.config = config
         self.client = client
-        self.emoticon_service = EmoticonService(config.emoticon)
+        self.emoticon_service = get_service(EmoticonService, config.emoticon)
 
     async def parse_command(self, context: discord.Message) -> Optional[Dict[str, Any]]:
         def is_equivalents_option(x: str):
@@ -38,10 +52,14 @@ class EmoticonCommandApp(PresentedResponseApp):
             return {'help': True}
 
         if parsed[0] in ['목록', 'list']:
+            if len(parsed) >= 2 and not parsed[1].isdigit():
+                return {'error': True}
+
             return {
                 'help': False,
                 'action': 'list',
                 'channel_id': context.channel.id,
+                'page': int(parsed[1]) if len(parsed) >= 2 else None,
             }
 
         if parsed[0] in ['추가', 'add', 'create']:
@@ -103,6 +121,45 @@ class EmoticonCommandApp(PresentedResponseApp):
                 'equivalents': first_equivalents or last_equivalents,
             }
 
+        if parsed[0] in ['일괄', 'bulk']:
+            if len(parsed) < 3:
+                return {'error': True}
+
+            arguments = parsed[2:]
+            if parsed[1] in ['추가', 'add', 'create']:
+                mutation_type = EmoticonMutationType.CREATE
+            elif parsed[1] in ['이름', 'rename']:
+                mutation_type = EmoticonMutationType.RENAME
+            elif parsed[1] in ['삭제', 'delete', 'remove']:
+                mutation_type = EmoticonMutationType.REMOVE
+            else:
+                return {'error': True}
+
+            if mutation_type == EmoticonMutationType.REMOVE:
+                mutations = [
+                    EmoticonMutation(mutation_type, x.upper()) for x in arguments
+                ]
+            elif len(arguments) % 2 == 0:
+                # 추가는 이름과 URL, 이름 변경은 원래 이름과 새 이름을 번갈아 적는다.
+                mutations = [
+                    EmoticonMutation(
+                        mutation_type,
+                        arguments[i].upper(),
+                        arguments[i + 1]
+                        if mutation_type == EmoticonMutationType.CREATE
+                        else arguments[i + 1].upper(),
+                    )
+                    for i in range(0, len(arguments), 2)
+                ]
+            else:
+                return {'error': True}
+
+            return {
+                'help': False,
+                'action': 'bulk',
+                'mutations': mutations,
+            }
+
         if parsed[0] in ['삭제', 'delete', 'remove']:
             if len(parsed) < 2:
                 return {'error': True}
@@ -139,7 +196,8 @@ class EmoticonCommandApp(PresentedResponseApp):
             )
             .add_field(
                 name='이모티콘 전체 목록 보기(목록, list)',
-                value='전체 이모티콘 목록(이름)을 가져옵니다.\n' '`!이모티콘 목록`으로 사용할 수 있습니다.',
+                value='전체 이모티콘 목록(이름)을 가져옵니다.\n'
+                '`!이모티콘 목록`으로 파일을 받거나, `!이모티콘 목록 페이지`로 나눠서 볼 수 있습니다.',
                 inline=False,
             )
             .add_field(
@@ -171,7 +229,64 @@ class EmoticonCommandApp(PresentedResponseApp):
                 '`!이모티콘 삭제 [-e] 이름`으로 사용할 수 있습니다.',
                 inline=False,
             )
+            .add_field(
+                name='여러 이모티콘 한꺼번에 바꾸기(일괄, bulk)',
+                value='여러 이모티콘을 한 번에 추가하거나, 이름을 바꾸거나, 삭제할 수 있습니다.\n'
+                '바꾸기 전에 이름이 겹치거나 없는 이모티콘이 있는지 먼저 확인하고, 있으면 아무것도 바꾸지 않습니다.\n'
+                '저장하는 도중에 실패하면 그 앞의 작업까지만 반영됩니다.\n'
+                '`!이모티콘 일괄 추가 이름 URL 이름 URL ...`\n'
+                '`!이모티콘 일괄 이름 이름 새_이름 이름 새_이름 ...`\n'
+                '`!이모티콘 일괄 삭제 이름 이름 ...`',
+                inline=False,
+            )
+        )
+
+    @staticmethod
+    def list_page_embed(names: List[str], page: int) -> Embed:
+        pages = max(1, math.ceil(len(names) / LIST_PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * LIST_PAGE_SIZE
+
+        embed = Embed(
+            title=f'흑우봇 이모티콘 목록 ({page}/{pages})',
+            description=', '.join(
+                map(lambda x: f'`{x}`', names[start : start + LIST_PAGE_SIZE])
+            )
+            or '등록된 이모티콘이 없습니다.',
+            color=Color.green(),
         )
+        if page < pages:
+            embed.set_footer(text=f'!이모티콘 목록 {page + 1}으로 다음 페이지를 볼 수 있습니다.')
+        return embed
+
+    @staticmethod
+    def search_embed(keyword: str, names: List[str]) -> Embed:
+        if len(names) == 0:
+            return Embed(
+                title='흑우봇 이모티콘',
+                description=f'{keyword} 키워드로 검색한 결과가 없습니다.',
+                color=Color.red(),
+            )
+
+        # 필드 길이를 넘지 않는 만큼만 보여주고 나머지는 개수만 알려준다.
+        shown: List[str] = []
+        length = 0
+        for name in names:
+            # 뒤에 붙을 ', 외 N개' 자리를 남겨둔다.
+            if length + len(name) + 4 > MAX_FIELD_LENGTH - 16:
+                break
+            shown.append(f'`{name}`')
+            length += len(name) + 4
+
+        value = ', '.join(shown)
+        if len(shown) < len(names):
+            value += f', 외 {len(names) - len(shown)}개'
+
+        return Embed(
+            title='흑우봇 이모티콘',
+            description=f'{keyword} 키워드로 검색한 결과는 {len(names)}건입니다.',
+            color=Color.green(),
+        ).add_field(name='목록', value=value, inline=False)
 
     async def present(
         self, command: Dict[str, Any]
@@ -192,21 +307,30 @@ class EmoticonCommandApp(PresentedResponseApp):
             action = command['action']
 
             if action == 'list':
-                emoticons_string = await self.emoticon_service.list_emoticons()
-                emoticon_bytes = BytesIO('\n'.join(emoticons_string).encode('utf-8'))
+                export = await self.emoticon_service.export_list()
 
-                temp_file = File(emoticon_bytes, filename='emoticons.txt')
+                if command['page'] is not None:
+                    return None, self.list_page_embed(export.names, command['page'])
 
-                channel = self.client.get_channel(command['channel_id'])
-                await channel.send(
-                    content=f'현재 등록된 이모티콘은 {len(emoticons_string)}개이며, 목록은 다음과 같습니다.',
-                    file=temp_file,
+                channel_id = command['channel_id']
+                description = f'현재 등록된 이모티콘은 {len(export.names)}개이며, 목록은 다음과 같습니다.'
+
+                # 목록이 바뀌지 않았으면 같은 채널에 파일을 다시 올리지 않고 링크만 보낸다.
+                if channel_id in export.messages:
+                    return f'{description}\n{export.messages[channel_id]}', None
+
+                channel = self.client.get_channel(channel_id)
+                message = await channel.send(
+                    content=description,
+                    file=File(BytesIO(export.content), filename='emoticons.txt'),
                 )
+                if message is not None:
+                    export.messages[channel_id] = message.jump_url
 
                 return None, None
 
             if action == 'create':
-                name = command['name']
+                name = command['keyword']
                 url = command['url']
 
                 result = await self.emoticon_service.create(name, url)
@@ -221,18 +345,10 @@ class EmoticonCommandApp(PresentedResponseApp):
                 name = command['keyword']
 
                 emoticons = await self.emoticon_service.search(name)
-                return None, Embed(
-                    title='흑우봇 이모티콘',
-                    description=f'{name} 키워드로 검색한 결과는 {len(emoticons)}건입니다.',
-                    color=Color.green(),
-                ).add_field(
-                    name='목록',
-                    value=', '.join(map(lambda x: f'`{x.name}`', emoticons)),
-                    inline=False,
-                )
+                return None, self.search_embed(name, emoticons)
 
             if action == 'duplicate':
-                name = command['name']
+                name = command['keyword']
                 target = command['target']
 
                 result = await self.emoticon_service.duplicate(name, target)
@@ -244,7 +360,7 @@ class EmoticonCommandApp(PresentedResponseApp):
                 )
 
             if action == 'update':
-                name = command['name']
+                name = command['keyword']
                 target = command['target']
                 change = command['change']
                 equivalents = command['equivalents']
@@ -258,8 +374,8 @@ class EmoticonCommandApp(PresentedResponseApp):
 
                 logging.info(f'Updated: {updated_value}')
 
-                if type(updated_value) == list:
-                    description = f'복제된 이모티콘을 포함해 총 {len(updated_value)}건이 업데이트되었습니다.'
+                if change == 'link' and equivalents:
+                    description = f'복제된 이모티콘을 포함해 총 {updated_value}건이 업데이트되었습니다.'
                 else:
                     description = '이모티콘이 성공적으로 업데이트되었습니다.'
 
@@ -269,14 +385,26 @@ class EmoticonCommandApp(PresentedResponseApp):
                     color=Color.green(),
                 )
 
+            if action == 'bulk':
+                mutation_result = await self.emoticon_service.apply_mutations(
+                    command['mutations']
+                )
+                return None, Embed(
+                    title='흑우봇 이모티콘',
+                    description=f'{mutation_result.created}건을 추가하고 {mutation_result.modified}건을 바꿨습니다.',
+                    color=Color.green(),
+                )
+
             if action == 'delete':
-                name = command['name']
+                name = command['keyword']
                 equivalents = command['equivalents']
 
-                await self.emoticon_service.remove(name, remove_equivalents=equivalents)
+                removed = await self.emoticon_service.remove(
+                    name, remove_equivalents=equivalents
+                )
 
                 if equivalents:
-                    description = '복제된 이모티콘을 포함해 이모티콘이 성공적으로 삭제되었습니다.'
+                    description = f'복제된 이모티콘을 포함해 총 {removed}건이 삭제되었습니다.'
                 else:
                     description = '이모티콘이 성공적으로 삭제되었습니다.'
 
@@ -287,7 +415,7 @@ class EmoticonCommandApp(PresentedResponseApp):
                 )
 
             return None, self.help_embed()
-        except Exception as e:
+        except (Exception, EmoticonException) as e:
             traceback.print_exc()
             return None, Embed(
                 title=f'흑우봇 이모티콘 오류: [{type(e)}]',
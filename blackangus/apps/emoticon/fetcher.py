@@ -7,33 +7,54 @@ from blackangus.apps.base import BaseResponseApp
 from blackangus.config import Config
 from blackangus.services.emoticon import download_emoticon
 from blackangus.services.emoticon.main import EmoticonService
+from blackangus.services.registry import get_service
+from blackangus.utils.metrics import measure_stage
 
 
 class EmoticonFetcherApp(BaseResponseApp):
     prefix: Optional[str] = None
     emoticon_service: EmoticonService
 
+    # 가장 많이 불리는 앱이라 넉넉하게 받되, 오래 붙잡지는 않습니다.
+    concurrency = 8
+    queue_size = 64
+    timeout = 15.0
+
     def __init__(self, config: Config, client: Client):
         self.config = config
         self.client = client
-        self.emoticon_service = EmoticonService(config.emoticon)
+        self.emoticon_service = get_service(EmoticonService, config.emoticon)
+
+    def is_target(self, context: discord.Message) -> bool:
+        if self.disabled:
+            return False
 
-    async def action(self, context: discord.Message):
         prefix: str = self.prefix or self.config.bot.emoticon_prefix
-        if not context.clean_content.startswith(prefix):
+        return context.clean_content.startswith(prefix)
+
+    async def action(self, context: discord.Message):
+        if not self.is_target(context):
             return
 
+        prefix: str = self.prefix or self.config.bot.emoticon_prefix
+
         # 이모티콘 이름을 추출한다.
         emoticon_name = context.clean_content.split(' ')[0].replace(prefix, '')
 
         # 이모티콘을 찾는다.
-        emoticon = await self.emoticon_service.find_by_name(emoticon_name)
+        emoticon = await self.emoticon_service.find_image(emoticon_name)
 
         if emoticon is None:
+            description = f'이모티콘 "{emoticon_name}"을 찾을 수 없습니다.'
+            suggestions = await self.emoticon_service.suggest(emoticon_name)
+            if len(suggestions) != 0:
+                names = ', '.join(map(lambda x: f'`{x}`', suggestions))
+                description += f'\n혹시 {names} 중 하나를 찾으셨나요?'
+
             return await context.channel.send(
                 embed=Embed(
                     title='흑우봇 이모티콘 찾기',
-                    description=f'이모티콘 "{emoticon_name}"을 찾을 수 없습니다.',
+                    description=description,
                     color=Color.red(),
                 )
             )
@@ -45,9 +66,10 @@ class EmoticonFetcherApp(BaseResponseApp):
             model=emoticon,
         )
 
-        await context.channel.send(
-            file=File(
-                file,
-                filename=file_name,
+        with measure_stage(type(self).__name__, 'send'):
+            await context.channel.send(
+                file=File(
+                    file,
+                    filename=file_name,
+                )
             )
-        )
@@ -2,23 +2,63 @@ import logging
 import shlex
 import traceback
 from typing import Dict, Any, Tuple, Optional
+from uuid import UUID
 
 from discord import Client, Embed, Message, Color
 from blackangus.apps.base import PresentedResponseApp
 from blackangus.config import Config
-from blackangus.services.emoticon import RegionEnum
+from blackangus.models.emoticon.linecon import (
+    LineconImportJobModel,
+    LineconImportStatus,
+)
+from blackangus.services.emoticon import EmoticonException, RegionEnum
 from blackangus.services.emoticon.linecon import LineconService
+from blackangus.services.registry import get_service
+
+
+def import_job_embed(job: LineconImportJobModel) -> Embed:
+    done = len(list(filter(lambda x: x.done, job.items)))
+
+    if job.status == LineconImportStatus.DONE:
+        description = f'라인에서 이모티콘을 성공적으로 가져왔습니다. 가져온 이모티콘은 총 {len(job.items)}건입니다.'
+        color = Color.green()
+    elif job.status == LineconImportStatus.FAILED:
+        description = f'{len(job.items)}건 중 {done}건을 가져오다가 실패했습니다.\n{job.error}'
+        color = Color.red()
+    else:
+        description = f'라인에서 이모티콘을 가져오는 중입니다. ({done}/{len(job.items)})'
+        color = Color.light_gray()
+
+    return (
+        Embed(title='흑우봇 이모티콘', description=description, color=color)
+        .add_field(name='상품', value=f'[{job.name}] {job.title}', inline=False)
+        .add_field(name='작업 ID', value=f'`{job.id}`', inline=False)
+    )
+
+
+async def notify_import(client: Client, job: LineconImportJobModel):
+    if job.channel_id is None:
+        return
+
+    channel = client.get_channel(job.channel_id)
+    if channel is not None:
+        await channel.send(embed=import_job_embed(job))
 
 
 class LineEmoticonCommandApp(PresentedResponseApp):
     disabled = False
     commands = ['line', 'linecon', '라인', '라인콘']
+
+    # 상품을 가져오는 작업은 이미지 변환까지 하므로 오래 걸립니다.
+    concurrency = 2
+    queue_size = 8
+    timeout = 600.0
     linecon_service: LineconService
 
     def __init__(self, config: Config, client: Client):
         self.config = config
         self.client = client
-        self.linecon_service = LineconService(config.emoticon)
+        self.linecon_service = get_service(LineconService, config.emoticon)
 
     async def parse_command(self, context: Message) -> Optional[Dict[str, Any]]:
         def is_region_option(x: str):
@@ -108,8 +148,25 @@ class LineEmoticonCommandApp(PresentedResponseApp):
                 'help': False,
                 'action': 'create',
                 'name': name,
-                '_id': line_id,
+                'line_id': line_id,
                 'region': typed_region,
+                'channel_id': context.channel.id,
+                'user_id': context.author.id,
+            }
+
+        if parsed[0] in ['작업', 'job']:
+            if len(parsed) < 2:
+                return {'error': True}
+
+            try:
+                job_id = UUID(parsed[1])
+            except ValueError:
+                return {'error': True}
+
+            return {
+                'help': False,
+                'action': 'job',
+                'job_id': job_id,
             }
 
         if parsed[0] in ['삭제', 'remove', 'delete']:
@@ -154,6 +211,13 @@ class LineEmoticonCommandApp(PresentedResponseApp):
                 '`!라인콘 추가 [-r 리전] 이름 상품_ID` 명령어로 사용할 수 있습니다.',
                 inline=False,
             )
+            .add_field(
+                name='가져오기 작업 확인(작업, job)',
+                value='상품을 가져오는 작업은 뒤에서 진행되고, 끝나면 명령어를 입력한 채널에 알려줍니다.\n'
+                '실패한 작업은 같은 추가 명령어를 다시 입력하면 남은 스티커부터 이어서 가져옵니다.\n'
+                '`!라인콘 작업 작업_ID` 명령어로 진행 상황을 볼 수 있습니다.',
+                inline=False,
+            )
             .add_field(
                 name='라인 상품 일괄 삭제(삭제, remove, delete)',
                 value='라인에서 가져온 상품의 이모티콘을 일괄적으로 삭제합니다.\n연결된 모든 이모티콘을 삭제하므로 주의가 필요합니다.\n'
@@ -223,17 +287,32 @@ class LineEmoticonCommandApp(PresentedResponseApp):
                     linecon_id=line_id,
                 )
 
-                (linecon, emoticons) = await self.linecon_service.create_from_item(
-                    name, line_item
+                job = await self.linecon_service.submit_import(
+                    region,
+                    name,
+                    line_item,
+                    channel_id=command['channel_id'],
+                    created_by=command['user_id'],
                 )
 
-                emoticon_names = ', '.join(map(lambda x: f'`{x.name}`', emoticons))
+                # 가져오는 건 뒤에서 하고, 끝나면 채널에 알려준다.
+                if job.status == LineconImportStatus.PENDING:
+                    self.linecon_service.start_import(
+                        job.id, on_finish=lambda x: notify_import(self.client, x)
+                    )
 
-                return None, Embed(
-                    title='흑우봇 이모티콘',
-                    description=f'라인에서 이모티콘을 성공적으로 가져왔습니다. 가져온 이모티콘은 총 {len(emoticons)}건입니다.',
-                    color=Color.green(),
-                ).add_field(name='이모티콘 목록', value=emoticon_names, inline=False)
+                return None, import_job_embed(job)
+
+            if action == 'job':
+                import_job = await self.linecon_service.get_import(command['job_id'])
+                if import_job is None:
+                    return None, Embed(
+                        title='흑우봇 이모티콘',
+                        description='해당 ID의 가져오기 작업이 없습니다.',
+                        color=Color.red(),
+                    )
+
+                return None, import_job_embed(import_job)
 
             if action == 'delete':
                 name = command['name']
@@ -245,7 +324,8 @@ class LineEmoticonCommandApp(PresentedResponseApp):
                 )
 
             if action == 'list':
-                (linecons, dictionary) = await self.linecon_service.get_lists()
+                export = await self.linecon_service.get_lists()
+                linecons = export.linecons
 
                 embed = Embed(
                     color=Color.green(),
@@ -255,7 +335,7 @@ class LineEmoticonCommandApp(PresentedResponseApp):
 
                 for linecon in linecons:
                     emoticon_lists = ', '.join(
-                        map(lambda x: f'`{x.name}`', dictionary[str(linecon.id)])
+                        map(lambda x: f'`{x}`', export.names[str(linecon.id)])
                     )
 
                     embed.add_field(
@@ -267,7 +347,7 @@ class LineEmoticonCommandApp(PresentedResponseApp):
                 return None, embed
 
             return None, self.help_embed()
-        except Exception as e:
+        except (Exception, EmoticonException) as e:
             traceback.print_exc()
             return None, Embed(
                 title=f'흑우봇 라인 이모티콘 오류: [{type(e)}]',
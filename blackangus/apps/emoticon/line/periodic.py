@@ -0,0 +1,32 @@
+import logging
+
+from discord import Client
+
+from blackangus.apps.base import BasePeriodicApp
+from blackangus.apps.emoticon.line.command import notify_import
+from blackangus.config import Config
+from blackangus.services.emoticon.linecon import LineconService
+from blackangus.services.registry import get_service
+
+
+# 봇이 꺼졌다 켜지는 동안 멈춘 라인 상품 가져오기 작업을 이어서 실행합니다.
+class LineImportResumeApp(BasePeriodicApp):
+    period = '* * * * *'
+    disabled = False
+    linecon_service: LineconService
+
+    def __init__(self, config: Config, client: Client):
+        self.config = config
+        self.client = client
+        self.linecon_service = get_service(LineconService, config.emoticon)
+
+    async def action(self):
+        for job_id in await self.linecon_service.pending_imports():
+            # 이 프로세스에서 이미 실행 중인 작업은 그대로 둔다.
+            if job_id in self.linecon_service.import_tasks:
+                continue
+
+            logging.info(f'라인 상품 가져오기 작업을 이어서 실행합니다: {job_id}')
+            self.linecon_service.start_import(
+                job_id, on_finish=lambda x: notify_import(self.client, x)
+            )
@@ -8,9 +8,12 @@ from discord import Client, Message, Embed, Color
 from blackangus.apps.base import PresentedResponseApp
 from blackangus.config import Config
 from blackangus.models.naver_map import NaverMapDirectionModel
-from blackangus.utils.network.google_geocoding_client import geocode_from_google
+from blackangus.utils.embeds import send_embeds
+from blackangus.utils.metrics import measure_stage
+from blackangus.utils.network.google_geocoding_client import geocode
 from blackangus.utils.network.naver_map_pathfinder_client import (
-    find_transit_path_from_locations,
+    find_transit_paths,
+    parse_transit_paths,
 )
 
 
@@ -136,26 +139,26 @@ class NaverTransitDirectionApp(PresentedResponseApp):
 
         try:
             (location_from, location_to) = await asyncio.gather(
-                geocode_from_google(self.config.google, command['address_from']),
-                geocode_from_google(self.config.google, command['address_to']),
+                geocode(self.config.google, command['address_from']),
+                geocode(self.config.google, command['address_to']),
             )
 
-            results = await find_transit_path_from_locations(
+            paths = await find_transit_paths(
                 departure_time=command['time'],
                 location_from=location_from,
                 location_to=location_to,
             )
+            # 보여줄 경로만 모델로 바꾼다.
+            results = parse_transit_paths(paths, max(command['count'], 0))
 
             channel = self.client.get_channel(command['channel'])
-            count = (
-                command['count'] if len(results) > command['count'] else len(results)
-            )
 
-            await channel.send(
-                content=f'경로 추적을 통해 {len(results)}개의 결과를 찾았습니다. {count}개의 결과만 표시합니다.'
-            )
-            for i in range(count):
-                await channel.send(embed=self.result_to_embed(results[i]))
+            with measure_stage(type(self).__name__, 'send'):
+                await send_embeds(
+                    channel,
+                    [self.result_to_embed(result) for result in results],
+                    content=f'경로 추적을 통해 {len(paths)}개의 결과를 찾았습니다. {len(results)}개의 결과만 표시합니다.',
+                )
 
         except Exception as e:
             return None, Embed(
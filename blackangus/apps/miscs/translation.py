@@ -5,10 +5,9 @@ from discord import Client, Color, Embed
 
 from blackangus.apps.base import PresentedResponseApp
 from blackangus.config import Config
-from blackangus.utils.network.papago_client import (
-    PapagoException,
-    translate_from_papago,
-)
+from blackangus.services.papago import PapagoService
+from blackangus.services.registry import get_service
+from blackangus.utils.network.papago_client import PapagoException
 
 
 class TranslationApp(PresentedResponseApp):
@@ -22,6 +21,7 @@ class TranslationApp(PresentedResponseApp):
     ):
         self.config = config
         self.client = client
+        self.papago_service = get_service(PapagoService, config.papago)
 
     async def parse_command(self, context: discord.Message) -> Optional[Dict[str, Any]]:
         parsed = context.clean_content.split(' ')
@@ -54,8 +54,7 @@ class TranslationApp(PresentedResponseApp):
             return None, self.help_embed()
 
         try:
-            result = await translate_from_papago(
-                self.config.papago,
+            result = await self.papago_service.translate(
                 command['language_from'],
                 command['language_to'],
                 command['text'],
@@ -1,22 +1,24 @@
 import asyncio
+import logging
 from math import floor
 from typing import Optional, Dict, Any, Tuple
 
 import discord
 from discord import Color, Client, Embed
 
-from blackangus.apps.base import PresentedResponseApp
+from blackangus.apps.base import BasePeriodicApp, PresentedResponseApp
 from blackangus.config import Config
 from blackangus.utils.network.google_geocoding_client import (
     GoogleAPIException,
-    geocode_from_google,
+    geocode,
 )
 from blackangus.utils.network.weather_client import (
     WeatherAPIException,
-    get_weather_from_openweather,
+    get_weather,
     WeatherModel,
-    get_air_pollution_from_openweather,
+    get_air_pollution,
     AirPollutionModel,
+    refresh_popular_weather,
 )
 
 
@@ -121,10 +123,10 @@ class WeatherApp(PresentedResponseApp):
         self, command: Dict[str, Any]
     ) -> Tuple[Optional[str], Optional[Embed]]:
         try:
-            location = await geocode_from_google(self.config.google, command['address'])
+            location = await geocode(self.config.google, command['address'])
             weather, pollution = await asyncio.gather(
-                get_weather_from_openweather(self.config.weather, location),
-                get_air_pollution_from_openweather(self.config.weather, location),
+                get_weather(self.config.weather, location),
+                get_air_pollution(self.config.weather, location),
             )
 
             return None, self.create_embed(weather, pollution)
@@ -140,3 +142,18 @@ class WeatherApp(PresentedResponseApp):
                 description=str(e),
                 color=Color.red(),
             )
+
+
+# 자주 찾는 곳의 날씨를 만료되기 전에 미리 받아둡니다.
+class WeatherRefreshApp(BasePeriodicApp):
+    period = '*/5 * * * *'
+    disabled = False
+
+    def __init__(self, config: Config, client: Client):
+        self.config = config
+        self.client = client
+
+    async def action(self):
+        refreshed = refresh_popular_weather(self.config.weather)
+        if refreshed > 0:
+            logging.debug(f'자주 찾는 {refreshed}곳의 날씨를 새로 받습니다.')
@@ -0,0 +1,89 @@
+import importlib
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from discord import Client
+
+from blackangus.apps.base import BasePeriodicApp, BaseResponseApp
+from blackangus.config import Config, panic
+
+# 앱 이름과 실제 앱 클래스 경로('모듈:클래스')를 연결합니다.
+# 무거운 의존성(boto3, playwright, PIL 등)을 쓰는 앱 모듈은
+# 설정의 bot.app_list에 들어있을 때만 불러옵니다.
+# 여기에 개발한 앱(응답형, 주기적 모두)들을 넣어주세요.
+APP_REGISTRY: Dict[str, List[str]] = {
+    'random': ['blackangus.apps.miscs.random:RandomApp'],
+    'translation': ['blackangus.apps.miscs.translation:TranslationApp'],
+    'weather': [
+        'blackangus.apps.miscs.weather:WeatherApp',
+        'blackangus.apps.miscs.weather:WeatherRefreshApp',
+    ],
+    'rss': [
+        'blackangus.apps.subscription.register:RSSRegisterApp',
+        'blackangus.apps.subscription.periodic:RSSSubscriberApp',
+    ],
+    'youtube': ['blackangus.apps.search.youtube:YoutubeSearchApp'],
+    'image': ['blackangus.apps.search.image:GoogleImageSearchApp'],
+    'direction': ['blackangus.apps.miscs.direction:NaverTransitDirectionApp'],
+    'alarm': [
+        'blackangus.apps.alarm.register:AlarmCommandApp',
+        'blackangus.apps.alarm.periodic:AlarmPeriodicApp',
+    ],
+    'emoticon': [
+        'blackangus.apps.emoticon.fetcher:EmoticonFetcherApp',
+        'blackangus.apps.emoticon.command:EmoticonCommandApp',
+    ],
+    'linecon': [
+        'blackangus.apps.emoticon.line.command:LineEmoticonCommandApp',
+        'blackangus.apps.emoticon.line.periodic:LineImportResumeApp',
+    ],
+}
+
+
+def import_app_class(path: str) -> type:
+    module_name, class_name = path.split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_apps(
+    config: Config,
+    client: Client,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[List[BaseResponseApp], List[BasePeriodicApp]]:
+    """
+    설정의 bot.app_list에 있는 앱만 불러와서 응답형 앱과 주기적 앱으로 나눠 만듭니다.
+    app_list가 비어있으면 등록된 모든 앱을 불러옵니다.
+
+    :param timings: 넘겨주면 앱 경로마다 불러오고 만드는 데 걸린 시간(초)을 채웁니다.
+    """
+    logger = logging.getLogger('blackangus:registry')
+    names = config.bot.app_list or list(APP_REGISTRY.keys())
+
+    response_apps: List[BaseResponseApp] = []
+    periodic_apps: List[BasePeriodicApp] = []
+
+    for name in names:
+        if name not in APP_REGISTRY:
+            panic(
+                '알 수 없는 앱입니다: {} (사용 가능한 앱: {})',
+                name,
+                ', '.join(APP_REGISTRY.keys()),
+            )
+
+        for path in APP_REGISTRY[name]:
+            started_at = time.perf_counter()
+            app_class = import_app_class(path)
+            app = app_class(config, client)
+
+            if timings is not None:
+                timings[path] = time.perf_counter() - started_at
+
+            if isinstance(app, BaseResponseApp):
+                response_apps.append(app)
+            elif isinstance(app, BasePeriodicApp):
+                periodic_apps.append(app)
+
+            logger.debug('앱을 불러왔습니다: %s', path)
+
+    return response_apps, periodic_apps
@@ -8,12 +8,18 @@ from blackangus.apps.search.base import parse_search_command
 from blackangus.config import Config
 from blackangus.models.search import GoogleImagesModel
 from blackangus.scrapper.google_images import GoogleImagesScrapper
+from blackangus.utils.metrics import external_call, measure_stage
 
 
 class GoogleImageSearchApp(PresentedResponseApp):
     disabled = False
     commands = ['image', '짤']
 
+    # 요청마다 Chromium을 띄우기 때문에 동시에 여러 개를 돌리지 않습니다.
+    concurrency = 1
+    queue_size = 4
+    timeout = 60.0
+
     def __init__(self, config: Config, client: Client):
         self.config = config
         self.client = client
@@ -61,9 +67,10 @@ class GoogleImageSearchApp(PresentedResponseApp):
         scrapper = GoogleImagesScrapper()
 
         try:
-            await scrapper.initialize()
-            results = await scrapper.scrape(keyword, command['count'])
-            await scrapper.finalize()
+            with external_call('playwright', 'google_images'):
+                await scrapper.initialize()
+                results = await scrapper.scrape(keyword, command['count'])
+                await scrapper.finalize()
 
             if len(results) == 0:
                 return '검색 결과가 없습니다.', None
@@ -71,9 +78,10 @@ class GoogleImageSearchApp(PresentedResponseApp):
             embeds = map(lambda result: self.result_to_embed(result), results)
             channel = self.client.get_channel(command['channel'])
 
-            await channel.send(content='구글 이미지 검색 결과입니다.')
-            for embed in embeds:
-                await channel.send(embed=embed)
+            with measure_stage(type(self).__name__, 'send'):
+                await channel.send(content='구글 이미지 검색 결과입니다.')
+                for embed in embeds:
+                    await channel.send(embed=embed)
         except Exception as e:
             return None, self.error_embed(e)
 
@@ -8,12 +8,18 @@ from blackangus.apps.search.base import parse_search_command
 from blackangus.config import Config
 from blackangus.models.search import YoutubeModel
 from blackangus.scrapper.youtube import YoutubeScrapper
+from blackangus.utils.metrics import external_call, measure_stage
 
 
 class YoutubeSearchApp(PresentedResponseApp):
     disabled = False
     commands = ['youtube', '유튜브']
 
+    # 요청마다 Chromium을 띄우기 때문에 동시에 여러 개를 돌리지 않습니다.
+    concurrency = 1
+    queue_size = 4
+    timeout = 60.0
+
     def __init__(self, config: Config, client: Client):
         self.config = config
         self.client = client
@@ -66,9 +72,10 @@ class YoutubeSearchApp(PresentedResponseApp):
         scrapper = YoutubeScrapper()
 
         try:
-            await scrapper.initialize()
-            results = await scrapper.scrape(keyword, command['count'])
-            await scrapper.finalize()
+            with external_call('playwright', 'youtube'):
+                await scrapper.initialize()
+                results = await scrapper.scrape(keyword, command['count'])
+                await scrapper.finalize()
 
             if len(results) == 0:
                 return '검색 결과가 없습니다.', None
@@ -76,9 +83,10 @@ class YoutubeSearchApp(PresentedResponseApp):
             embeds = map(lambda result: self.result_to_embed(result), results)
             channel = self.client.get_channel(command['channel'])
 
-            await channel.send(content='유튜브 검색 결과입니다.')
-            for embed in embeds:
-                await channel.send(embed=embed)
+            with measure_stage(type(self).__name__, 'send'):
+                await channel.send(content='유튜브 검색 결과입니다.')
+                for embed in embeds:
+                    await channel.send(embed=embed)
         except Exception as e:
             return None, self.error_embed(e)
 
@@ -0,0 +1,319 @@
+import asyncio
+import dataclasses
+import functools
+import random
+import time
+import tracemalloc
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import httpx
+
+# 가짜 S3에 넣어둘 1x1 PNG
+PNG_PIXEL = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06'
+    b'\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01'
+    b'\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
+@dataclasses.dataclass
+class FakeAuthor:
+    id: int
+    name: str
+    nick: Optional[str] = None
+    bot: bool = False
+
+
+@dataclasses.dataclass
+class FakeGuild:
+    id: int
+    name: str
+
+
+@dataclasses.dataclass
+class FakeChannel:
+    id: int
+    name: str
+    sent: int = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+@dataclasses.dataclass
+class FakeMessage:
+    """봇이 discord.Message에서 쓰는 속성만 흉내냅니다."""
+
+    clean_content: str
+    author: FakeAuthor
+    channel: FakeChannel
+    guild: FakeGuild
+
+    @property
+    def content(self) -> str:
+        return self.clean_content
+
+
+class FakeS3:
+    """S3 대신 메모리에 객체를 저장합니다."""
+
+    # boto3 클라이언트처럼 이벤트를 걸 수 있는 척만 합니다.
+    meta = SimpleNamespace(
+        events=SimpleNamespace(register=lambda *args, **kwargs: None)
+    )
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs):
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.read()
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        return {
+            'Body': BytesIO(self.objects[Key]),
+            'ContentLength': len(self.objects[Key]),
+        }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        if Key not in self.objects:
+            raise KeyError(Key)
+        return {'ContentLength': len(self.objects[Key])}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str, **kwargs):
+        keys = [key for key in self.objects.keys() if key.startswith(Prefix)]
+        if len(keys) == 0:
+            return {'KeyCount': 0}
+        return {'KeyCount': len(keys), 'Contents': [{'Key': key} for key in keys]}
+
+
+def stub_http_handler(request: httpx.Request) -> httpx.Response:
+    """외부 API 대신 고정된 응답을 돌려주는 httpx 트랜스포트 핸들러."""
+    host = request.url.host
+
+    if host == 'openapi.naver.com':
+        return httpx.Response(
+            200, json={'message': {'result': {'translatedText': 'Hello'}}}
+        )
+
+    if host == 'maps.googleapis.com':
+        return httpx.Response(
+            200,
+            json={
+                'status': 'OK',
+                'results': [{'geometry': {'location': {'lat': 37.5, 'lng': 127.0}}}],
+            },
+        )
+
+    if host == 'api.openweathermap.org' and request.url.path.endswith('air_pollution'):
+        return httpx.Response(
+            200, json={'list': [{'main': {'aqi': 2}, 'components': {'pm10': 10.0}}]}
+        )
+
+    if host == 'api.openweathermap.org':
+        return httpx.Response(
+            200,
+            json={
+                'name': 'Seoul',
+                'main': {
+                    'temp': 20.0,
+                    'temp_min': 18.0,
+                    'temp_max': 22.0,
+                    'feels_like': 20.0,
+                    'humidity': 50,
+                    'pressure': 1013,
+                },
+                'visibility': 10000,
+                'wind': {'speed': 1.0, 'deg': 90},
+                'clouds': {'all': 0},
+                'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+            },
+        )
+
+    return httpx.Response(200, content=PNG_PIXEL)
+
+
+def synthetic_stream(size: int, emoticons: int, seed: int = 0) -> List[str]:
+    """앱마다 자주 쓰이는 비율을 흉내낸 메세지 목록을 만듭니다."""
+    rng = random.Random(seed)
+    weighted: List[Callable[[], str]] = [
+        lambda: f'~EMO_{rng.randrange(emoticons)}',
+        lambda: f'~EMO_{rng.randrange(emoticons)}',
+        lambda: f'~EMO_{rng.randrange(emoticons)}',
+        lambda: f'~MISS_{rng.randrange(emoticons)}',
+        lambda: '그냥 하는 잡담입니다.',
+        lambda: '그냥 하는 잡담입니다.',
+        lambda: '!랜덤 짜장면 짬뽕 볶음밥',
+        lambda: '!번역 한국어 영어 안녕하세요',
+        lambda: '!날씨 강남역',
+        lambda: f'!이모티콘 검색 EMO_{rng.randrange(10)}',
+    ]
+    return [rng.choice(weighted)() for _ in range(size)]
+
+
+def percentile(values: List[float], ratio: float) -> Optional[float]:
+    if len(values) == 0:
+        return None
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class DispatchBenchmark:
+    """
+    가짜 디스코드 메세지를 BotCore.on_message에 흘려보내서
+    처리량, 앱마다의 지연 시간, 메세지당 메모리 할당량을 잽니다.
+    MongoDB는 mongomock(혹은 로컬 mongod), S3와 외부 API는 메모리 대체품을 씁니다.
+    """
+
+    def __init__(
+        self,
+        config: str,
+        messages: List[str],
+        emoticons: int = 1000,
+        batch: int = 32,
+        allocation_sample: int = 200,
+        mongodb_url: Optional[str] = None,
+    ):
+        self.config_path = config
+        self.messages = messages
+        self.emoticons = emoticons
+        self.batch = batch
+        self.allocation_sample = allocation_sample
+        self.mongodb_url = mongodb_url
+
+        self.s3 = FakeS3()
+        self.latencies: Dict[str, List[float]] = {}
+        self.author = FakeAuthor(id=1, name='benchmark')
+        self.guild = FakeGuild(id=1, name='benchmark')
+        self.channel = FakeChannel(id=1, name='benchmark')
+
+    def create_database_client(self):
+        if self.mongodb_url is not None:
+            import motor.motor_asyncio
+
+            return motor.motor_asyncio.AsyncIOMotorClient(self.mongodb_url)
+
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+
+    def create_message(self, content: str) -> FakeMessage:
+        return FakeMessage(
+            clean_content=content,
+            author=self.author,
+            channel=self.channel,
+            guild=self.guild,
+        )
+
+    def instrument(self, app):
+        # 디스패처가 부르는 app.action을 감싸서 앱마다 걸린 시간을 모은다.
+        name = type(app).__name__
+        action = app.action
+        latencies = self.latencies.setdefault(name, [])
+
+        @functools.wraps(action)
+        async def timed_action(context):
+            started_at = time.perf_counter()
+            try:
+                return await action(context)
+            finally:
+                latencies.append(time.perf_counter() - started_at)
+
+        app.action = timed_action
+
+    async def seed(self):
+        from blackangus.models.emoticon.main import EmoticonModel
+
+        documents = []
+        for i in range(self.emoticons):
+            path = f'images/emoticons/benchmark-{i}.png'
+            self.s3.objects[path] = PNG_PIXEL
+            documents.append(
+                EmoticonModel(
+                    name=f'EMO_{i}',
+                    original_url=f'https://example.com/{i}.png',
+                    image_path=path,
+                )
+            )
+
+        await EmoticonModel.insert_many(documents)
+
+    async def throughput(self, core) -> Dict[str, Any]:
+        started_at = time.perf_counter()
+
+        for i in range(0, len(self.messages), self.batch):
+            for content in self.messages[i : i + self.batch]:
+                await core.on_message(self.create_message(content))
+            await core.dispatcher.join()
+
+        elapsed = time.perf_counter() - started_at
+        return {
+            'messages': len(self.messages),
+            'seconds': elapsed,
+            'messages_per_second': len(self.messages) / elapsed if elapsed else None,
+            'rejected': sum(map(lambda x: x.rejected, core.dispatcher.queues)),
+        }
+
+    async def allocations(self, core) -> Dict[str, Any]:
+        # 한 번에 메세지 하나씩 끝까지 처리하면서 그 사이의 최대 할당량을 잰다.
+        sample = self.messages[: self.allocation_sample]
+        peaks: List[int] = []
+
+        tracemalloc.start()
+        for content in sample:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await core.on_message(self.create_message(content))
+            await core.dispatcher.join()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        return {
+            'messages': len(sample),
+            'mean_peak_bytes_per_message': sum(peaks) / len(peaks) if peaks else None,
+            'p99_peak_bytes_per_message': percentile(list(map(float, peaks)), 0.99),
+        }
+
+    async def measure(self) -> Dict[str, Any]:
+        from blackangus.core import BotCore
+
+        core = BotCore(self.config_path)
+        core.bot.get_channel = lambda _: self.channel
+        await core.init_database(self.create_database_client())
+        await self.seed()
+
+        for app in core.response_apps:
+            self.instrument(app)
+
+        throughput = await self.throughput(core)
+        apps = {
+            name: {
+                'count': len(values),
+                'p50_seconds': percentile(values, 0.5),
+                'p99_seconds': percentile(values, 0.99),
+            }
+            for (name, values) in self.latencies.items()
+            if len(values) != 0
+        }
+        allocations = await self.allocations(core)
+
+        await core.dispatcher.close()
+        return {
+            'throughput': throughput,
+            'apps': apps,
+            'allocations': allocations,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        transport = httpx.MockTransport(stub_http_handler)
+        client_class = functools.partial(httpx.AsyncClient, transport=transport)
+
+        # 서비스가 만들어지기 전에 바꿔치기해야 S3, httpx 클라이언트가 대체품을 쓴다.
+        with mock.patch('boto3.client', return_value=self.s3), mock.patch(
+            'httpx.AsyncClient', client_class
+        ):
+            return asyncio.run(self.measure())
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from blackangus.config import load
+
+
+def current_rss() -> int:
+    """
+    현재 프로세스의 상주 메모리(RSS)를 바이트 단위로 가져옵니다.
+    /proc이 없는 환경에서는 최대 RSS로 대신합니다.
+    """
+    statm = Path('/proc/self/statm')
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, 리눅스는 킬로바이트 단위로 돌려준다.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def measure_import_graph(module: str) -> Dict[str, Any]:
+    """
+    새 인터프리터에서 `python -X importtime`으로 모듈을 불러와서
+    의존하는 모든 모듈의 import 시간을 마이크로초 단위로 가져옵니다.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules: List[Dict[str, Any]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        (self_us, cumulative_us, name) = line[len('import time:') :].split('|')
+        modules.append(
+            {
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+            }
+        )
+
+    target = next((x for x in modules if x['module'] == module), None)
+    modules.sort(key=lambda x: x['cumulative_us'], reverse=True)
+
+    return {
+        'module': module,
+        'total_us': target['cumulative_us'] if target is not None else None,
+        'modules': modules,
+    }
+
+
+class StartupBenchmark:
+    """
+    `blackangus run`이 on_ready까지 가는 과정을 단계별로 재는 프로그램.
+    디스코드 게이트웨이에는 연결하지 않고, MongoDB는 로컬 대체품을 사용합니다.
+    """
+
+    def __init__(self, config: str, mongodb_url: Optional[str] = None):
+        self.config_path = config
+        self.mongodb_url = mongodb_url
+        self.stages: List[Dict[str, Any]] = []
+
+    def record(self, stage: str, started_at: float, **extra):
+        self.stages.append(
+            {
+                'stage': stage,
+                'seconds': time.perf_counter() - started_at,
+                'rss_bytes': current_rss(),
+                **extra,
+            }
+        )
+
+    def create_database_client(self):
+        if self.mongodb_url is not None:
+            import motor.motor_asyncio
+
+            return motor.motor_asyncio.AsyncIOMotorClient(self.mongodb_url), 'mongod'
+
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient(), 'mongomock'
+
+    def run(self) -> Dict[str, Any]:
+        import_graph = measure_import_graph('blackangus.core')
+        self.record('baseline', time.perf_counter())
+
+        started_at = time.perf_counter()
+        from blackangus.apps.registry import APP_REGISTRY, import_app_class
+        from blackangus.core import BotCore
+
+        self.record('import_core', started_at)
+
+        # 앱 모듈을 먼저 불러와서 import 시간과 생성 시간을 나눠서 잰다.
+        started_at = time.perf_counter()
+        config = load(Path(self.config_path))
+        app_imports: Dict[str, float] = {}
+        for name in config.bot.app_list or list(APP_REGISTRY.keys()):
+            for path in APP_REGISTRY.get(name, []):
+                app_started_at = time.perf_counter()
+                import_app_class(path)
+                app_imports[path] = time.perf_counter() - app_started_at
+
+        self.record('import_apps', started_at, apps=app_imports)
+
+        started_at = time.perf_counter()
+        app_timings: Dict[str, float] = {}
+        core = BotCore(self.config_path, app_timings)
+        self.record('construct_core', started_at, apps=app_timings)
+
+        (client, database) = self.create_database_client()
+        started_at = time.perf_counter()
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(core.init_database(client))
+        loop.close()
+        self.record('init_database', started_at, database=database)
+
+        return {
+            'python': sys.version,
+            'platform': sys.platform,
+            'total_seconds': sum(map(lambda x: x['seconds'], self.stages)),
+            'peak_rss_bytes': max(map(lambda x: x['rss_bytes'], self.stages)),
+            'stages': self.stages,
+            'import_graph': import_graph,
+        }
@@ -1,6 +1,6 @@
 import pathlib
 import sys
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional
 
 import toml
 from pydantic import BaseModel, Field
@@ -13,8 +13,17 @@ class DiscordConfig(BaseModel):
     token: str
 
 
+class AppLimitConfig(BaseModel):
+    # 앱 클래스에 선언된 기본값을 덮어쓸 때만 값을 넣어주세요.
+    concurrency: Optional[int] = Field(default=None, gt=0)
+    queue_size: Optional[int] = Field(default=None, gt=0)
+    timeout: Optional[float] = Field(default=None, gt=0)
+
+
 class BotConfig(BaseModel):
     app_list: List[str] = Field(default_factory=list)
+    # 앱 클래스 이름을 키로 동시 실행 수, 대기열 크기, 타임아웃을 지정합니다.
+    app_limits: Dict[str, AppLimitConfig] = Field(default_factory=dict)
     prefix: str = Field(default='!')
     emoticon_prefix: str = Field(default='~')
     log_when_ready: bool = Field(default=False)
@@ -24,6 +33,13 @@ class BotConfig(BaseModel):
 class PapagoConfig(BaseModel):
     client_id: str
     client_secret: str
+    # 번역 결과를 이 개수만큼 메모리에 들고 있습니다.
+    cache_entries: int = Field(default=1024, ge=0)
+    # 켜면 번역 결과를 MongoDB에도 저장해서 봇을 다시 켜도 씁니다.
+    persist_cache: bool = Field(default=False)
+    # 파파고 API에 보내는 초당 요청 수와 동시 요청 수
+    requests_per_second: float = Field(default=5.0, gt=0)
+    concurrency: int = Field(default=4, gt=0)
 
 
 class GoogleConfig(BaseModel):
@@ -45,6 +61,41 @@ class EmoticonConfig(BaseModel):
     s3_secret_key: str
     s3_region: str
     api_endpoint: Dict[str, str]
+    # 디스코드에 보낼 이미지는 이 크기(px)에 맞춰서 미리 줄여둡니다.
+    variant_size: int = Field(default=160, gt=0)
+    # 이미지를 줄이는 프로세스 수, 0이면 원본만 저장합니다.
+    variant_workers: int = Field(default=2, ge=0)
+    # 이모티콘으로 올릴 수 있는 이미지의 최대 크기(바이트), 넘으면 받는 도중에 끊습니다.
+    max_image_bytes: int = Field(default=10 * 1024 * 1024, gt=0)
+
+
+class MetricsConfig(BaseModel):
+    # 켜면 host:port의 /metrics에서 Prometheus 형식으로 지표를 내보냅니다.
+    enabled: bool = Field(default=False)
+    host: str = Field(default='127.0.0.1')
+    port: int = Field(default=9464)
+
+
+class WatchdogConfig(BaseModel):
+    # 이벤트 루프 감시: interval(초)마다 박동을 남기고, threshold(초) 넘게 멈추면 스택을 남깁니다.
+    enabled: bool = Field(default=True)
+    interval: float = Field(default=0.1, gt=0)
+    threshold: float = Field(default=0.5, gt=0)
+    # 최근 멈춤 기록을 몇 개까지 들고 있을지
+    history: int = Field(default=32, gt=0)
+
+
+class TracingConfig(BaseModel):
+    # 켜면 명령 하나를 처리하는 과정을 스팬 단위로 기록합니다.
+    enabled: bool = Field(default=False)
+    # 내보낼 트레이스의 비율 (0 ~ 1)
+    sample_rate: float = Field(default=0.1, ge=0, le=1)
+    # 이 시간(초)보다 오래 걸린 명령은 샘플링과 상관없이 단계별 시간을 로그로 남기고 내보냅니다.
+    slow_threshold: Optional[float] = Field(default=5.0, gt=0)
+    # file이면 path에 JSON 한 줄씩, zipkin이면 endpoint로 Zipkin v2 JSON을 보냅니다.
+    exporter: Literal['file', 'zipkin'] = Field(default='file')
+    path: str = Field(default='traces.jsonl')
+    endpoint: str = Field(default='http://127.0.0.1:9411/api/v2/spans')
 
 
 class Config(BaseModel):
@@ -55,6 +106,9 @@ class Config(BaseModel):
     google: GoogleConfig
     weather: WeatherConfig
     emoticon: EmoticonConfig
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    watchdog: WatchdogConfig = Field(default_factory=WatchdogConfig)
 
 
 def panic(message: str, *args):
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import discord
 from aiocron import crontab
@@ -9,25 +9,21 @@ from beanie import init_beanie
 import motor.motor_asyncio
 from discord.ext import commands
 
-from blackangus.apps.alarm.periodic import AlarmPeriodicApp
-from blackangus.apps.alarm.register import AlarmCommandApp
 from blackangus.apps.base import BasePeriodicApp, BaseResponseApp
-from blackangus.apps.emoticon.command import EmoticonCommandApp
-from blackangus.apps.emoticon.fetcher import EmoticonFetcherApp
-from blackangus.apps.emoticon.line.command import LineEmoticonCommandApp
-from blackangus.apps.miscs.direction import NaverTransitDirectionApp
-from blackangus.apps.miscs.random import RandomApp
-from blackangus.apps.miscs.translation import TranslationApp
-from blackangus.apps.miscs.weather import WeatherApp
-from blackangus.apps.search.image import GoogleImageSearchApp
-from blackangus.apps.search.youtube import YoutubeSearchApp
-from blackangus.apps.subscription.periodic import RSSSubscriberApp
-from blackangus.apps.subscription.register import RSSRegisterApp
+from blackangus.apps.registry import load_apps
 from blackangus.config import Config, load
+from blackangus.dispatcher import AppDispatcher
+from blackangus.migration.indexes import ensure_name_indexes
 from blackangus.models.alarm import AlarmModel
-from blackangus.models.emoticon.linecon import LineconModel
+from blackangus.models.emoticon.linecon import LineconModel, LineconImportJobModel
 from blackangus.models.emoticon.main import EmoticonModel
+from blackangus.models.geocode import GeocodeCacheModel
+from blackangus.models.query_plan import warn_on_collection_scans
 from blackangus.models.subscribe import RSSDocumentModel, RSSSubscriptionModel
+from blackangus.models.translation import TranslationCacheModel
+from blackangus.utils import tracing
+from blackangus.utils.metrics import MongoMetricsListener, start_metrics_server
+from blackangus.utils.watchdog import LoopWatchdog
 
 
 class BotCore:
@@ -35,9 +31,10 @@ class BotCore:
     흑우 봇을 실행할 수 있게 해주는 클래스
     """
 
-    def __init__(self, config: str):
+    def __init__(self, config: str, app_timings: Optional[Dict[str, float]] = None):
         self.logger = logging.getLogger('blackangus:core')
         self.config: Config = load(Path(config))
+        tracing.configure(self.config.tracing)
         self.bot = commands.Bot(
             command_prefix=self.config.bot.emoticon_prefix,
             intents=discord.Intents(
@@ -47,26 +44,21 @@ class BotCore:
             ),
         )
 
-        self.response_apps: List[BaseResponseApp] = [
-            # 여기에 개발한 응답형 커맨드(앱)들을 넣어주세요.
-            RandomApp(self.config, self.bot),
-            TranslationApp(self.config, self.bot),
-            WeatherApp(self.config, self.bot),
-            RSSRegisterApp(self.config, self.bot),
-            YoutubeSearchApp(self.config, self.bot),
-            GoogleImageSearchApp(self.config, self.bot),
-            NaverTransitDirectionApp(self.config, self.bot),
-            AlarmCommandApp(self.config, self.bot),
-            EmoticonFetcherApp(self.config, self.bot),
-            EmoticonCommandApp(self.config, self.bot),
-            LineEmoticonCommandApp(self.config, self.bot),
-        ]
+        # 설정의 bot.app_list에 있는 앱만 필요할 때 불러와서 만든다.
+        # 새로 개발한 앱은 blackangus/apps/registry.py에 등록해주세요.
+        self.response_apps: List[BaseResponseApp]
+        self.periodic_apps: List[BasePeriodicApp]
+        (self.response_apps, self.periodic_apps) = load_apps(
+            self.config, self.bot, app_timings
+        )
 
-        self.periodic_apps: List[BasePeriodicApp] = [
-            # 여기에 개발한 주기적 커맨드(앱)들을 넣어주세요.
-            RSSSubscriberApp(self.config, self.bot),
-            AlarmPeriodicApp(self.config, self.bot),
-        ]
+        # 앱마다 작업 큐를 따로 두어서 느린 앱이 다른 앱을 막지 않게 한다.
+        self.dispatcher = AppDispatcher(self.config, self.response_apps)
+
+        self.metrics_started = False
+        self.metrics_tasks: List[asyncio.Task] = []
+        self.metrics_server: Optional[asyncio.AbstractServer] = None
+        self.watchdog = LoopWatchdog(self.config.watchdog)
 
     def run(self):
         self.bot.event(self.on_message)
@@ -81,33 +73,69 @@ class BotCore:
         if context.author.bot:
             return
 
-        user_name = (
-            context.author.name if context.author.nick is None else context.author.nick
+        # 메세지마다 남기는 로그는 비싸므로 DEBUG일 때만 만든다.
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                '[%s - %s] %s: %s',
+                context.guild.name,
+                context.channel.name,
+                context.author.nick or context.author.name,
+                context.clean_content,
+            )
+
+        await self.dispatcher.dispatch(context)
+
+    async def init_database(
+        self, client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+    ):
+        # 벤치마크처럼 다른 MongoDB를 써야할 때는 클라이언트를 넘겨준다.
+        if client is None:
+            client = motor.motor_asyncio.AsyncIOMotorClient(
+                self.config.mongodb.url, event_listeners=[MongoMetricsListener()]
+            )
+
+        # beanie의 document_models 타입은 모델 클래스 목록을 받지 못해서 Any로 둔다.
+        document_models: List[Any] = [
+            # 여기에 관련된 MongoDB 모델들을 넣어주세요.
+            RSSDocumentModel,
+            RSSSubscriptionModel,
+            AlarmModel,
+            EmoticonModel,
+            LineconModel,
+            LineconImportJobModel,
+            GeocodeCacheModel,
+            TranslationCacheModel,
+        ]
+        await init_beanie(
+            database=client[self.config.mongodb.database_name],
+            document_models=document_models,
         )
+        # 이름이 겹치는 이모티콘이 남아있어도 봇은 뜨도록 이름 인덱스는 따로 만든다.
+        await ensure_name_indexes()
 
-        self.logger.info(
-            f'[{context.guild.name} - {context.channel.name}] '
-            f'{user_name}: {context.clean_content}'
-        )
+        # 자주 쓰는 쿼리가 인덱스를 타는지 확인한다.
+        await warn_on_collection_scans()
 
-        await asyncio.gather(*map(lambda x: x.action(context), self.response_apps))
+    async def start_metrics(self):
+        # on_ready는 재연결할 때마다 불리므로 한 번만 띄운다.
+        if self.metrics_started:
+            return
+        self.metrics_started = True
+
+        # 이벤트 루프가 멈추면 그때의 스택을 로그로 남긴다.
+        if self.config.watchdog.enabled:
+            self.metrics_tasks.append(self.watchdog.start())
+
+        if self.config.metrics.enabled:
+            self.metrics_server = await start_metrics_server(
+                self.config.metrics.host, self.config.metrics.port
+            )
 
     async def on_ready(self):
         # 봇이 준비되자마자 데이터베이스 연결을 한다.
         # run을 async로 만드는 것보다 이게 나음.
-        client = motor.motor_asyncio.AsyncIOMotorClient(self.config.mongodb.url)
-
-        await init_beanie(
-            database=client[self.config.mongodb.database_name],
-            document_models=[
-                # 여기에 관련된 MongoDB 모델들을 넣어주세요.
-                RSSDocumentModel,
-                RSSSubscriptionModel,
-                AlarmModel,
-                EmoticonModel,
-                LineconModel,
-            ],
-        )
+        await self.start_metrics()
+        await self.init_database()
 
         self.logger.info('봇이 준비되었습니다.')
 
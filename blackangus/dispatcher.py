@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+import discord
+from discord import Color, Embed
+
+from blackangus.apps.base import BaseResponseApp
+from blackangus.config import AppLimitConfig, Config
+from blackangus.utils.metrics import COMMANDS_TOTAL, QUEUE_DEPTH, STAGE_SECONDS
+from blackangus.utils.tracing import span
+
+
+class AppWorkQueue:
+    """
+    앱 하나에 대한 작업 큐와 작업자들.
+    큐가 가득 차면 새 메세지는 받지 않고 바로 거절합니다.
+    """
+
+    def __init__(
+        self,
+        app: BaseResponseApp,
+        concurrency: int,
+        queue_size: int,
+        timeout: float,
+    ):
+        self.logger = logging.getLogger(f'blackangus:dispatcher:{type(app).__name__}')
+        self.app = app
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.queue: 'asyncio.Queue[discord.Message]' = asyncio.Queue(maxsize=queue_size)
+        self.workers: List[asyncio.Task] = []
+
+        # 큐가 가득 차서 거절한 메세지 수
+        self.rejected = 0
+
+    @property
+    def name(self) -> str:
+        return type(self.app).__name__
+
+    def start(self):
+        # 이벤트 루프가 돌고 있을 때 처음 메세지가 들어오면 작업자를 띄운다.
+        if len(self.workers) != 0:
+            return
+
+        self.workers = [
+            asyncio.create_task(self.work(), name=f'{self.name}-{i}')
+            for i in range(self.concurrency)
+        ]
+
+    def submit(self, context: discord.Message) -> bool:
+        self.start()
+
+        try:
+            self.queue.put_nowait(context)
+            QUEUE_DEPTH.set(self.queue.qsize(), app=self.name)
+            return True
+        except asyncio.QueueFull:
+            COMMANDS_TOTAL.inc(app=self.name, result='rejected')
+            return False
+
+    async def work(self):
+        while True:
+            context = await self.queue.get()
+            QUEUE_DEPTH.set(self.queue.qsize(), app=self.name)
+            started_at = time.perf_counter()
+            result = 'ok'
+
+            try:
+                # 명령 하나가 트레이스 하나가 된다.
+                with span(
+                    f'{self.name}.action',
+                    app=self.name,
+                    guild_id=context.guild.id if context.guild else None,
+                    channel_id=context.channel.id,
+                ):
+                    await asyncio.wait_for(
+                        self.app.action(context), timeout=self.timeout
+                    )
+            except asyncio.TimeoutError:
+                result = 'timeout'
+                self.logger.warning('%s초 안에 처리하지 못했습니다.', self.timeout)
+                await reply_safely(
+                    context,
+                    Embed(
+                        title='흑우봇',
+                        description='요청을 처리하는 데 너무 오래 걸려서 중단했습니다.',
+                        color=Color.red(),
+                    ),
+                )
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                # 서비스 예외 중에는 BaseException을 상속한 것도 있어서 모두 잡는다.
+                result = 'error'
+                self.logger.exception('메세지를 처리하는 중 오류가 발생했습니다.')
+            finally:
+                self.queue.task_done()
+                COMMANDS_TOTAL.inc(app=self.name, result=result)
+                STAGE_SECONDS.observe(
+                    time.perf_counter() - started_at, app=self.name, stage='action'
+                )
+
+    async def close(self):
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+
+async def reply_safely(context: discord.Message, embed: Embed):
+    try:
+        await context.channel.send(embed=embed)
+    except Exception:
+        logging.getLogger('blackangus:dispatcher').exception('응답을 보내지 못했습니다.')
+
+
+class AppDispatcher:
+    """
+    응답형 앱마다 따로 제한된 작업 큐를 두고 메세지를 나눠주는 클래스.
+    느린 앱이 다른 앱의 처리를 막거나 메모리를 다 쓰지 못하게 합니다.
+    """
+
+    def __init__(self, config: Config, apps: List[BaseResponseApp]):
+        self.queues: List[AppWorkQueue] = []
+
+        for app in apps:
+            limit: Optional[AppLimitConfig] = config.bot.app_limits.get(
+                type(app).__name__, None
+            )
+            self.queues.append(
+                AppWorkQueue(
+                    app,
+                    concurrency=(limit and limit.concurrency) or app.concurrency,
+                    queue_size=(limit and limit.queue_size) or app.queue_size,
+                    timeout=(limit and limit.timeout) or app.timeout,
+                )
+            )
+
+    async def dispatch(self, context: discord.Message):
+        for queue in self.queues:
+            if not queue.app.is_target(context):
+                continue
+
+            if not queue.submit(context):
+                queue.rejected += 1
+                queue.logger.warning('작업 큐가 가득 차서 요청을 거절했습니다.')
+                await reply_safely(
+                    context,
+                    Embed(
+                        title='흑우봇',
+                        description='지금은 요청이 많아서 처리할 수 없습니다. 잠시 후 다시 시도해주세요.',
+                        color=Color.orange(),
+                    ),
+                )
+
+    async def join(self):
+        # 큐에 들어간 작업이 모두 끝날 때까지 기다립니다.
+        await asyncio.gather(*map(lambda x: x.queue.join(), self.queues))
+
+    async def close(self):
+        await asyncio.gather(*map(lambda x: x.close(), self.queues))
@@ -1,10 +1,9 @@
+import importlib.util
 import logging
+from typing import BinaryIO, Optional, TextIO
 
 import click
 
-from blackangus.core import BotCore
-from blackangus.migration.v1_to_v2 import V1V2Migrator
-
 
 @click.group()
 def blackangus():
@@ -19,13 +18,57 @@ def blackangus():
 @click.argument('v1-image-path')
 @click.argument('v2-config', default='./config.toml')
 @click.option('--log-level', default='INFO')
-def migrate(v1_mongodb_url: str, v1_image_path: str, v2_config: str, log_level: str):
+@click.option('--concurrency', default=8, help='동시에 올릴 파일 수')
+@click.option('--batch-size', default=100, help='한 번에 넣을 v1 문서 수')
+@click.option('--dry-run', is_flag=True, help='아무것도 쓰지 않고 옮길 대상만 확인합니다.')
+@click.option('--verify', is_flag=True, help='옮긴 문서 수와 파일 체크섬을 v1과 비교합니다.')
+def migrate(
+    v1_mongodb_url: str,
+    v1_image_path: str,
+    v2_config: str,
+    log_level: str,
+    concurrency: int,
+    batch_size: int,
+    dry_run: bool,
+    verify: bool,
+):
     """
     v1 데이터베이스를 v2 데이터베이스로 변환합니다.
+    중간에 멈추면 같은 명령어로 다시 실행해서 이어서 옮길 수 있습니다.
     """
+    # 봇 실행에 필요 없는 모듈은 커맨드를 실행할 때 불러온다.
+    from blackangus.migration.v1_to_v2 import V1V2Migrator
+
     # 기본 로그 레벨은
     logging.basicConfig(level=log_level)
-    return V1V2Migrator(v2_config, v1_image_path, v1_mongodb_url).run()
+    report = V1V2Migrator(
+        v2_config,
+        v1_image_path,
+        v1_mongodb_url,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        dry_run=dry_run,
+    ).run(verify=verify)
+
+    if len(report.failed) != 0:
+        raise SystemExit(1)
+
+
+@blackangus.command('migrate-indexes')
+@click.argument('config', default='./config.toml')
+@click.option('--log-level', default='INFO')
+@click.option('--dedupe', is_flag=True, help='겹치는 이름은 가장 먼저 만든 것만 남기고 삭제 표시합니다.')
+def migrate_indexes(config: str, log_level: str, dedupe: bool):
+    """
+    예전 인덱스를 지우고 이모티콘 이름 유니크 인덱스를 만듭니다. 한 번만 실행하면 됩니다.
+    """
+    import asyncio
+
+    from blackangus.migration.indexes import migrate_indexes as run_migration
+
+    logging.basicConfig(level=log_level)
+    if not asyncio.run(run_migration(config, dedupe=dedupe)):
+        raise SystemExit(1)
 
 
 @blackangus.command('run')
@@ -37,9 +80,81 @@ def run(config: str, log_level: str):
     :param config: 설정 파일
     :param log_level: 로그 레벨
     """
+    from blackangus.core import BotCore
+
     logging.basicConfig(level=log_level)
     return BotCore(config).run()
 
 
+def require_mongomock(mongodb_url: Optional[str]):
+    # 벤치마크에서 MongoDB 대신 쓰는 mongomock-motor는 개발 의존성이다.
+    if mongodb_url is None and importlib.util.find_spec('mongomock_motor') is None:
+        raise click.UsageError(
+            'mongomock-motor가 설치되어 있지 않습니다. '
+            '`poetry install`로 개발 의존성을 설치하거나 --mongodb-url을 지정해주세요.'
+        )
+
+
+@blackangus.command('bench-startup')
+@click.argument('config', default='./config.toml')
+@click.option('--mongodb-url', default=None, help='없으면 mongomock을 사용합니다.')
+@click.option('--output', default='-', type=click.File('wb'))
+def bench_startup(config: str, mongodb_url: Optional[str], output: BinaryIO):
+    """
+    봇이 준비되기까지의 import 시간, 앱 생성 시간, 메모리 사용량을 JSON으로 기록합니다.
+    """
+    require_mongomock(mongodb_url)
+
+    import orjson
+
+    from blackangus.benchmark.startup import StartupBenchmark
+
+    result = StartupBenchmark(config, mongodb_url).run()
+    output.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    output.write(b'\n')
+
+
+@blackangus.command('bench-dispatch')
+@click.argument('config', default='./config.toml')
+@click.option('--messages', default=2000, help='합성 메세지 수')
+@click.option('--emoticons', default=1000, help='미리 넣어둘 이모티콘 수')
+@click.option('--stream', default=None, type=click.File('r'), help='한 줄에 메세지 하나')
+@click.option('--batch', default=32, help='한 번에 흘려보낼 메세지 수')
+@click.option('--mongodb-url', default=None, help='없으면 mongomock을 사용합니다.')
+@click.option('--output', default='-', type=click.File('wb'))
+def bench_dispatch(
+    config: str,
+    messages: int,
+    emoticons: int,
+    stream: Optional[TextIO],
+    batch: int,
+    mongodb_url: Optional[str],
+    output: BinaryIO,
+):
+    """
+    가짜 디스코드 메세지로 on_message의 처리량과 앱별 지연 시간을 JSON으로 기록합니다.
+    """
+    require_mongomock(mongodb_url)
+
+    import orjson
+
+    from blackangus.benchmark.dispatch import DispatchBenchmark, synthetic_stream
+
+    if stream is not None:
+        contents = [line.rstrip('\n') for line in stream if line.strip()]
+    else:
+        contents = synthetic_stream(messages, emoticons)
+
+    result = DispatchBenchmark(
+        config,
+        contents,
+        emoticons=emoticons,
+        batch=batch,
+        mongodb_url=mongodb_url,
+    ).run()
+    output.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    output.write(b'\n')
+
+
 if __name__ == '__main__':
     blackangus()
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Type
+
+import motor.motor_asyncio
+import pymongo
+from beanie import Document, init_beanie
+from pymongo import IndexModel
+
+from blackangus.config import Config, load
+from blackangus.models.emoticon.linecon import LineconModel
+from blackangus.models.emoticon.main import EmoticonModel
+
+# 예전 버전에서 걸어둔 인덱스 중 이제 쓰지 않는 것 (모델 -> 인덱스 이름)
+LEGACY_INDEXES: Dict[Type[Document], List[str]] = {
+    # 이모티콘 이름에 걸었던 TEXT 인덱스
+    EmoticonModel: ['name_text'],
+}
+
+# 살아있는 이름을 하나만 두는 모델
+# 예전 데이터에는 겹치는 이름이 있을 수 있어서 Settings.indexes에 넣지 않고
+# ensure_name_indexes에서 겹치는 이름이 없을 때만 만듭니다.
+UNIQUE_NAME_MODELS: List[Type[Document]] = [EmoticonModel, LineconModel]
+
+UNIQUE_NAME_INDEX = 'name_live_unique'
+# 겹치는 이름이 남아있는 동안 대신 쓰는 인덱스
+NAME_INDEX = 'name_live'
+
+
+def name_index(unique: bool) -> IndexModel:
+    return IndexModel(
+        [('name', pymongo.ASCENDING)],
+        name=UNIQUE_NAME_INDEX if unique else NAME_INDEX,
+        unique=unique,
+        partialFilterExpression={'removed': False},
+    )
+
+
+async def find_duplicate_names(model: Type[Document]) -> Dict[str, int]:
+    """삭제되지 않은 문서 중 이름이 겹치는 것을 (이름 -> 개수)로 반환합니다."""
+    duplicates: Dict[str, int] = {}
+    async for group in model.get_motor_collection().aggregate(
+        [
+            {'$match': {'removed': False}},
+            {'$group': {'_id': '$name', 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}},
+        ]
+    ):
+        duplicates[group['_id']] = group['count']
+    return duplicates
+
+
+async def ensure_name_index(model: Type[Document]) -> bool:
+    """
+    이름이 겹치지 않으면 유니크 인덱스를 만들고 True를 반환합니다.
+    겹치는 이름이 있으면 그 이름들을 로그로 남기고, 유니크하지 않은 인덱스로 대신합니다.
+    """
+    logger = logging.getLogger('blackangus:indexes')
+    collection = model.get_motor_collection()
+    existing = await collection.index_information()
+
+    duplicates = await find_duplicate_names(model)
+    if len(duplicates) > 0:
+        logger.error(
+            '%s에 삭제되지 않은 같은 이름이 있어서 이름 유니크 인덱스를 만들지 않았습니다: %s\n'
+            '`blackangus migrate-indexes --dedupe`로 정리해주세요.',
+            model.__name__,
+            ', '.join(f'{name}({count}개)' for (name, count) in duplicates.items()),
+        )
+        if UNIQUE_NAME_INDEX not in existing and NAME_INDEX not in existing:
+            await collection.create_indexes([name_index(unique=False)])
+        return False
+
+    if UNIQUE_NAME_INDEX in existing:
+        return True
+
+    # 같은 키의 인덱스는 하나만 둘 수 있어서 대신 쓰던 인덱스를 지운다.
+    if NAME_INDEX in existing:
+        await collection.drop_index(NAME_INDEX)
+    await collection.create_indexes([name_index(unique=True)])
+    return True
+
+
+async def ensure_name_indexes():
+    """
+    봇이 켜질 때 부릅니다. 인덱스를 만들지 못해도 봇은 계속 뜹니다.
+    """
+    logger = logging.getLogger('blackangus:indexes')
+    for model in UNIQUE_NAME_MODELS:
+        try:
+            await ensure_name_index(model)
+        except Exception:
+            logger.exception('%s의 이름 인덱스를 만들지 못했습니다.', model.__name__)
+
+
+async def drop_legacy_indexes():
+    logger = logging.getLogger('blackangus:indexes')
+    for (model, names) in LEGACY_INDEXES.items():
+        collection = model.get_motor_collection()
+        existing = await collection.index_information()
+        for name in names:
+            if name in existing:
+                await collection.drop_index(name)
+                logger.info('%s의 예전 인덱스를 지웠습니다: %s', model.__name__, name)
+
+
+async def dedupe_names(model: Type[Document]) -> int:
+    """
+    삭제되지 않은 같은 이름의 문서 중 가장 먼저 만든 것만 남기고 나머지는 삭제 표시합니다.
+    라인 이모티콘 묶음을 지우면 거기에 딸린 이모티콘도 같이 삭제 표시합니다.
+    """
+    logger = logging.getLogger('blackangus:indexes')
+    collection = model.get_motor_collection()
+    removed = 0
+
+    for name in await find_duplicate_names(model):
+        documents = (
+            await collection.find(
+                {'name': name, 'removed': False}, projection={'_id': True}
+            )
+            .sort('created_at', pymongo.ASCENDING)
+            .to_list(None)
+        )
+        ids = [document['_id'] for document in documents[1:]]
+
+        await collection.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'removed': True, 'updated_at': datetime.now()}}
+            if model is EmoticonModel
+            else {'$set': {'removed': True}},
+        )
+        if model is LineconModel:
+            await EmoticonModel.get_motor_collection().update_many(
+                {'relation_id': {'$in': ids}, 'removed': False},
+                {'$set': {'removed': True, 'updated_at': datetime.now()}},
+            )
+
+        logger.info('%s: %s 중복 %d개를 삭제 표시했습니다.', model.__name__, name, len(ids))
+        removed += len(ids)
+
+    return removed
+
+
+async def migrate_indexes(config_path: str, dedupe: bool = False) -> bool:
+    """
+    한 번만 실행하는 인덱스 정리 작업입니다.
+    예전 인덱스를 이름으로 지우고, dedupe면 겹치는 이름을 정리한 뒤 이름 유니크 인덱스를 만듭니다.
+    유니크 인덱스를 모두 만들었으면 True를 반환합니다.
+    """
+    config: Config = load(Path(config_path))
+    client = motor.motor_asyncio.AsyncIOMotorClient(config.mongodb.url)
+    document_models: List[Any] = [EmoticonModel, LineconModel]
+    await init_beanie(
+        database=client[config.mongodb.database_name],
+        document_models=document_models,
+    )
+
+    await drop_legacy_indexes()
+
+    # 라인 이모티콘 묶음을 먼저 정리해야 딸린 이모티콘도 같이 정리된다.
+    if dedupe:
+        for model in reversed(UNIQUE_NAME_MODELS):
+            await dedupe_names(model)
+
+    created = True
+    for model in UNIQUE_NAME_MODELS:
+        created = await ensure_name_index(model) and created
+    return created
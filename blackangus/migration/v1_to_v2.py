@@ -1,28 +1,101 @@
 import asyncio
+import dataclasses
+import hashlib
 import logging
+from datetime import datetime
 from pathlib import Path
-from uuid import uuid4
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+from uuid import NAMESPACE_URL, UUID, uuid5
 
 import boto3
 import motor.motor_asyncio
-from beanie import init_beanie
+from botocore.exceptions import ClientError
+from beanie import Document, init_beanie
+from beanie.odm.utils.init import Initializer
+from beanie.odm.utils.dump import get_dict
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
 from blackangus.config import Config, load
 from blackangus.models.emoticon.linecon import LineconModel
 from blackangus.models.emoticon.main import EmoticonModel, EmoticonFrom
-from blackangus.services.emoticon import transfer_file_from_bytes
+from blackangus.models.migration import MigrationCheckpointModel
+from blackangus.services.emoticon import EmoticonException
+
+# 옮긴 문서와 파일의 ID를 v1 문서에서 정해서, 다시 실행해도 같은 ID가 나오게 합니다.
+MIGRATION_NAMESPACE = uuid5(NAMESPACE_URL, 'blackangus:v1-to-v2')
+
+# MongoDB의 중복 키 오류 코드
+DUPLICATE_KEY = 11000
+
+# v1 파일은 한 번에 읽지 않고 이만큼씩 읽어서 메모리를 일정하게 쓴다.
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def migrated_id(*parts: Any) -> UUID:
+    return uuid5(MIGRATION_NAMESPACE, ':'.join(map(str, parts)))
+
+
+class ReadOnlyInitializer(Initializer):
+    """
+    init_beanie는 모델을 연결하면서 Settings.indexes의 인덱스를 만듭니다.
+    아무것도 쓰지 않아야 하는 dry-run, verify에서는 인덱스 없이 모델을 컬렉션에 연결만 합니다.
+    """
+
+    @staticmethod
+    async def init_indexes(cls, allow_index_dropping: bool = False):
+        pass
+
+
+def digest_file(file: Path, algorithm: str = 'sha256') -> str:
+    digest = hashlib.new(algorithm)
+    with file.open('rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclasses.dataclass
+class MigrationReport:
+    # 단계 이름 -> 개수
+    migrated: Dict[str, int] = dataclasses.field(default_factory=dict)
+    skipped: Dict[str, int] = dataclasses.field(default_factory=dict)
+    failed: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def add(self, counter: Dict[str, int], stage: str, count: int = 1):
+        counter[stage] = counter.get(stage, 0) + count
 
 
 class V1V2Migrator:
     """
     기존 TypeScript + Node.js 흑우봇에서 V2 흑우봇으로 MongoDB / 이미지를 마이그레이션시키는 프로그램.
+
+    이미지는 정해진 수만큼 동시에 올리고, 문서는 batch_size개씩 모아서 한 번에 넣습니다.
+    batch를 넣을 때마다 마지막 v1 _id를 체크포인트로 남기므로 중간에 멈춰도 이어서 할 수 있고,
+    문서와 파일 ID를 v1 _id에서 정하기 때문에 같은 batch를 다시 넣어도 중복되지 않습니다.
     """
 
-    def __init__(self, config: str, image_path: str, prev_mongodb_path: str):
+    def __init__(
+        self,
+        config: str,
+        image_path: str,
+        prev_mongodb_path: str,
+        concurrency: int = 8,
+        batch_size: int = 100,
+        dry_run: bool = False,
+    ):
         self.logger = logging.getLogger('blackangus:v1_v2_migrator')
         self.config: Config = load(Path(config))
         self.image_path = image_path
         self.prev_mongodb_path = prev_mongodb_path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.report = MigrationReport()
+        # 실패한 문서가 있는 단계는 그 뒤로 체크포인트를 옮기지 않아서 다음에 다시 시도한다.
+        self.frozen_checkpoints: Dict[str, bool] = {}
+        # (sha256, 확장자) -> S3 경로. 내용이 같은 v1 파일은 한 번만 올린다.
+        self.uploads: Dict[Tuple[str, str], 'asyncio.Task[str]'] = {}
 
         self.s3_bucket = self.config.emoticon.s3_bucket
         self.s3 = boto3.client(
@@ -32,124 +105,399 @@ class V1V2Migrator:
             aws_secret_access_key=self.config.emoticon.s3_secret_key,
         )
 
-    def run(self):
+    def run(self, verify: bool = False) -> MigrationReport:
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.migrate())
-        loop.close()
+        try:
+            return loop.run_until_complete(self.verify() if verify else self.migrate())
+        finally:
+            loop.close()
 
-    async def migrate(self):
+    async def connect(
+        self, read_only: bool = False
+    ) -> motor.motor_asyncio.AsyncIOMotorDatabase:
         v1_db_client = motor.motor_asyncio.AsyncIOMotorClient(self.prev_mongodb_path)
         v2_db_client = motor.motor_asyncio.AsyncIOMotorClient(self.config.mongodb.url)
 
         v1_db = v1_db_client.get_default_database()
         assert v1_db is not None
 
-        v1_session = await v1_db_client.start_session()
-        v1_linecon = v1_db.get_collection('linecons')
-        v1_lineconcategory = v1_db.get_collection('lineconcategories')
-        v1_emoticon = v1_db.get_collection('emoticons')
+        database = v2_db_client[self.config.mongodb.database_name]
+        document_models: List[Any] = [
+            # 여기에 관련된 MongoDB 모델들을 넣어주세요.
+            EmoticonModel,
+            LineconModel,
+            MigrationCheckpointModel,
+        ]
+        if read_only:
+            await ReadOnlyInitializer(
+                database=database, document_models=document_models
+            )
+        else:
+            await init_beanie(database=database, document_models=document_models)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return v1_db
 
-        await init_beanie(
-            database=v2_db_client[self.config.mongodb.database_name],
-            document_models=[
-                # 여기에 관련된 MongoDB 모델들을 넣어주세요.
-                EmoticonModel,
-                LineconModel,
-            ],
-        )
+    async def migrate(self) -> MigrationReport:
+        v1_db = await self.connect(read_only=self.dry_run)
 
         # 라인 이모티콘부터 하나씩 해보자.
-        async for category in v1_lineconcategory.find({}, session=v1_session):
+        await self.migrate_linecons(v1_db)
+        # 이모티콘도 해보자. 이건 더 쉽다.
+        await self.migrate_emoticons(v1_db)
+
+        self.logger.info(
+            f'Migration {"planned" if self.dry_run else "completed"}: '
+            f'migrated={self.report.migrated}, skipped={self.report.skipped}, '
+            f'failed={self.report.failed}'
+        )
+        return self.report
+
+    # 체크포인트
+
+    async def load_checkpoint(self, stage: str) -> Optional[ObjectId]:
+        checkpoint = await MigrationCheckpointModel.find_one(
+            {'_id': f'v1_to_v2:{stage}'}
+        )
+        if checkpoint is None or checkpoint.last_id is None:
+            return None
+
+        self.logger.info(
+            f'Resuming {stage} after {checkpoint.last_id} '
+            f'({checkpoint.migrated} already migrated)'
+        )
+        return ObjectId(checkpoint.last_id)
+
+    async def save_checkpoint(self, stage: str, last_id: ObjectId, count: int):
+        if self.dry_run or self.frozen_checkpoints.get(stage, False):
+            return
+
+        await MigrationCheckpointModel.find_one({'_id': f'v1_to_v2:{stage}'}).upsert(
+            {
+                '$set': {'last_id': str(last_id), 'updated_at': datetime.now()},
+                '$inc': {'migrated': count},
+            },
+            on_insert=MigrationCheckpointModel(
+                id=f'v1_to_v2:{stage}', last_id=str(last_id), migrated=count
+            ),
+        )
+
+    def legacy_query(
+        self, query: Dict[str, Any], after: Optional[ObjectId]
+    ) -> Dict[str, Any]:
+        if after is None:
+            return query
+        return {**query, '_id': {'$gt': after}}
+
+    # 파일과 문서
+
+    def legacy_file(self, legacy_path: str) -> Path:
+        return Path(f'{self.image_path}{legacy_path}')
+
+    def stored_digest(self, key: str) -> Optional[str]:
+        """S3에 올라간 파일의 sha256을 돌려줍니다. 파일이 없으면 None입니다."""
+        try:
+            response = self.s3.head_object(Bucket=self.s3_bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return None
+            raise
+        return response.get('Metadata', {}).get('sha256', '')
+
+    def upload_sync(self, file: Path, digest: str, extension: str) -> str:
+        # 같은 내용의 파일은 항상 같은 S3 경로로 올라간다.
+        key = f'images/emoticons/{migrated_id("sha256", digest)}.{extension}'
+        if self.dry_run:
+            return key
+
+        # 예전에 실행했을 때 이미 올렸으면 다시 올리지 않는다.
+        if self.stored_digest(key) == digest:
+            return key
+
+        try:
+            # upload_fileobj는 파일을 조금씩 읽어서 올리므로 파일 크기와 상관없이 메모리를 일정하게 쓴다.
+            with file.open('rb') as f:
+                self.s3.upload_fileobj(
+                    f,
+                    self.s3_bucket,
+                    key,
+                    ExtraArgs={'Metadata': {'sha256': digest}},
+                )
+        except Exception as e:
+            raise EmoticonException(f'S3 저장에 실패했습니다: {e}')
+        return key
+
+    async def upload(self, legacy_path: str) -> str:
+        # 파일 읽기와 boto3 호출은 블로킹이므로 스레드에서 하고, 동시에 올리는 수는 제한한다.
+        async with self.semaphore:
+            file = self.legacy_file(legacy_path)
+            digest = await asyncio.to_thread(digest_file, file)
+            extension = file.suffix.replace('.', '')
+
+            task = self.uploads.get((digest, extension))
+            if task is None:
+                task = asyncio.create_task(
+                    asyncio.to_thread(self.upload_sync, file, digest, extension)
+                )
+                self.uploads[(digest, extension)] = task
+            else:
+                self.report.add(self.report.skipped, 'files')
+
+            return await asyncio.shield(task)
+
+    async def insert(
+        self, stage: str, model: Type[Document], documents: Sequence[Document]
+    ):
+        if self.dry_run or len(documents) == 0:
+            return
+
+        try:
+            await model.get_motor_collection().insert_many(
+                [get_dict(document, to_db=True) for document in documents],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                # 이미 옮긴 문서(같은 _id)는 건너뛴다.
+                if error.get('code') == DUPLICATE_KEY and set(
+                    error.get('keyPattern', {'_id': 1}).keys()
+                ) == {'_id'}:
+                    self.report.add(self.report.skipped, stage)
+                    continue
+
+                # 이름이 겹치는 등 다른 이유로 못 넣은 문서는 기록만 하고 계속 간다.
+                self.logger.error(
+                    f'Failed to insert {model.__name__}: {error.get("errmsg")}'
+                )
+                self.report.add(self.report.failed, stage)
+                self.frozen_checkpoints[stage] = True
+
+    async def upload_all(
+        self, stage: str, items: List[Dict[str, Any]], path_key: str
+    ) -> Tuple[List[Tuple[Dict[str, Any], str]], bool]:
+        """items의 파일을 동시에 올리고 (v1 문서, S3 경로) 목록과 모두 성공했는지를 돌려줍니다."""
+        paths = await asyncio.gather(
+            *map(lambda x: self.upload(x[path_key]), items), return_exceptions=True
+        )
+
+        uploaded = []
+        succeeded = True
+        for (item, path) in zip(items, paths):
+            if isinstance(path, BaseException):
+                self.logger.error(f'Failed to migrate {stage} item: {item["name"]}')
+                self.logger.error(str(path))
+                self.report.add(self.report.failed, stage)
+                succeeded = False
+            else:
+                uploaded.append((item, path))
+        return uploaded, succeeded
+
+    # 단계별 마이그레이션
+
+    async def migrate_linecons(self, v1_db: motor.motor_asyncio.AsyncIOMotorDatabase):
+        stage = 'linecons'
+        after = await self.load_checkpoint(stage)
+
+        async for category in v1_db.get_collection('lineconcategories').find(
+            self.legacy_query({}, after), sort=[('_id', 1)]
+        ):
             self.logger.info(f'Migrating linecon category: {category["name"]}')
+            linecon_id = migrated_id('lineconcategory', category['_id'])
+
+            items = (
+                await v1_db.get_collection('linecons')
+                .find(
+                    {
+                        'category': category['_id'],
+                        'removed': False,
+                    },
+                    sort=[('_id', 1)],
+                )
+                .to_list(None)
+            )
+
+            (uploaded, succeeded) = await self.upload_all(stage, items, 'fullPath')
+            await self.insert(
+                stage,
+                LineconModel,
+                [
+                    LineconModel(
+                        id=linecon_id,
+                        name=category['name'],
+                        line_id=category['originId'],
+                        title=category['title'],
+                    )
+                ],
+            )
+            await self.insert(
+                stage,
+                EmoticonModel,
+                [
+                    EmoticonModel(
+                        id=migrated_id('linecon', item['_id']),
+                        name=item['name'],
+                        original_url='',
+                        image_path=path,
+                        removed=False,
+                        image_from=EmoticonFrom.LINE,
+                        relation_id=linecon_id,
+                        migrated_from_v1=True,
+                    )
+                    for (item, path) in uploaded
+                ],
+            )
 
-            new_item = await LineconModel(
-                name=category['name'],
-                line_id=category['originId'],
-                title=category['title'],
-            ).create()
+            self.report.add(self.report.migrated, stage, len(uploaded))
+            if not succeeded:
+                self.frozen_checkpoints[stage] = True
+            await self.save_checkpoint(stage, category['_id'], 1)
 
-            async for legacy_item in v1_linecon.find(
+    async def migrate_emoticons(self, v1_db: motor.motor_asyncio.AsyncIOMotorDatabase):
+        stage = 'emoticons'
+        after = await self.load_checkpoint(stage)
+        batch: List[Dict[str, Any]] = []
+
+        async for legacy_item in v1_db.get_collection('emoticons').find(
+            self.legacy_query(
                 {
-                    'category': category['_id'],
                     'removed': False,
+                    'category': {
+                        '$exists': False,
+                    },
                 },
-                session=v1_session,
-            ):
-                self.logger.info(f'Migrating linecon item: {legacy_item["name"]}')
-                path = f'images/emoticons/{uuid4()}'
-
-                file = open(f'{self.image_path}{legacy_item["fullPath"]}', 'rb')
-                file_path = transfer_file_from_bytes(
-                    content=file.read(),
-                    extension=Path(legacy_item['fullPath']).suffix,
-                    bucket=self.s3_bucket,
-                    s3=self.s3,
-                    s3_path=path,
-                )
+                after,
+            ),
+            sort=[('_id', 1)],
+        ):
+            batch.append(legacy_item)
+            if len(batch) >= self.batch_size:
+                await self.migrate_emoticon_batch(stage, batch)
+                batch = []
+
+        if len(batch) > 0:
+            await self.migrate_emoticon_batch(stage, batch)
+
+    async def migrate_emoticon_batch(self, stage: str, batch: List[Dict[str, Any]]):
+        (uploaded, succeeded) = await self.upload_all(stage, batch, 'path')
 
-                await EmoticonModel(
-                    name=legacy_item['name'],
+        documents: List[EmoticonModel] = []
+        for (legacy_item, path) in uploaded:
+            names = [legacy_item['name'], *legacy_item.get('equivalents', list())]
+            documents.extend(
+                EmoticonModel(
+                    id=migrated_id('emoticon', legacy_item['_id'], name),
+                    name=name,
                     original_url='',
-                    image_path=file_path,
+                    image_path=path,
                     removed=False,
-                    image_from=EmoticonFrom.LINE,
-                    relation_id=new_item.id,
+                    image_from=EmoticonFrom.WEB,
                     migrated_from_v1=True,
-                ).create()
+                )
+                for name in names
+            )
 
-                file.close()
+        await self.insert(stage, EmoticonModel, documents)
+        self.report.add(self.report.migrated, stage, len(uploaded))
+        self.logger.info(
+            f'Migrated {self.report.migrated.get(stage, 0)} emoticon items '
+            f'(last id: {batch[-1]["_id"]})'
+        )
+
+        if not succeeded:
+            self.frozen_checkpoints[stage] = True
+        await self.save_checkpoint(stage, batch[-1]['_id'], len(uploaded))
+
+    # 검증
+
+    def verify_file_sync(self, legacy_path: str, key: str) -> bool:
+        file = self.legacy_file(legacy_path)
+        response = self.s3.head_object(Bucket=self.s3_bucket, Key=key)
+        stored = response.get('Metadata', {}).get('sha256')
+        if stored is not None:
+            return stored == digest_file(file)
+
+        # sha256을 남기기 전에 put_object로 한 번에 올린 파일은 ETag가 내용의 MD5다.
+        return response['ETag'].strip('"') == digest_file(file, 'md5')
+
+    async def verify_file(self, stage: str, legacy_path: str, document_id: UUID):
+        async with self.semaphore:
+            document = await EmoticonModel.find_one({'_id': document_id})
+            if document is None:
+                self.logger.error(f'Missing {stage} document for {legacy_path}')
+                self.report.add(self.report.failed, stage)
+                return
 
-        # 이모티콘도 하나씩 해보자. 이건 더 쉽다.
-        async for legacy_item in v1_emoticon.find(
-            {
-                'removed': False,
-                'category': {
-                    '$exists': False,
-                },
-            },
-            session=v1_session,
-        ):
             try:
-                self.logger.info(f'Migrating emoticon item: {legacy_item["name"]}')
-                path = f'images/emoticons/{uuid4()}'
-
-                self.logger.debug(legacy_item)
-                self.logger.debug(f'{self.image_path}{legacy_item["path"]}')
-
-                file = open(f'{self.image_path}{legacy_item["path"]}', 'rb')
-                file_path = transfer_file_from_bytes(
-                    content=file.read(),
-                    extension=Path(legacy_item['path']).suffix.replace('.', ''),
-                    bucket=self.s3_bucket,
-                    s3=self.s3,
-                    s3_path=path,
+                matched = await asyncio.to_thread(
+                    self.verify_file_sync, legacy_path, document.image_path
                 )
+            except Exception as e:
+                self.logger.error(f'Failed to verify {legacy_path}: {e}')
+                matched = False
 
-                if len(legacy_item.get('equivalents', list())) > 0:
-                    names = [legacy_item['name'], *legacy_item['equivalents']]
-                else:
-                    names = [legacy_item['name']]
-
-                await asyncio.gather(
-                    *map(
-                        lambda x: EmoticonModel(
-                            name=x,
-                            original_url='',
-                            image_path=file_path,
-                            removed=False,
-                            image_from=EmoticonFrom.WEB,
-                            migrated_from_v1=True,
-                        ).create(),
-                        names,
-                    )
+            if matched:
+                self.report.add(self.report.migrated, stage)
+            else:
+                self.logger.error(f'Checksum mismatch: {legacy_path}')
+                self.report.add(self.report.failed, stage)
+
+    async def verify(self) -> MigrationReport:
+        """
+        v1 문서 수와 옮긴 문서 수를 비교하고, 옮긴 파일의 체크섬이 원본과 같은지 확인합니다.
+        아무것도 쓰지 않습니다.
+        """
+        v1_db = await self.connect(read_only=True)
+        tasks = []
+
+        legacy_linecons = 0
+        async for item in v1_db.get_collection('linecons').find({'removed': False}):
+            legacy_linecons += 1
+            tasks.append(
+                self.verify_file(
+                    'linecons', item['fullPath'], migrated_id('linecon', item['_id'])
                 )
+            )
 
-                file.close()
-            except Exception as e:
-                self.logger.error(
-                    f'Failed to migrate emoticon item: {legacy_item["name"]}'
+        legacy_emoticons = 0
+        async for item in v1_db.get_collection('emoticons').find(
+            {'removed': False, 'category': {'$exists': False}}
+        ):
+            legacy_emoticons += 1 + len(item.get('equivalents', list()))
+            tasks.append(
+                self.verify_file(
+                    'emoticons',
+                    item['path'],
+                    migrated_id('emoticon', item['_id'], item['name']),
                 )
-                self.logger.error(str(e))
+            )
+
+        await asyncio.gather(*tasks)
+
+        counts = {
+            'linecons': (
+                legacy_linecons,
+                await EmoticonModel.find(
+                    {'migrated_from_v1': True, 'image_from': EmoticonFrom.LINE.value}
+                ).count(),
+            ),
+            'emoticons': (
+                legacy_emoticons,
+                await EmoticonModel.find(
+                    {'migrated_from_v1': True, 'image_from': EmoticonFrom.WEB.value}
+                ).count(),
+            ),
+        }
+        for (stage, (legacy, migrated)) in counts.items():
+            if legacy == migrated:
+                self.logger.info(f'{stage}: v1 {legacy}, v2 {migrated}')
+                continue
 
-        await v1_session.end_session()
-        self.logger.info('Migration completed.')
+            # 체크섬이 모두 맞아도 문서 수가 다르면 실패로 남긴다.
+            self.logger.error(f'{stage}: v1 {legacy}, v2 {migrated}')
+            self.report.add(
+                self.report.failed, f'{stage}_count', abs(legacy - migrated)
+            )
+
+        self.logger.info(
+            f'Verified checksums: ok={self.report.migrated}, failed={self.report.failed}'
+        )
+        return self.report
@@ -2,8 +2,10 @@ from datetime import datetime
 from typing import Optional
 from uuid import uuid4, UUID
 
+import pymongo
 from beanie import Document
-from pydantic import Field
+from pydantic import Field, BaseModel
+from pymongo import IndexModel
 
 
 class AlarmModel(Document):
@@ -32,3 +34,26 @@ class AlarmModel(Document):
     # 마지막 작동한 시간
     last_activated_at: Optional[datetime] = Field(default=None)
     enabled: bool = Field(default=True)
+
+    class Settings:
+        indexes = [
+            # 사용자의 알람 찾기, 목록
+            IndexModel(
+                [('created_by', pymongo.ASCENDING), ('name', pymongo.ASCENDING)],
+                name='created_by_name_enabled',
+                partialFilterExpression={'enabled': True},
+            ),
+            # 매분 울릴 알람 찾기
+            IndexModel(
+                [('enabled', pymongo.ASCENDING), ('time', pymongo.ASCENDING)],
+                name='enabled_time',
+            ),
+        ]
+
+
+# 알람 목록에 보여줄 필드만 읽습니다.
+class AlarmListView(BaseModel):
+    name: str
+    is_repeat: bool
+    time: Optional[datetime]
+    crontab: Optional[str]
@@ -1,9 +1,13 @@
 import dataclasses
 from datetime import datetime
+from enum import Enum
+from typing import List, Optional
 from uuid import UUID, uuid4
 
+import pymongo
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
 
 
 @dataclasses.dataclass
@@ -25,3 +29,68 @@ class LineconModel(Document):
     created_at: datetime = Field(default_factory=datetime.now)
 
     removed: bool = Field(default=False, required=False)
+
+    # 이름 인덱스는 migration/indexes.py에서 따로 만듭니다.
+
+
+# 목록에 보여줄 때 필요한 필드만 읽습니다.
+class LineconListView(BaseModel):
+    id: UUID = Field(alias='_id')
+
+    name: str
+
+    title: str
+
+
+class LineconImportStatus(Enum):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+# 가져올 스티커 하나, emoticon_id는 작업 ID에서 정해지므로 다시 시도해도 같은 값입니다.
+class LineconImportItemModel(BaseModel):
+    index: int
+    type: str
+    item_id: str
+    url: str
+    sound_url: Optional[str] = Field(default=None)
+    emoticon_id: UUID
+    done: bool = Field(default=False)
+
+
+# 라인 상품 하나를 가져오는 작업, 스티커를 하나 가져올 때마다 done을 저장해서
+# 봇이 다시 켜지거나 실패한 뒤에 다시 시도하면 남은 스티커부터 이어서 가져옵니다.
+class LineconImportJobModel(Document):
+    # (리전, 상품 ID, 이름)에서 만든 UUID라서 같은 요청은 같은 작업이 됩니다.
+    id: UUID  # type: ignore
+
+    region: str
+    line_id: int
+    name: str = Field(min_length=1, max_length=10)
+    title: str
+
+    # 만들 LineconModel의 ID
+    linecon_id: UUID
+
+    items: List[LineconImportItemModel] = Field(default_factory=list)
+
+    status: LineconImportStatus = Field(default=LineconImportStatus.PENDING)
+    error: Optional[str] = Field(default=None)
+
+    # 작업이 끝나면 알려줄 채널과 요청한 사람
+    channel_id: Optional[int] = Field(default=None)
+    created_by: Optional[int] = Field(default=None)
+
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        indexes = [
+            # 봇이 켜질 때 이어서 할 작업 찾기
+            IndexModel([('status', pymongo.ASCENDING)], name='status'),
+        ]
+
+
+class LineconImportJobView(BaseModel):
+    id: UUID = Field(alias='_id')
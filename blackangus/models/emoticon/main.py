@@ -1,11 +1,15 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
 
 import pymongo
-from beanie import Document, Indexed
+from beanie import Document
 from pydantic import Field, BaseModel
+from pymongo import IndexModel
+
+# 서비스는 항상 삭제되지 않은 이모티콘만 찾기 때문에 인덱스도 그 문서만 담습니다.
+LIVE_EMOTICONS = {'removed': False}
 
 
 # 이모티콘 출처를 새롭게 저장합니다.
@@ -15,13 +19,30 @@ class EmoticonFrom(Enum):
     DCINSIDE = 'dcinside'
 
 
+# 디스코드에 보내려고 원본을 줄이거나 다시 압축해서 따로 저장한 이미지
+class EmoticonVariantModel(BaseModel):
+    path: str
+    format: str
+    width: int
+    height: int
+    size: int
+
+
+# 올릴 때 헤더에서 읽은 원본 이미지 정보
+class EmoticonImageInfoModel(BaseModel):
+    # 실제 내용으로 알아낸 확장자 (png, gif, jpg, webp)
+    format: str
+    width: int
+    height: int
+    frames: int
+    size: int
+
+
 # 기존 인공흑우 v1와 비슷하면서도 조금 더 간결해진 데이터 구조를 사용합니다.
 class EmoticonModel(Document):
     id: UUID = Field(default_factory=uuid4)  # type: ignore
 
-    name: Indexed(typ=str, index_type=pymongo.TEXT, unique=False) = Field(  # type: ignore
-        required=True, min_length=1, max_length=10
-    )
+    name: str = Field(required=True, min_length=1, max_length=10)
 
     original_url: str = Field(required=True)
 
@@ -29,6 +50,9 @@ class EmoticonModel(Document):
 
     original_image_path: str = Field(required=False, default=None)
 
+    # 예전에 올린 이모티콘에는 없습니다.
+    image_info: Optional[EmoticonImageInfoModel] = Field(default=None)
+
     image_from: EmoticonFrom = Field(default_factory=lambda: EmoticonFrom.WEB)
 
     # Line용 필드
@@ -37,6 +61,9 @@ class EmoticonModel(Document):
     # LineconCategoryModel, DcconCategoryModel의 ID와 연결되는 기능
     relation_id: Optional[UUID] = Field(default=None)
 
+    # 원본(image_path)보다 작게 만든 이미지들, 보낼 때는 가장 작은 것을 씁니다.
+    variants: List[EmoticonVariantModel] = Field(default_factory=list)
+
     removed: bool = Field(default=False)
 
     created_at: datetime = Field(default_factory=datetime.now)
@@ -45,6 +72,45 @@ class EmoticonModel(Document):
 
     migrated_from_v1: bool = Field(default=False, required=False)
 
+    class Settings:
+        # 이름 인덱스(이름으로 찾기, 이름순 목록, 살아있는 이름은 하나만)는
+        # 예전 데이터에 겹치는 이름이 있을 수 있어서 migration/indexes.py에서 따로 만듭니다.
+        indexes = [
+            # 복제된 이모티콘(같은 원본 URL) 찾기
+            IndexModel(
+                [('original_url', pymongo.ASCENDING)],
+                name='original_url_live',
+                partialFilterExpression=LIVE_EMOTICONS,
+            ),
+            # 라인콘에 딸린 이모티콘 찾기
+            IndexModel(
+                [('relation_id', pymongo.ASCENDING)],
+                name='relation_id_live',
+                partialFilterExpression=LIVE_EMOTICONS,
+            ),
+        ]
+
 
 class EmoticonListView(BaseModel):
     name: str
+
+
+class EmoticonRelationView(BaseModel):
+    name: str
+    relation_id: Optional[UUID]
+
+
+# 이모티콘을 보낼 때 필요한 필드만 읽습니다.
+class EmoticonImageView(BaseModel):
+    name: str
+    image_path: str
+    variants: List[EmoticonVariantModel] = Field(default_factory=list)
+
+
+# 이모티콘을 복제하거나 고칠 때 원본을 찾기 위한 필드만 읽습니다.
+class EmoticonSourceView(BaseModel):
+    id: UUID = Field(alias='_id')
+    original_url: str
+    image_path: str
+    image_info: Optional[EmoticonImageInfoModel] = Field(default=None)
+    variants: List[EmoticonVariantModel] = Field(default_factory=list)
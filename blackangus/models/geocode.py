@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+import pymongo
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+
+# 장소의 좌표는 거의 바뀌지 않으므로 오래 들고 있습니다.
+GEOCODE_CACHE_TTL = timedelta(days=90)
+
+
+# Google Geocoding API로 찾은 좌표를 저장해서 같은 장소를 다시 찾지 않게 합니다.
+class GeocodeCacheModel(Document):
+    # normalize_address로 정리한 주소
+    id: str  # type: ignore
+
+    latitude: float
+    longitude: float
+
+    # TTL 인덱스는 UTC 기준으로 문서를 지우므로 UTC로 저장합니다.
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        indexes = [
+            # GEOCODE_CACHE_TTL이 지난 좌표는 MongoDB가 알아서 지운다.
+            IndexModel(
+                [('created_at', pymongo.ASCENDING)],
+                name='created_at_ttl',
+                expireAfterSeconds=int(GEOCODE_CACHE_TTL.total_seconds()),
+            ),
+        ]
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+
+
+# 마이그레이션 단계마다 어디까지 옮겼는지 기록합니다.
+class MigrationCheckpointModel(Document):
+    # 'v1_to_v2:emoticons' 같은 단계 이름
+    id: str  # type: ignore
+
+    # 마지막으로 옮긴 v1 문서의 _id (ObjectId 문자열), 다음에는 이 뒤부터 옮깁니다.
+    last_id: Optional[str] = Field(default=None)
+
+    # 지금까지 옮긴 v1 문서 수
+    migrated: int = Field(default=0)
+
+    updated_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+from uuid import uuid4
+
+from beanie import Document
+from beanie.odm.utils.encoder import Encoder
+
+from blackangus.models.alarm import AlarmModel
+from blackangus.models.emoticon.linecon import LineconModel
+from blackangus.models.emoticon.main import EmoticonModel
+from blackangus.models.subscribe import RSSSubscriptionModel
+
+# 서비스와 앱에서 자주 쓰는 쿼리 모양 (모델, 조건, 정렬)
+# 쿼리를 새로 추가하면 여기에도 넣어서 인덱스를 타는지 확인해주세요.
+CANONICAL_QUERIES: List[Tuple[Type[Document], Dict[str, Any], Optional[str]]] = [
+    (EmoticonModel, {'name': 'EMOTICON', 'removed': False}, None),
+    (EmoticonModel, {'name': {'$in': ['A', 'B']}, 'removed': False}, None),
+    (EmoticonModel, {'removed': False}, 'name'),
+    (EmoticonModel, {'original_url': 'https://', 'removed': False}, None),
+    (EmoticonModel, {'relation_id': {'$in': [uuid4()]}, 'removed': False}, None),
+    (LineconModel, {'name': 'LINECON', 'removed': False}, None),
+    (LineconModel, {'removed': False}, 'name'),
+    (AlarmModel, {'created_by': 0, 'name': 'ALARM', 'enabled': True}, None),
+    (AlarmModel, {'created_by': 0, 'enabled': True}, None),
+    (AlarmModel, {'enabled': True, 'time': {'$lte': datetime.now()}}, None),
+    (RSSSubscriptionModel, {}, 'created_at'),
+]
+
+
+def find_stages(plan: Any, stage: str) -> bool:
+    if isinstance(plan, dict):
+        if plan.get('stage') == stage:
+            return True
+        return any(find_stages(value, stage) for value in plan.values())
+
+    if isinstance(plan, list):
+        return any(find_stages(value, stage) for value in plan)
+
+    return False
+
+
+async def warn_on_collection_scans(
+    queries: List[
+        Tuple[Type[Document], Dict[str, Any], Optional[str]]
+    ] = CANONICAL_QUERIES
+) -> List[str]:
+    """
+    자주 쓰는 쿼리를 explain()으로 확인해서 컬렉션 전체를 훑는(COLLSCAN) 쿼리를 경고합니다.
+    봇이 시작할 때 인덱스가 빠졌는지 알아채기 위한 것이라 실패해도 봇은 계속 뜹니다.
+    """
+    logger = logging.getLogger('blackangus:query_plan')
+    encoder = Encoder(to_db=True)
+    scans: List[str] = []
+
+    for (model, query, sort) in queries:
+        description = f'{model.__name__}.find({query}, sort={sort})'
+        cursor = model.get_motor_collection().find(encoder.encode(query))
+        if sort is not None:
+            cursor = cursor.sort(sort)
+
+        try:
+            plan = await cursor.explain()
+        except Exception as e:
+            # mongomock처럼 explain을 지원하지 않는 경우
+            logger.debug('쿼리 계획을 확인하지 못했습니다: %s (%s)', description, e)
+            continue
+
+        if find_stages(plan.get('queryPlanner', {}).get('winningPlan'), 'COLLSCAN'):
+            scans.append(description)
+            logger.warning('인덱스를 타지 않는 쿼리입니다: %s', description)
+
+    return scans
@@ -2,8 +2,10 @@ from datetime import datetime
 from typing import Optional
 from uuid import uuid4, UUID
 
+import pymongo
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel
 
 
 class RSSSubscriptionModel(Document):
@@ -31,6 +33,11 @@ class RSSSubscriptionModel(Document):
     # 마지막 '업로드' 시간
     latest_published_at: Optional[datetime] = Field(default=None)
 
+    class Settings:
+        indexes = [
+            IndexModel([('created_at', pymongo.ASCENDING)], name='created_at'),
+        ]
+
 
 class RSSDocumentModel(Document):
     # ID는 UUID로
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pymongo
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+
+# 번역 결과는 파파고 모델이 바뀌면 달라질 수 있으므로 적당히 들고 있다가 버립니다.
+TRANSLATION_CACHE_TTL = timedelta(days=30)
+
+
+# 파파고로 번역한 결과를 저장해서 같은 문장을 다시 번역하지 않게 합니다.
+class TranslationCacheModel(Document):
+    # '원문 언어:번역 언어:원문의 sha256'
+    id: str  # type: ignore
+
+    translated_text: str
+
+    # TTL 인덱스는 UTC 기준으로 문서를 지우므로 UTC로 저장합니다.
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        indexes = [
+            # TRANSLATION_CACHE_TTL이 지난 번역은 MongoDB가 알아서 지운다.
+            IndexModel(
+                [('created_at', pymongo.ASCENDING)],
+                name='created_at_ttl',
+                expireAfterSeconds=int(TRANSLATION_CACHE_TTL.total_seconds()),
+            ),
+        ]
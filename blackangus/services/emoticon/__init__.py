@@ -1,15 +1,22 @@
+import dataclasses
 from enum import Enum
 
 
 # Base Exception
 from io import BytesIO
-from typing import Tuple
-from urllib.parse import urlparse
+from typing import List, Optional, Tuple, Union
 
 import httpx
 from mypy_boto3_s3 import S3Client
+from PIL import Image
 
-from blackangus.models.emoticon.main import EmoticonModel
+from blackangus.models.emoticon.main import (
+    EmoticonModel,
+    EmoticonImageView,
+    EmoticonImageInfoModel,
+)
+from blackangus.utils.metrics import external_call
+from blackangus.utils.retry import RetryableError, parse_retry_after, retry
 
 
 class EmoticonException(BaseException):
@@ -22,29 +29,190 @@ class RegionEnum(Enum):
     JP = 'jp'
 
 
-# 이 이미지의 확장자를 URL에서 파악합니다. 복잡한 이미지 컨텐츠 분석은 하지 않습니다.
-def get_extension_of_file(url: str) -> str:
-    parsed = urlparse(url).path.split('.')[-1]
-    return parsed if parsed in ['jpg', 'jpeg', 'png', 'gif', 'webp'] else 'jpg'
+# 파일 앞부분의 매직 바이트로 실제 이미지 형식을 알아냅니다. 확장자는 믿지 않습니다.
+IMAGE_SIGNATURES: List[Tuple[bytes, str]] = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'\xff\xd8\xff', 'jpg'),
+]
 
+# 형식을 알아내려면 처음 몇 바이트가 필요한지 (WebP는 12바이트)
+SNIFF_BYTES = 12
 
-# 이미지 다운로드, 최대 3회 재시도함
+# 이모티콘 이미지 하나의 최대 크기
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# 이미지 하나를 받는 데 쓸 시간, read는 조각 하나를 기다리는 시간입니다.
+DOWNLOAD_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# 다시 시도해볼 만한 응답 코드
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """이미지면 확장자('png', 'gif', 'jpg', 'webp')를, 아니면 None을 돌려줍니다."""
+    for (signature, extension) in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+
+    return None
+
+
+@dataclasses.dataclass
+class DownloadedImage:
+    content: bytes
+    info: EmoticonImageInfoModel
+
+    @property
+    def extension(self) -> str:
+        return self.info.format
+
+
+def read_image_info(content: bytes, extension: str) -> EmoticonImageInfoModel:
+    # Image.open은 헤더만 읽고 픽셀은 풀지 않는다.
+    try:
+        image = Image.open(BytesIO(content))
+        with image:
+            (width, height) = image.size
+            frames = getattr(image, 'n_frames', 1)
+    except Exception as e:
+        raise EmoticonException(f'이미지를 읽을 수 없습니다: {e}')
+
+    return EmoticonImageInfoModel(
+        format=extension,
+        width=width,
+        height=height,
+        frames=frames,
+        size=len(content),
+    )
+
+
+class ImageBuffer:
+    """
+    응답 본문을 조금씩 받으면서 첫 부분으로 이미지인지 확인하고, 크기 제한을 넘으면 바로 끊습니다.
+    받는 도중에 연결이 끊기면 받은 데까지는 그대로 두고 Range 요청으로 나머지만 이어 받습니다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.extension: Optional[str] = None
+        # 서버가 Range 요청을 받아주는지
+        self.resumable = False
+
+    @property
+    def size(self) -> int:
+        return len(self.buffer)
+
+    def reset(self):
+        self.buffer = bytearray()
+        self.extension = None
+
+    def check_length(self, length: int):
+        if length > self.max_bytes:
+            raise EmoticonException(
+                f'이미지가 너무 큽니다: {length}바이트 (최대 {self.max_bytes}바이트)'
+            )
+
+    def write(self, chunk: bytes):
+        self.buffer += chunk
+
+        if self.extension is None and self.size >= SNIFF_BYTES:
+            self.extension = sniff_image_format(bytes(self.buffer[:SNIFF_BYTES]))
+            if self.extension is None:
+                raise EmoticonException('이미지 파일이 아닙니다.')
+
+        if self.size > self.max_bytes:
+            raise EmoticonException(f'이미지가 너무 큽니다: 최대 {self.max_bytes}바이트')
+
+    def finish(self) -> DownloadedImage:
+        # 아주 작은 파일이라 받는 도중에 확인하지 못했을 때
+        if self.extension is None:
+            self.extension = sniff_image_format(bytes(self.buffer))
+            if self.extension is None:
+                raise EmoticonException('이미지 파일이 아닙니다.')
+
+        content = bytes(self.buffer)
+        return DownloadedImage(
+            content=content, info=read_image_info(content, self.extension)
+        )
+
+
+def content_range_start(value: Optional[str]) -> Optional[int]:
+    # 'bytes 100-199/200' -> 100
+    if value is None or not value.startswith('bytes '):
+        return None
+    start = value[len('bytes ') :].split('-', 1)[0]
+    return int(start) if start.isdigit() else None
+
+
+async def receive_image(response: httpx.Response, image: ImageBuffer):
+    if response.status_code == 206 and image.size > 0:
+        # 이어 받기를 요청한 위치부터 왔는지 확인한다.
+        if content_range_start(response.headers.get('content-range')) != image.size:
+            image.resumable = False
+            image.reset()
+            raise RetryableError('Range 응답이 요청과 다릅니다')
+    else:
+        # 서버가 Range를 무시하고 처음부터 보냈다.
+        image.reset()
+
+    image.resumable = (
+        response.status_code == 206
+        or response.headers.get('accept-ranges', '') == 'bytes'
+    )
+
+    length = response.headers.get('content-length', '')
+    if length.isdigit():
+        image.check_length(image.size + int(length))
+
+    async for chunk in response.aiter_bytes():
+        image.write(chunk)
+
+
+# 이미지 다운로드, 서버 쪽 문제나 연결이 끊긴 경우에만 간격을 늘려가며 다시 시도함
 async def download_file(
     http: httpx.AsyncClient,
     url: str,
-):
-    response = await http.get(url)
+    max_bytes: int = MAX_IMAGE_BYTES,
+    attempts: int = 4,
+) -> DownloadedImage:
+    image = ImageBuffer(max_bytes)
 
-    for i in range(3):
-        if not response.is_success:
-            response = await http.get(url)
-        else:
-            break
+    async def attempt():
+        headers = {}
+        if image.size > 0 and image.resumable:
+            headers['Range'] = f'bytes={image.size}-'
 
-    if not response.is_success:
-        raise EmoticonException(f'이미지 다운로드에 실패했습니다: {response.status_code}')
+        with external_call('http', 'download_file'):
+            async with http.stream(
+                'GET', url, headers=headers, timeout=DOWNLOAD_TIMEOUT
+            ) as response:
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise RetryableError(
+                        f'[{response.status_code}] 이미지 다운로드에 실패했습니다',
+                        parse_retry_after(response.headers.get('retry-after')),
+                    )
 
-    return response.content
+                if not response.is_success:
+                    raise EmoticonException(f'이미지 다운로드에 실패했습니다: {response.status_code}')
+
+                await receive_image(response, image)
+
+    try:
+        await retry(
+            attempt,
+            retry_on=(httpx.TransportError, RetryableError),
+            attempts=attempts,
+        )
+    except (httpx.HTTPError, RetryableError) as e:
+        raise EmoticonException(f'이미지 다운로드에 실패했습니다: {e}')
+
+    return image.finish()
 
 
 def transfer_file_from_bytes(
@@ -68,41 +236,35 @@ def transfer_file_from_bytes(
         raise EmoticonException(f'S3 저장에 실패했습니다: {e}')
 
 
-# 특정 URL의 파일을 다운로드하고, S3에 올립니다.
-async def transfer_file(
-    http: httpx.AsyncClient,
-    url: str,
-    s3: S3Client,
-    bucket: str,
-    s3_path: str,
-) -> str:
-    data = await download_file(http, url)
-    return transfer_file_from_bytes(
-        data,
-        get_extension_of_file(url),
-        s3,
-        bucket,
-        s3_path,
-    )
+# 디스코드로 보낼 파일 경로, 미리 줄여둔 이미지가 있으면 그 중 가장 작은 것을 씁니다.
+def get_delivery_path(model: Union[EmoticonModel, EmoticonImageView]) -> str:
+    if len(model.variants) == 0:
+        return model.image_path
+    return min(model.variants, key=lambda x: x.size).path
 
 
 # 디스코드에서 쓰기 위해 파일을 다운로드 받습니다.
+# original이 참이면 줄인 이미지 대신 원본을 받습니다.
 def download_emoticon(
-    s3: S3Client, bucket: str, model: EmoticonModel
+    s3: S3Client,
+    bucket: str,
+    model: Union[EmoticonModel, EmoticonImageView],
+    original: bool = False,
 ) -> Tuple[str, BytesIO]:
+    path = model.image_path if original else get_delivery_path(model)
     exists_result = s3.list_objects_v2(
         Bucket=bucket,
-        Prefix=model.image_path,
+        Prefix=path,
     )
 
     if 'Contents' not in exists_result:
         raise EmoticonException(f'{model.name}에 대한 이미지를 찾을 수 없습니다.')
 
-    file_name = model.image_path.split('/')[-1]
+    file_name = path.split('/')[-1]
     file = BytesIO(
         s3.get_object(
             Bucket=bucket,
-            Key=model.image_path,
+            Key=path,
         )['Body'].read()
     )
 
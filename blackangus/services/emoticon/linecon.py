@@ -1,34 +1,76 @@
 import asyncio
+import dataclasses
+import logging
+import re
 from datetime import datetime
-from io import BytesIO
 from tempfile import TemporaryDirectory
-from typing import List, Tuple, Optional, Dict
-from uuid import uuid4
+from typing import Any, Awaitable, Callable, List, Optional, Dict
+from uuid import NAMESPACE_URL, UUID, uuid5
 
 from apnggif import apnggif
-import boto3
 import httpx
-from PIL import Image, PngImagePlugin
+from beanie.odm.utils.dump import get_dict
+from beanie.odm.utils.encoder import Encoder
 from mypy_boto3_s3 import S3Client
+from pymongo.errors import DuplicateKeyError
 
 from blackangus.config import EmoticonConfig
 from blackangus.models.emoticon.base_response import ResponseResultModel
-from blackangus.models.emoticon.linecon import LineconModel
+from blackangus.models.emoticon.linecon import (
+    LineconModel,
+    LineconListView,
+    LineconImportJobModel,
+    LineconImportItemModel,
+    LineconImportStatus,
+    LineconImportJobView,
+)
 from blackangus.models.emoticon.linecon_response import (
     LineconCategoryListModel,
     LineconCategoryModel,
     LineconItemModel,
     LineconCategoryDetailModel,
 )
-from blackangus.models.emoticon.main import EmoticonModel, EmoticonFrom
+from blackangus.models.emoticon.main import (
+    EmoticonModel,
+    EmoticonFrom,
+    EmoticonListView,
+    EmoticonRelationView,
+)
 from blackangus.services.emoticon import (
+    RETRYABLE_STATUS_CODES,
     RegionEnum,
     EmoticonException,
-    transfer_file,
     download_file,
     transfer_file_from_bytes,
 )
 from blackangus.services.emoticon.main import EmoticonService
+from blackangus.services.registry import get_service
+from blackangus.utils.cache import TTLCache
+from blackangus.utils.metrics import external_call, record_cache
+from blackangus.utils.retry import RetryableError, parse_retry_after, retry
+
+# 검색은 금방 끝나야 하고, 묶음 정보는 서버가 스토어를 긁어오느라 조금 더 걸립니다.
+SEARCH_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+ITEM_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# 가져오기 작업과 그 안의 문서 ID를 정할 때 쓰는 UUID 네임스페이스
+IMPORT_NAMESPACE = uuid5(NAMESPACE_URL, 'blackangus:linecon-import')
+
+# 직접 쓰는 쿼리에서 UUID를 MongoDB 형식으로 바꿉니다.
+ENCODER = Encoder(to_db=True)
+
+
+def import_job_id(region: RegionEnum, line_id: int, prefix: str) -> UUID:
+    return uuid5(IMPORT_NAMESPACE, f'{region.value}:{line_id}:{prefix}')
+
+
+@dataclasses.dataclass
+class LineconListExport:
+    # 만들 때의 검색 색인 버전, 라인콘을 추가하거나 지우면 함께 올라갑니다.
+    version: int
+    linecons: List[LineconListView]
+    # 라인콘 ID -> 이모티콘 이름 목록
+    names: Dict[str, List[str]]
 
 
 class LineconService:
@@ -39,40 +81,56 @@ class LineconService:
 
     httpx_client: httpx.AsyncClient
 
-    # 기본적으로 사용할 S3, httpx 클라이언트를 셋업합니다.
+    # S3, httpx 클라이언트는 같은 설정의 EmoticonService와 공유합니다.
     def __init__(self, config: EmoticonConfig):
         self.config = config
-        self.s3 = boto3.client(
-            's3',
-            region_name=config.s3_region,
-            aws_access_key_id=config.s3_access_key,
-            aws_secret_access_key=config.s3_secret_key,
-        )
+        self.emoticon_service = get_service(EmoticonService, config)
 
+        self.s3 = self.emoticon_service.s3
         self.s3_bucket = config.s3_bucket
-        self.httpx_client = httpx.AsyncClient()
-        self.emoticon_service = EmoticonService(config)
+        self.httpx_client = self.emoticon_service.httpx_client
+        self.list_export: Optional[LineconListExport] = None
+        # 이 프로세스에서 실행 중인 가져오기 작업
+        self.import_tasks: Dict[UUID, 'asyncio.Task[LineconImportJobModel]'] = {}
+        # 라인 스토어 검색 결과와 이모티콘 묶음 정보는 자주 바뀌지 않아서 잠시 들고 있습니다.
+        self.search_cache: TTLCache[LineconCategoryListModel] = TTLCache(
+            'line_search', ttl=10 * 60, stale_ttl=60 * 60, max_entries=256
+        )
+        self.item_cache: TTLCache[LineconCategoryDetailModel] = TTLCache(
+            'line_item', ttl=24 * 60 * 60, stale_ttl=7 * 24 * 60 * 60, max_entries=256
+        )
 
-    async def search_list_from_server(
+    async def request_api(
         self,
         region: RegionEnum,
-        keyword: str,
-        page: int = 1,
-        limit: int = 10,
-    ) -> LineconCategoryListModel:
+        operation: str,
+        path: str,
+        timeout: httpx.Timeout,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         endpoint = self.config.api_endpoint.get(region.value, None)
         if endpoint is None:
             raise EmoticonException('설정에 해당 Region의 Endpoint가 없습니다.')
 
-        path = f'{endpoint}/api/v1/line/list'
-        response = await self.httpx_client.get(
-            path,
-            params={
-                'keyword': keyword,
-                'page': page,
-                'limit': limit,
-            },
-        )
+        async def attempt() -> httpx.Response:
+            with external_call('line_api', operation):
+                response = await self.httpx_client.get(
+                    f'{endpoint}{path}', params=params, timeout=timeout
+                )
+            # 서버 쪽 문제일 때만 다시 시도한다.
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                raise RetryableError(
+                    f'[{response.status_code}] API 호출에 실패했습니다',
+                    parse_retry_after(response.headers.get('retry-after')),
+                )
+            return response
+
+        try:
+            response = await retry(
+                attempt, retry_on=(httpx.TransportError, RetryableError)
+            )
+        except (httpx.HTTPError, RetryableError) as e:
+            raise EmoticonException(f'API 호출에 실패했습니다: {e}')
 
         if not response.is_success:
             raise EmoticonException(
@@ -95,6 +153,39 @@ class LineconService:
 
             raise EmoticonException(f'API 호출에 실패했습니다: {pretty_printed}')
 
+        return value
+
+    async def search_list_from_server(
+        self,
+        region: RegionEnum,
+        keyword: str,
+        page: int = 1,
+        limit: int = 10,
+    ) -> LineconCategoryListModel:
+        return await self.search_cache.get_or_fetch(
+            (region, keyword, page, limit),
+            lambda: self.fetch_list(region, keyword, page, limit),
+        )
+
+    async def fetch_list(
+        self,
+        region: RegionEnum,
+        keyword: str,
+        page: int,
+        limit: int,
+    ) -> LineconCategoryListModel:
+        value = await self.request_api(
+            region,
+            'search',
+            '/api/v1/line/list',
+            SEARCH_TIMEOUT,
+            params={
+                'keyword': keyword,
+                'page': page,
+                'limit': limit,
+            },
+        )
+
         counts: int = value.get('data', dict()).get('counts', 0)
         items: List[LineconCategoryModel] = []
         for item in value.get('data', dict()).get('items', []):
@@ -116,38 +207,24 @@ class LineconService:
         region: RegionEnum,
         linecon_id: int,
     ) -> LineconCategoryDetailModel:
-        endpoint = self.config.api_endpoint.get(region.value, None)
-        if endpoint is None:
-            raise EmoticonException('설정에 해당 Region의 Endpoint가 없습니다.')
-
-        path = f'{endpoint}/api/v1/line/{linecon_id}'
-        response = await self.httpx_client.get(path, timeout=None)
-
-        if not response.is_success:
-            raise EmoticonException(
-                f'[{response.status_code}] API 호출에 실패했습니다: {response.text}'
-            )
-
-        value = response.json()
-        success = value.get('result', dict()).get('success', False)
-
-        if not success:
-            message = value.get('result', dict()).get('message', 'Unknown Error')
-            error = value.get('result', dict()).get('error', None)
-            pretty_printed = str(
-                ResponseResultModel(
-                    success=success,
-                    message=message,
-                    error=error,
-                )
-            )
+        return await self.item_cache.get_or_fetch(
+            (region, linecon_id),
+            lambda: self.fetch_item(region, linecon_id),
+        )
 
-            raise EmoticonException(f'API 호출에 실패했습니다: {pretty_printed}')
+    async def fetch_item(
+        self,
+        region: RegionEnum,
+        linecon_id: int,
+    ) -> LineconCategoryDetailModel:
+        value = await self.request_api(
+            region, 'fetch_item', f'/api/v1/line/{linecon_id}', ITEM_TIMEOUT
+        )
 
         item_id: int = value.get('data', dict()).get('item_id', None)
 
         if item_id is None:
-            raise EmoticonException(f'API 호출에 실패했습니다: {response.text}.')
+            raise EmoticonException(f'API 호출에 실패했습니다: {value}.')
 
         title: str = value['data']['title']
         description: str = value['data']['description']
@@ -172,15 +249,33 @@ class LineconService:
             items=items,
         )
 
-    async def create_from_item(
+    async def submit_import(
         self,
+        region: RegionEnum,
         prefix: str,
         detail: LineconCategoryDetailModel,
-    ) -> Tuple[LineconModel, List[EmoticonModel]]:
+        channel_id: Optional[int] = None,
+        created_by: Optional[int] = None,
+    ) -> LineconImportJobModel:
+        """
+        라인 상품을 가져오는 작업을 저장만 하고 돌려줍니다. 실제로 가져오는 건 start_import입니다.
+        같은 요청을 다시 하면 새로 만들지 않고 예전 작업을 돌려주고,
+        실패한 작업이었다면 남은 스티커부터 다시 가져올 수 있게 대기 상태로 돌립니다.
+        """
+        job_id = import_job_id(region, detail.item_id, prefix)
+        job = await self.get_import(job_id)
+
+        if job is not None:
+            if job.status == LineconImportStatus.FAILED:
+                job.status = LineconImportStatus.PENDING
+                job.error = None
+                await self.save_import_status(job)
+            return job
+
         prev_counts = await LineconModel.find(
             {
                 'name': {
-                    '$regex': f'^{prefix}',
+                    '$regex': f'^{re.escape(prefix)}',
                     '$options': 'i',
                 },
                 'removed': False,
@@ -190,81 +285,219 @@ class LineconService:
         if prev_counts > 0:
             raise EmoticonException(f'이미 이모티콘 중 {prefix}로 시작하는 이름이 있습니다.')
 
-        category = await LineconModel(
+        job = LineconImportJobModel(
+            id=job_id,
+            region=region.value,
             line_id=detail.item_id,
             name=prefix,
             title=detail.title,
-        ).create()
+            linecon_id=uuid5(job_id, 'linecon'),
+            items=[
+                LineconImportItemModel(
+                    index=index,
+                    type=item.type,
+                    item_id=item.item_id,
+                    url=item.url,
+                    sound_url=item.sound_url,
+                    emoticon_id=uuid5(job_id, str(index)),
+                )
+                for (index, item) in enumerate(detail.items)
+            ],
+            channel_id=channel_id,
+            created_by=created_by,
+        )
+
+        try:
+            await job.insert()
+        except DuplicateKeyError:
+            # 같은 요청이 동시에 들어왔다.
+            existing = await self.get_import(job_id)
+            if existing is None:
+                raise EmoticonException(f'가져오기 작업을 찾을 수 없습니다: {job_id}')
+            return existing
+
+        return job
+
+    @staticmethod
+    async def get_import(job_id: UUID) -> Optional[LineconImportJobModel]:
+        # Document.get은 ID를 PydanticObjectId로만 받게 적혀 있어서 UUID ID는 직접 찾는다.
+        return await LineconImportJobModel.find_one({'_id': job_id})
 
-        emoticons: List[EmoticonModel] = []
+    @staticmethod
+    async def pending_imports() -> List[UUID]:
+        jobs = await LineconImportJobModel.find(
+            {'status': LineconImportStatus.PENDING.value},
+            projection_model=LineconImportJobView,
+        ).to_list()
+        return list(map(lambda x: x.id, jobs))
 
-        tmpdir = TemporaryDirectory()
+    def start_import(
+        self,
+        job_id: UUID,
+        on_finish: Optional[Callable[[LineconImportJobModel], Awaitable[None]]] = None,
+    ) -> 'asyncio.Task[LineconImportJobModel]':
+        """
+        작업을 백그라운드에서 실행합니다. 이미 실행 중인 작업이면 그 태스크를 돌려줍니다.
+        on_finish는 작업이 끝나거나 실패했을 때 불립니다.
+        """
+        task = self.import_tasks.get(job_id)
+        if task is None:
+            task = asyncio.create_task(self.run_import(job_id, on_finish))
+            self.import_tasks[job_id] = task
+            task.add_done_callback(lambda _: self.import_tasks.pop(job_id, None))
+        return task
+
+    async def run_import(
+        self,
+        job_id: UUID,
+        on_finish: Optional[Callable[[LineconImportJobModel], Awaitable[None]]] = None,
+    ) -> LineconImportJobModel:
+        job = await self.get_import(job_id)
+        if job is None:
+            raise EmoticonException(f'가져오기 작업을 찾을 수 없습니다: {job_id}')
+
+        if job.status == LineconImportStatus.PENDING:
+            try:
+                await self.import_items(job)
+                job.status = LineconImportStatus.DONE
+            except (Exception, EmoticonException) as e:
+                logging.getLogger('blackangus:linecon').exception(
+                    '라인 상품을 가져오지 못했습니다: %s', job_id
+                )
+                job.status = LineconImportStatus.FAILED
+                job.error = str(e)
+            await self.save_import_status(job)
 
-        for i in range(len(detail.items)):
-            item = detail.items[i]
-            current_id = uuid4()
+        if on_finish is not None:
+            await on_finish(job)
+        return job
 
-            content = await download_file(self.httpx_client, item.url)
-            image = Image.open(BytesIO(content))
+    @staticmethod
+    async def save_import_status(job: LineconImportJobModel):
+        await LineconImportJobModel.find({'_id': job.id}).update(
+            {
+                '$set': {
+                    'status': job.status.value,
+                    'error': job.error,
+                    'updated_at': datetime.now(),
+                }
+            }
+        )
+
+    async def import_items(self, job: LineconImportJobModel):
+        # 문서 ID가 정해져 있으므로 다시 시도해도 새 문서가 생기지 않고 덮어쓴다.
+        category = LineconModel(
+            id=job.linecon_id,
+            line_id=job.line_id,
+            name=job.name,
+            title=job.title,
+        )
+        await LineconModel.get_motor_collection().replace_one(
+            ENCODER.encode({'_id': job.linecon_id}),
+            get_dict(category, to_db=True),
+            upsert=True,
+        )
+        self.list_export = None
 
-            if item.type == 'animation' and (
-                type(image) is PngImagePlugin.PngImageFile and image.is_animated
-            ):
-                animated_png = True
-                exported_origin_path = f'{tmpdir.name}/{current_id}.png'
-                exported_converted_path = f'{tmpdir.name}/{current_id}.gif'
+        with TemporaryDirectory() as tmpdir:
+            for item in job.items:
+                if item.done:
+                    continue
 
-                with open(exported_origin_path, 'wb') as file:
-                    file.write(content)
+                await self.import_item(job, item, tmpdir)
 
-                apnggif(
-                    png=exported_origin_path,
-                    gif=exported_converted_path,
+                # 스티커 하나를 가져올 때마다 저장해두고, 다음에는 여기서부터 이어서 한다.
+                await LineconImportJobModel.find({'_id': job.id}).update(
+                    {
+                        '$set': {
+                            f'items.{item.index}.done': True,
+                            'updated_at': datetime.now(),
+                        }
+                    }
                 )
-            else:
-                animated_png = False
-                exported_converted_path = None
-
-            image.close()
-
-            prim_path = f'images/emoticons/{current_id}'
-            file_path = await transfer_file(
-                http=self.httpx_client,
-                url=item.url,
-                s3=self.s3,
-                bucket=self.s3_bucket,
-                s3_path=prim_path,
-            )
+                item.done = True
 
-            if animated_png and exported_converted_path is not None:
-                with open(exported_converted_path, 'rb') as file:
-                    gif_file = BytesIO(file.read()).read()
-
-                    gif_path = transfer_file_from_bytes(
-                        content=gif_file,
-                        extension='gif',
-                        s3=self.s3,
-                        bucket=self.s3_bucket,
-                        s3_path=prim_path,
-                    )
-            else:
-                gif_path = None
-
-            emoticons.append(
-                await EmoticonModel(
-                    name=f'{prefix}_{i + 1}',
-                    original_url=item.url,
-                    image_path=gif_path if animated_png else file_path,
-                    sound_url=item.sound_url if item.sound_url is not None else None,
-                    original_image_path=file_path,
-                    removed=False,
-                    image_from=EmoticonFrom.LINE,
-                    relation_id=category.id,
-                ).create()
+    async def import_item(
+        self, job: LineconImportJobModel, item: LineconImportItemModel, tmpdir: str
+    ):
+        downloaded = await download_file(
+            self.httpx_client, item.url, self.emoticon_service.max_image_bytes
+        )
+        content = downloaded.content
+        # 받을 때 헤더에서 읽어둔 정보로 움직이는 PNG인지 확인한다.
+        if (
+            item.type == 'animation'
+            and downloaded.info.format == 'png'
+            and downloaded.info.frames > 1
+        ):
+            animated_png = True
+            exported_origin_path = f'{tmpdir}/{item.emoticon_id}.png'
+            exported_converted_path = f'{tmpdir}/{item.emoticon_id}.gif'
+
+            with open(exported_origin_path, 'wb') as file:
+                file.write(content)
+
+            apnggif(
+                png=exported_origin_path,
+                gif=exported_converted_path,
             )
+        else:
+            animated_png = False
+            exported_converted_path = None
+
+        # S3 경로도 스티커마다 정해져 있어서 다시 올려도 같은 파일을 덮어쓴다.
+        prim_path = f'images/emoticons/{item.emoticon_id}'
+        file_path = transfer_file_from_bytes(
+            content=content,
+            extension=downloaded.extension,
+            s3=self.s3,
+            bucket=self.s3_bucket,
+            s3_path=prim_path,
+        )
+
+        if animated_png and exported_converted_path is not None:
+            with open(exported_converted_path, 'rb') as file:
+                gif_file = file.read()
+
+                gif_path = transfer_file_from_bytes(
+                    content=gif_file,
+                    extension='gif',
+                    s3=self.s3,
+                    bucket=self.s3_bucket,
+                    s3_path=prim_path,
+                )
+        else:
+            gif_path = None
 
-        tmpdir.cleanup()
-        return category, emoticons
+        # 디스코드에 보낼 이미지(움직이는 PNG는 GIF)를 기준으로 줄인 이미지를 만든다.
+        variants = await self.emoticon_service.store_variants(
+            gif_file if gif_path is not None else content, prim_path
+        )
+
+        name = f'{job.name}_{item.index + 1}'
+        emoticon = EmoticonModel(
+            id=item.emoticon_id,
+            name=name,
+            original_url=item.url,
+            image_path=gif_path if gif_path is not None else file_path,
+            sound_url=item.sound_url,
+            original_image_path=file_path,
+            image_info=downloaded.info,
+            variants=variants,
+            removed=False,
+            image_from=EmoticonFrom.LINE,
+            relation_id=job.linecon_id,
+        )
+        previous = await EmoticonModel.get_motor_collection().find_one_and_replace(
+            ENCODER.encode({'_id': item.emoticon_id}),
+            get_dict(emoticon, to_db=True),
+            projection={'removed': True},
+            upsert=True,
+        )
+
+        # 저장만 하고 기록하기 전에 멈췄던 스티커는 이미 검색 색인에 있다.
+        if previous is None or previous.get('removed', False):
+            self.emoticon_service.search_index.add(name)
 
     @staticmethod
     async def find_one_by_name(
@@ -277,62 +510,82 @@ class LineconService:
             }
         ).first_or_none()
 
-    @staticmethod
     async def remove_item(
+        self,
         name: str,
     ):
         detail = await LineconModel.find(
             {
                 'name': name,
                 'removed': False,
-            }
+            },
+            projection_model=LineconListView,
         ).first_or_none()
 
         if detail is None:
             raise EmoticonException(f'{name} 이름의 이모티콘이 없습니다.')
 
-        await detail.set(
+        # 같은 상품을 다시 가져올 수 있게 가져오기 작업도 지운다.
+        await LineconImportJobModel.find({'linecon_id': detail.id}).delete()
+        await LineconModel.find({'_id': detail.id}).update(
             {
-                'removed': True,
-                'updated_at': datetime.now(),
+                '$set': {
+                    'removed': True,
+                    'updated_at': datetime.now(),
+                }
             }
         )
 
+        query = {
+            'relation_id': detail.id,
+            'removed': False,
+        }
+        # 검색 색인에서 뺄 이름만 가볍게 읽어두고, 삭제는 한 번에 한다.
         results = await EmoticonModel.find(
+            query, projection_model=EmoticonListView
+        ).to_list()
+        await EmoticonModel.find(query).update(
             {
-                'relation_id': detail.id,
-                'removed': False,
+                '$set': {
+                    'removed': True,
+                    'updated_at': datetime.now(),
+                }
             }
-        ).to_list()
-
-        await asyncio.gather(
-            *map(
-                lambda result: result.set(
-                    {
-                        'removed': True,
-                        'updated_at': datetime.now(),
-                    }
-                ),
-                results,
-            )
         )
-
-    @staticmethod
-    async def get_lists() -> Tuple[List[LineconModel], Dict[str, List[EmoticonModel]]]:
-        linecons: List[LineconModel] = await LineconModel.find(
+        for result in results:
+            self.emoticon_service.search_index.remove(result.name)
+        self.list_export = None
+
+    async def get_lists(self) -> LineconListExport:
+        # 라인콘을 추가하거나 지우면 이모티콘 이름도 같이 바뀌므로 검색 색인 버전으로 캐시를 맞춘다.
+        version = self.emoticon_service.search_index.version
+        export = self.list_export
+        if export is not None and export.version == version:
+            record_cache('linecon_list', True)
+            return export
+
+        record_cache('linecon_list', False)
+        linecons: List[LineconListView] = await LineconModel.find(
             {
                 'removed': False,
-            }
+            },
+            projection_model=LineconListView,
+            sort='name',
         ).to_list()
 
-        dictionary: Dict[str, List[EmoticonModel]] = {}
-
-        for linecon in linecons:
-            dictionary[str(linecon.id)] = await EmoticonModel.find(
-                {
-                    'relation_id': linecon.id,
-                    'removed': False,
-                }
-            ).to_list()
+        # 라인콘마다 따로 묻지 않고 한 번에 가져와서 나눈다.
+        names: Dict[str, List[str]] = {str(linecon.id): [] for linecon in linecons}
+        emoticons: List[EmoticonRelationView] = await EmoticonModel.find(
+            {
+                'relation_id': {'$in': list(map(lambda x: x.id, linecons))},
+                'removed': False,
+            },
+            projection_model=EmoticonRelationView,
+        ).to_list()
+        for emoticon in emoticons:
+            names[str(emoticon.relation_id)].append(emoticon.name)
 
-        return linecons, dictionary
+        self.list_export = LineconListExport(
+            version=version, linecons=linecons, names=names
+        )
+        return self.list_export
@@ -1,230 +1,513 @@
 import asyncio
+import dataclasses
+import logging
 from datetime import datetime
-from typing import List, Union, Optional
+from enum import Enum
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple, Type, TypeVar, Union
 from uuid import uuid4
 
 import boto3
 import httpx
+from beanie.odm.utils.dump import get_dict
 from mypy_boto3_s3 import S3Client
+from pymongo import InsertOne, UpdateMany, UpdateOne
+from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
 
 from blackangus.config import EmoticonConfig
-from blackangus.services.emoticon import EmoticonException, transfer_file
-from blackangus.models.emoticon.main import EmoticonModel, EmoticonListView
+from blackangus.services.emoticon import (
+    EmoticonException,
+    download_file,
+    transfer_file_from_bytes,
+)
+from blackangus.models.emoticon.main import (
+    EmoticonModel,
+    EmoticonListView,
+    EmoticonImageView,
+    EmoticonSourceView,
+    EmoticonVariantModel,
+    EmoticonImageInfoModel,
+)
+from blackangus.services.emoticon.search import EmoticonSearchIndex
+from blackangus.services.emoticon.variant import VariantRenderer
+from blackangus.utils.metrics import instrument_boto3_client, record_cache
+
+
+ViewType = TypeVar('ViewType', bound=BaseModel)
+
+
+@dataclasses.dataclass
+class EmoticonListExport:
+    # 만들 때의 검색 색인 버전, 이모티콘 이름이 바뀌면 새로 만듭니다.
+    version: int
+    names: List[str]
+    content: bytes
+    # 채널 ID -> 이 목록을 올린 메세지 링크
+    messages: Dict[int, str] = dataclasses.field(default_factory=dict)
+
+
+class EmoticonMutationType(Enum):
+    CREATE = 'create'
+    RENAME = 'rename'
+    REMOVE = 'remove'
+
+
+@dataclasses.dataclass
+class EmoticonMutation:
+    type: EmoticonMutationType
+    name: str
+    # CREATE면 이미지 URL, RENAME이면 바꿀 이름
+    value: Optional[str] = None
+
+    def require_value(self) -> str:
+        # CREATE, RENAME은 value가 있어야 한다.
+        if self.value is None:
+            raise EmoticonException(f'{self.name}: 이미지 URL이나 새 이름이 없습니다.')
+        return self.value
+
+
+@dataclasses.dataclass
+class EmoticonMutationResult:
+    created: int
+    modified: int
 
 
 class EmoticonService:
     s3: S3Client
     s3_bucket: str
     httpx_client: httpx.AsyncClient
+    search_index: EmoticonSearchIndex
+    list_export: Optional[EmoticonListExport]
 
     # 기본적으로 사용할 S3, httpx 클라이언트를 셋업합니다.
     def __init__(self, config: EmoticonConfig):
-        self.s3 = boto3.client(
-            's3',
-            region_name=config.s3_region,
-            aws_access_key_id=config.s3_access_key,
-            aws_secret_access_key=config.s3_secret_key,
+        self.logger = logging.getLogger('blackangus:emoticon')
+        self.s3 = instrument_boto3_client(
+            boto3.client(
+                's3',
+                region_name=config.s3_region,
+                aws_access_key_id=config.s3_access_key,
+                aws_secret_access_key=config.s3_secret_key,
+            )
         )
 
         self.s3_bucket = config.s3_bucket
+        self.max_image_bytes = config.max_image_bytes
         self.httpx_client = httpx.AsyncClient()
+        # 이 서비스를 거쳐서 이모티콘을 만들고 지울 때마다 같이 고칩니다.
+        self.search_index = EmoticonSearchIndex()
+        self.list_export = None
+        self.list_lock = asyncio.Lock()
+        self.variant_renderer = VariantRenderer(
+            config.variant_size, config.variant_workers
+        )
+
+    async def store_variants(
+        self, content: bytes, s3_path: str
+    ) -> List[EmoticonVariantModel]:
+        """원본 이미지를 디스코드용으로 줄인 이미지들을 만들어서 원본 옆에 올립니다."""
+        variants = []
+        for rendered in await self.variant_renderer.render(content):
+            path = transfer_file_from_bytes(
+                rendered.content,
+                rendered.extension,
+                self.s3,
+                self.s3_bucket,
+                f'{s3_path}_{rendered.width}x{rendered.height}',
+            )
+            variants.append(
+                EmoticonVariantModel(
+                    path=path,
+                    format=rendered.extension,
+                    width=rendered.width,
+                    height=rendered.height,
+                    size=len(rendered.content),
+                )
+            )
+        return variants
+
+    async def store_image(
+        self, url: str
+    ) -> Tuple[str, List[EmoticonVariantModel], EmoticonImageInfoModel]:
+        """
+        URL의 이미지를 받아서 원본과 줄인 이미지들을 S3에 올립니다.
+        이미지가 아니거나 너무 크면 다 받기 전에 EmoticonException을 던집니다.
+        """
+        s3_path = f'images/emoticons/{uuid4()}'
+        image = await download_file(self.httpx_client, url, self.max_image_bytes)
+        path = transfer_file_from_bytes(
+            image.content,
+            image.extension,
+            self.s3,
+            self.s3_bucket,
+            s3_path,
+        )
+        return path, await self.store_variants(image.content, s3_path), image.info
+
+    def delete_images(self, images: List[Tuple[str, List[EmoticonVariantModel]]]):
+        """올렸지만 DB에 들어가지 못한 원본과 줄인 이미지를 S3에서 지웁니다."""
+        keys = [
+            key
+            for (path, variants) in images
+            for key in [path, *map(lambda x: x.path, variants)]
+        ]
+        if len(keys) == 0:
+            return
+
+        try:
+            self.s3.delete_objects(
+                Bucket=self.s3_bucket,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+            )
+        except Exception:
+            # 못 지워도 아무 문서도 가리키지 않는 파일이 남을 뿐이다.
+            self.logger.exception('S3에 올린 이미지를 지우지 못했습니다: %s', keys)
 
     # 새로운 이모티콘 모델을 생성합니다.
     async def create(self, name: str, raw_url: str) -> EmoticonModel:
-        prev = await EmoticonModel.find(
-            {
-                'name': name,
-                'removed': False,
-            }
-        ).first_or_none()
+        prev = await self.find_view(name, EmoticonListView)
 
         if prev is not None:
             raise EmoticonException(f'이미 존재하는 이모티콘입니다: {name}')
 
-        prim_path = f'images/emoticons/{uuid4()}'
-        path = await transfer_file(
-            http=self.httpx_client,
-            url=raw_url,
-            s3=self.s3,
-            bucket=self.s3_bucket,
-            s3_path=prim_path,
-        )
+        (path, variants, info) = await self.store_image(raw_url)
 
-        return await EmoticonModel(
+        emoticon = await EmoticonModel(
             name=name,
             original_url=raw_url,
             image_path=path,
+            variants=variants,
+            image_info=info,
             removed=False,
         ).create()
+        self.search_index.add(name)
+        return emoticon
 
     # 이모티콘을 복제합니다.
-    @staticmethod
-    async def duplicate(name: str, target: str) -> EmoticonModel:
-        previous = await EmoticonModel.find(
-            {
-                'name': name,
-                'removed': False,
-            }
-        ).first_or_none()
+    async def duplicate(self, name: str, target: str) -> EmoticonModel:
+        previous = await self.find_view(name, EmoticonSourceView)
 
         if previous is None:
             raise EmoticonException(f'존재하지 않는 이모티콘입니다: {name}')
 
-        previous_target = await EmoticonModel.find(
-            {
-                'name': target,
-                'removed': False,
-            }
-        ).first_or_none()
+        previous_target = await self.find_view(target, EmoticonListView)
 
         if previous_target is not None:
             raise EmoticonException(f'이미 존재하는 이모티콘입니다: {target}')
 
-        return await EmoticonModel(
+        emoticon = await EmoticonModel(
             name=target,
             original_url=previous.original_url,
             image_path=previous.image_path,
+            image_info=previous.image_info,
+            variants=previous.variants,
             removed=False,
         ).create()
+        self.search_index.add(target)
+        return emoticon
 
-    # 이모티콘 URL을 바꿉니다.
+    # 이모티콘 URL을 바꾸고 바뀐 이모티콘 수를 돌려줍니다.
     async def update(
         self,
         name: str,
         new_url: str,
         update_equivalents: bool = False,
-    ) -> Union[EmoticonModel, List[EmoticonModel]]:
-        previous_list = await EmoticonModel.find(
-            {
-                'name': name,
-                'removed': False,
-            },
-            limit=1,
-        ).to_list(1)
+    ) -> int:
+        previous = await self.find_view(name, EmoticonSourceView)
 
-        if len(previous_list) == 0:
+        if previous is None:
             raise EmoticonException(f'존재하지 않는 이모티콘입니다: {name}')
 
-        if update_equivalents:
-            previous_list = await EmoticonModel.find(
-                {
-                    'original_url': previous_list[0].original_url,
-                    'removed': False,
-                }
-            ).to_list()
-
-        prim_path = f'images/emoticons/{uuid4()}'
-        path = await transfer_file(
-            http=self.httpx_client,
-            url=new_url,
-            s3=self.s3,
-            bucket=self.s3_bucket,
-            s3_path=prim_path,
-        )
-
-        await asyncio.gather(
-            *map(
-                lambda x: x.set(
-                    {
-                        'path': path,
-                        'original_url': new_url,
-                        'updated_at': datetime.now(),
-                    }
-                ),
-                previous_list,
-            )
-        )
-
-        return previous_list[0] if len(previous_list) == 1 else previous_list
+        (path, variants, info) = await self.store_image(new_url)
 
-    @staticmethod
-    async def rename(before: str, after: str) -> EmoticonModel:
-        previous = await EmoticonModel.find(
+        # 문서를 하나씩 불러와서 고치지 않고 서버에서 한 번에 고친다.
+        result = await EmoticonModel.find(
             {
-                'name': before,
+                'original_url': previous.original_url,
                 'removed': False,
             }
-        ).first_or_none()
+            if update_equivalents
+            else {'_id': previous.id}
+        ).update(
+            {
+                '$set': {
+                    'image_path': path,
+                    'variants': [variant.dict() for variant in variants],
+                    'image_info': info.dict(),
+                    'original_url': new_url,
+                    'updated_at': datetime.now(),
+                }
+            }
+        )
+        return result.modified_count
+
+    # 이모티콘 이름을 바꾸고 바뀐 이모티콘 수를 돌려줍니다.
+    async def rename(self, before: str, after: str) -> int:
+        # 바꿀 이름과 새 이름이 있는지 한 번에 확인한다.
+        existing = set(
+            map(
+                lambda x: x.name,
+                await EmoticonModel.find(
+                    {'name': {'$in': [before, after]}, 'removed': False},
+                    projection_model=EmoticonListView,
+                ).to_list(),
+            )
+        )
 
-        if previous is None:
+        if before not in existing:
             raise EmoticonException(f'존재하지 않는 이모티콘입니다: {before}')
+        if after in existing:
+            raise EmoticonException(f'이미 존재하는 이모티콘입니다: {after}')
 
-        return await previous.set(
-            {
-                'name': after,
-            }
+        result = await EmoticonModel.find({'name': before, 'removed': False}).update(
+            {'$set': {'name': after, 'updated_at': datetime.now()}}
         )
+        self.search_index.remove(before)
+        self.search_index.add(after)
+        return result.modified_count
 
-    # 특정 이름을 포함한 이모티콘을 검색합니다.
-    @staticmethod
-    async def search(name: str) -> List[EmoticonModel]:
-        return await EmoticonModel.find(
-            {
-                'name': {'$regex': name, '$options': 'i'},
-                'removed': False,
-            }
-        ).to_list()
+    # 특정 이름을 포함한 이모티콘의 이름을 검색합니다.
+    # 입력을 정규식으로 쓰지 않고, 메모리에 둔 n-gram 색인에서 찾습니다.
+    async def search(self, name: str) -> List[str]:
+        await self.search_index.ensure_loaded()
+        return self.search_index.search(name)
+
+    # 찾는 이모티콘이 없을 때 이름이 비슷한 이모티콘을 추천합니다.
+    async def suggest(self, name: str) -> List[str]:
+        await self.search_index.ensure_loaded()
+        return self.search_index.suggest(name)
 
     # 이모티콘을 삭제합니다.
-    @staticmethod
-    async def remove(name: str, remove_equivalents: bool = False):
-        prev = await EmoticonModel.find(
-            {
-                'name': name,
-                'removed': False,
-            }
-        ).first_or_none()
+    async def remove(self, name: str, remove_equivalents: bool = False) -> int:
+        prev = await self.find_view(name, EmoticonSourceView)
 
         if prev is None:
             raise EmoticonException(f'존재하지 않는 이모티콘입니다: {name}')
 
-        await prev.set({'updated_at': datetime.now(), 'removed': True})
-
-        if remove_equivalents:
-            await asyncio.gather(
-                *map(
-                    lambda x: x.set(
-                        {
-                            'updated_at': datetime.now(),
-                            'removed': True,
-                        }
-                    ),
-                    await EmoticonModel.find(
-                        {
-                            'original_url': prev.original_url,
-                            'removed': False,
-                        }
-                    ).to_list(),
+        if not remove_equivalents:
+            result = await EmoticonModel.find({'_id': prev.id}).update(
+                {'$set': {'updated_at': datetime.now(), 'removed': True}}
+            )
+            self.search_index.remove(name)
+            return result.modified_count
+
+        query = {
+            'original_url': prev.original_url,
+            'removed': False,
+        }
+        # 검색 색인에서 뺄 이름만 가볍게 읽어두고, 삭제는 한 번에 한다.
+        equivalents = await EmoticonModel.find(
+            query, projection_model=EmoticonListView
+        ).to_list()
+        result = await EmoticonModel.find(query).update(
+            {'$set': {'updated_at': datetime.now(), 'removed': True}}
+        )
+        for equivalent in equivalents:
+            self.search_index.remove(equivalent.name)
+        return result.modified_count
+
+    async def apply_mutations(
+        self, mutations: List[EmoticonMutation]
+    ) -> EmoticonMutationResult:
+        """
+        여러 이모티콘을 한꺼번에 추가, 이름 변경, 삭제합니다.
+        이름이 겹치거나 없는 이모티콘이 있으면 아무것도 바꾸지 않고 예외를 던지며,
+        검사를 통과하면 bulk_write 한 번으로 요청 순서대로 DB에 반영합니다.
+        반영하는 도중에 실패하면 그 앞의 작업은 반영된 채로 남고, 몇 건이 반영됐는지 예외에 담습니다.
+        DB에 들어가지 못한 새 이미지는 S3에서 지웁니다.
+        """
+        if len(mutations) == 0:
+            return EmoticonMutationResult(created=0, modified=0)
+
+        names = set(map(lambda x: x.name, mutations))
+        names.update(
+            mutation.require_value()
+            for mutation in mutations
+            if mutation.type == EmoticonMutationType.RENAME
+        )
+        existing = set(
+            map(
+                lambda x: x.name,
+                await EmoticonModel.find(
+                    {'name': {'$in': list(names)}, 'removed': False},
+                    projection_model=EmoticonListView,
+                ).to_list(),
+            )
+        )
+
+        # 요청 순서대로 반영했을 때 이름이 겹치지 않는지 미리 확인한다.
+        for mutation in mutations:
+            if mutation.type == EmoticonMutationType.CREATE:
+                mutation.require_value()
+                if mutation.name in existing:
+                    raise EmoticonException(f'이미 존재하는 이모티콘입니다: {mutation.name}')
+                existing.add(mutation.name)
+                continue
+
+            if mutation.name not in existing:
+                raise EmoticonException(f'존재하지 않는 이모티콘입니다: {mutation.name}')
+            existing.discard(mutation.name)
+
+            if mutation.type == EmoticonMutationType.RENAME:
+                after = mutation.require_value()
+                if after in existing:
+                    raise EmoticonException(f'이미 존재하는 이모티콘입니다: {after}')
+                existing.add(after)
+
+        # 새 이모티콘 이미지는 DB에 쓰기 전에 한꺼번에 올려둔다.
+        creations = [x for x in mutations if x.type == EmoticonMutationType.CREATE]
+        results = await asyncio.gather(
+            *map(lambda x: self.store_image(x.require_value()), creations),
+            return_exceptions=True,
+        )
+        uploaded = [x for x in results if not isinstance(x, BaseException)]
+        failures = [x for x in results if isinstance(x, BaseException)]
+        if len(failures) > 0:
+            self.delete_images([(path, variants) for (path, variants, _) in uploaded])
+            raise failures[0]
+
+        images = iter(uploaded)
+
+        now = datetime.now()
+        operations: List[Union[InsertOne, UpdateOne, UpdateMany]] = []
+        # 작업 순서 -> 그 작업이 넣는 이미지
+        inserted_images: Dict[int, Tuple[str, List[EmoticonVariantModel]]] = {}
+        for mutation in mutations:
+            if mutation.type == EmoticonMutationType.CREATE:
+                (path, variants, info) = next(images)
+                document = EmoticonModel(
+                    name=mutation.name,
+                    original_url=mutation.require_value(),
+                    image_path=path,
+                    variants=variants,
+                    image_info=info,
+                    removed=False,
                 )
+                inserted_images[len(operations)] = (path, variants)
+                operations.append(InsertOne(get_dict(document, to_db=True)))
+            elif mutation.type == EmoticonMutationType.RENAME:
+                operations.append(
+                    UpdateOne(
+                        {'name': mutation.name, 'removed': False},
+                        {'$set': {'name': mutation.require_value(), 'updated_at': now}},
+                    )
+                )
+            else:
+                operations.append(
+                    UpdateMany(
+                        {'name': mutation.name, 'removed': False},
+                        {'$set': {'removed': True, 'updated_at': now}},
+                    )
+                )
+
+        try:
+            result = await EmoticonModel.get_motor_collection().bulk_write(
+                operations, ordered=True
             )
+        except BulkWriteError as e:
+            # 순서대로 반영하므로 처음 실패한 작업의 앞까지만 들어갔다.
+            errors = e.details.get('writeErrors', [])
+            failed_at = errors[0]['index'] if len(errors) > 0 else len(operations)
+            self.delete_images(
+                [image for (i, image) in inserted_images.items() if i >= failed_at]
+            )
+            # 어디까지 반영됐는지 색인이 알 수 없으니 처음부터 다시 읽는다.
+            self.search_index.invalidate()
+            raise EmoticonException(
+                f'{failed_at + 1}번째 작업에서 실패해서 그 앞의 작업만 반영되었습니다. '
+                f'(추가 {e.details.get("nInserted", 0)}건, '
+                f'변경 {e.details.get("nModified", 0)}건) '
+                f'{errors[0].get("errmsg", "") if len(errors) > 0 else e}'
+            )
+
+        for mutation in mutations:
+            if mutation.type == EmoticonMutationType.CREATE:
+                self.search_index.add(mutation.name)
+                continue
+
+            self.search_index.remove(mutation.name)
+            if mutation.type == EmoticonMutationType.RENAME:
+                self.search_index.add(mutation.require_value())
+
+        return EmoticonMutationResult(
+            created=result.inserted_count, modified=result.modified_count
+        )
 
     @staticmethod
-    async def find_by_name(name: str) -> Optional[EmoticonModel]:
+    async def find_view(name: str, view: Type[ViewType]) -> Optional[ViewType]:
+        """
+        삭제되지 않은 이모티콘 하나를 view에 있는 필드만 읽어서 가져옵니다.
+        문서 전체가 필요하지 않은 곳에서는 find_by_name 대신 이걸 씁니다.
+        """
         return await EmoticonModel.find(
             {
                 'name': name,
                 'removed': False,
-            }
+            },
+            projection_model=view,
         ).first_or_none()
 
     @staticmethod
-    async def list_emoticons() -> List[str]:
-        emoticons = await EmoticonModel.find(
+    async def find_by_name(name: str) -> Optional[EmoticonModel]:
+        return await EmoticonModel.find(
             {
+                'name': name,
                 'removed': False,
-            },
-            projection_model=EmoticonListView,
-            sort='name',
-        ).to_list()
-        return [emoticon.name for emoticon in emoticons]
+            }
+        ).first_or_none()
 
-    @staticmethod
-    async def get_equivalents(name: str) -> List[EmoticonModel]:
-        emoticon = await EmoticonModel.find({'name': name}).first_or_none()
+    # 이모티콘을 보낼 때 쓰는 가벼운 조회, 이미지 경로만 읽습니다.
+    async def find_image(self, name: str) -> Optional[EmoticonImageView]:
+        return await self.find_view(name, EmoticonImageView)
+
+    # 전체 이모티콘 이름 목록을 만듭니다.
+    # 이모티콘 이름이 바뀌지 않았으면 DB를 읽지 않고 전에 만든 목록을 그대로 씁니다.
+    async def export_list(self) -> EmoticonListExport:
+        export = self.list_export
+        if export is not None and export.version == self.search_index.version:
+            record_cache('emoticon_list', True)
+            return export
+
+        # 동시에 여러 번 요청이 와도 한 번만 만든다.
+        async with self.list_lock:
+            export = self.list_export
+            if export is not None and export.version == self.search_index.version:
+                record_cache('emoticon_list', True)
+                return export
+
+            record_cache('emoticon_list', False)
+            version = self.search_index.version
+            names: List[str] = []
+            buffer = BytesIO()
+
+            # 문서를 한꺼번에 받지 않고 커서에서 하나씩 받아서 쓴다.
+            async for emoticon in EmoticonModel.find(
+                {
+                    'removed': False,
+                },
+                projection_model=EmoticonListView,
+                sort='name',
+            ):
+                names.append(emoticon.name)
+                buffer.write(emoticon.name.encode('utf-8'))
+                buffer.write(b'\n')
+
+            # 마지막 줄바꿈은 빼서 예전 목록 파일과 같게 맞춘다.
+            content = buffer.getvalue()[:-1]
+            self.list_export = EmoticonListExport(
+                version=version, names=names, content=content
+            )
+            return self.list_export
+
+    async def get_equivalents(self, name: str) -> List[str]:
+        emoticon = await self.find_view(name, EmoticonSourceView)
 
         if emoticon is None:
             raise EmoticonException(f'존재하지 않는 이모티콘입니다: {name}')
 
-        origin_url = emoticon.original_url
-        equivalents = await EmoticonModel.find({'origin_url': origin_url}).to_list()
-        return equivalents
+        equivalents = await EmoticonModel.find(
+            {'original_url': emoticon.original_url, 'removed': False},
+            projection_model=EmoticonListView,
+        ).to_list()
+        return list(map(lambda x: x.name, equivalents))
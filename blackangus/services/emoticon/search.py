@@ -0,0 +1,215 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from fuzzywuzzy import fuzz
+
+from blackangus.models.emoticon.main import EmoticonModel, EmoticonListView
+
+try:
+    # fuzzywuzzy[speedup]이 같이 설치하는 C 구현
+    from Levenshtein import distance as levenshtein
+except ImportError:
+    # C 구현과 인자 목록이 달라서 mypy에게는 조건부 정의가 맞지 않아 보인다.
+    def levenshtein(a: str, b: str) -> int:  # type: ignore
+        previous = list(range(len(b) + 1))
+        for (i, x) in enumerate(a, 1):
+            current = [i]
+            for (j, y) in enumerate(b, 1):
+                current.append(
+                    min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y))
+                )
+            previous = current
+        return previous[-1]
+
+
+def ngrams(value: str) -> Set[str]:
+    """
+    이모티콘 이름은 최대 10자라서 2글자 단위로 자릅니다.
+    한 글자짜리 검색어도 찾을 수 있게 글자 하나도 같이 넣습니다.
+    """
+    value = value.lower()
+    grams = set(value)
+    grams.update(value[i : i + 2] for i in range(len(value) - 1))
+    return grams
+
+
+def query_ngrams(query: str) -> Set[str]:
+    # 검색어는 가장 좁게 걸러지는 조각만 쓴다.
+    query = query.lower()
+    if len(query) == 1:
+        return {query}
+    return {query[i : i + 2] for i in range(len(query) - 1)}
+
+
+def deletions(value: str) -> Set[str]:
+    """글자 하나를 뺀 모든 문자열과 원래 문자열 (SymSpell의 삭제 색인)."""
+    value = value.lower()
+    variants = {value}
+    variants.update(value[:i] + value[i + 1 :] for i in range(len(value)))
+    return variants
+
+
+class EmoticonSearchIndex:
+    """
+    삭제되지 않은 이모티콘 이름에 대한 n-gram 역색인.
+    처음 검색할 때 DB에서 이름만 읽어서 만들고, 그 뒤로는 이모티콘을 만들거나
+    지우는 쪽에서 add/remove를 불러서 맞춰줍니다.
+    version은 이름 목록이 바뀔 때마다 올라가서 목록 캐시를 무효화하는 데 씁니다.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        # 같은 이름이 여러 개 있을 수 있어서 개수를 셉니다.
+        self.names: Dict[str, int] = {}
+        # 글자 하나를 뺀 문자열 -> 이름, 오타 추천에 씁니다.
+        # 대부분 이름 하나만 걸리기 때문에 메모리를 아끼려고 그때는 set 대신 문자열로 둡니다.
+        self.deletions: Dict[str, Union[str, Set[str]]] = {}
+        self.version = 0
+        self.loaded = False
+        self.lock = asyncio.Lock()
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+
+        async with self.lock:
+            if self.loaded:
+                return
+
+            # 읽는 도중에 이름이 바뀌었으면 다시 읽는다.
+            while True:
+                version = self.version
+                emoticons = await EmoticonModel.find(
+                    {'removed': False},
+                    projection_model=EmoticonListView,
+                ).to_list()
+                if version == self.version:
+                    break
+
+            for emoticon in emoticons:
+                self.insert(emoticon.name)
+            self.loaded = True
+
+    def invalidate(self):
+        # 다음 검색 때 DB에서 처음부터 다시 읽는다.
+        self.version += 1
+        self.loaded = False
+        self.postings = {}
+        self.names = {}
+        self.deletions = {}
+
+    def add(self, name: str):
+        self.version += 1
+        # 아직 읽지 않았으면 처음 읽을 때 DB에서 같이 가져온다.
+        if self.loaded:
+            self.insert(name)
+
+    def add_all(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def remove(self, name: str):
+        self.version += 1
+        if self.loaded:
+            self.delete(name)
+
+    def insert(self, name: str):
+        count = self.names.get(name, 0)
+        self.names[name] = count + 1
+        if count != 0:
+            return
+
+        for gram in ngrams(name):
+            self.postings.setdefault(gram, set()).add(name)
+        for variant in deletions(name):
+            names = self.deletions.setdefault(variant, name)
+            if isinstance(names, set):
+                names.add(name)
+            elif names != name:
+                self.deletions[variant] = {names, name}
+
+    def delete(self, name: str):
+        count = self.names.get(name, 0)
+        if count > 1:
+            self.names[name] = count - 1
+            return
+        if count == 0:
+            return
+
+        del self.names[name]
+        for gram in ngrams(name):
+            posting = self.postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(name)
+            if len(posting) == 0:
+                del self.postings[gram]
+
+        for variant in deletions(name):
+            names = self.deletions.get(variant)
+            if names == name:
+                del self.deletions[variant]
+            elif isinstance(names, set):
+                names.discard(name)
+                if len(names) == 1:
+                    self.deletions[variant] = names.pop()
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """
+        query를 포함하는 이름을 찾아서 정확히 같은 이름, 앞부분이 같은 이름,
+        짧은 이름 순서로 돌려줍니다. 정규식은 쓰지 않습니다.
+        """
+        query = query.lower()
+        if len(query) == 0:
+            return []
+
+        # 가장 작은 목록부터 교집합을 구한다.
+        postings = sorted(
+            (self.postings.get(gram, set()) for gram in query_ngrams(query)), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates &= posting
+
+        # 조각이 모두 있어도 순서가 다를 수 있으니 실제로 포함하는지 확인한다.
+        matches = []
+        for name in candidates:
+            position = name.lower().find(query)
+            if position != -1:
+                matches.append((name.lower() != query, position, len(name), name))
+
+        matches.sort()
+        names = [match[-1] for match in matches]
+        return names if limit is None else names[:limit]
+
+    def suggest(self, query: str, limit: int = 3) -> List[str]:
+        """
+        오타가 난 이름과 편집 거리가 가까운 이름을 추천합니다.
+        검색어와 이름에서 각각 글자를 하나씩 빼서 겹치는 이름만 후보로 삼기 때문에
+        전체 목록을 훑지 않고도 한 글자 오타는 모두, 두 글자 오타는 대부분 찾습니다.
+        거리가 같으면 fuzzywuzzy 점수가 높은 이름을 먼저 둡니다.
+        """
+        if len(query) == 0:
+            return []
+
+        candidates: Set[str] = set()
+        for variant in deletions(query):
+            names = self.deletions.get(variant)
+            if isinstance(names, set):
+                candidates.update(names)
+            elif names is not None:
+                candidates.add(names)
+
+        # 짧은 이름에서 두 글자까지 허용하면 엉뚱한 이름이 너무 많이 걸린다.
+        key = query.lower()
+        max_distance = 1 if len(query) <= 3 else 2
+        ranked = []
+        for name in candidates:
+            distance = levenshtein(key, name.lower())
+            if distance <= max_distance:
+                ranked.append((distance, -fuzz.ratio(key, name.lower()), name))
+
+        ranked.sort()
+        return [candidate[-1] for candidate in ranked[:limit]]
@@ -0,0 +1,121 @@
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageSequence
+
+from blackangus.utils.tracing import span
+
+
+@dataclasses.dataclass
+class RenderedVariant:
+    extension: str
+    content: bytes
+    width: int
+    height: int
+
+
+def resize_frame(frame: Image.Image, max_size: int) -> Image.Image:
+    # 비율은 그대로 두고 긴 쪽을 max_size에 맞춘다. 작은 이미지는 키우지 않는다.
+    frame = frame.convert('RGBA')
+    frame.thumbnail((max_size, max_size), Image.LANCZOS)
+    return frame
+
+
+def render_static(image: Image.Image, max_size: int) -> List[RenderedVariant]:
+    frame = resize_frame(image, max_size)
+    variants = []
+
+    # 확장자 -> Image.save에 넘길 옵션
+    formats: List[Tuple[str, Dict[str, Any]]] = [
+        ('png', {'format': 'PNG', 'optimize': True}),
+        ('webp', {'format': 'WEBP', 'lossless': True, 'method': 6}),
+    ]
+    for (extension, options) in formats:
+        buffer = BytesIO()
+        frame.save(buffer, **options)
+        variants.append(
+            RenderedVariant(extension, buffer.getvalue(), frame.width, frame.height)
+        )
+
+    return variants
+
+
+def render_animation(image: Image.Image, max_size: int) -> List[RenderedVariant]:
+    frames: List[Image.Image] = []
+    durations: List[int] = []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frames.append(resize_frame(frame, max_size))
+
+    # 줄인 프레임마다 팔레트를 다시 뽑아서 GIF로 저장한다.
+    buffer = BytesIO()
+    frames[0].save(
+        buffer,
+        format='GIF',
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        loop=image.info.get('loop', 0),
+        disposal=2,
+        optimize=True,
+    )
+    return [
+        RenderedVariant('gif', buffer.getvalue(), frames[0].width, frames[0].height)
+    ]
+
+
+def render_variants(content: bytes, max_size: int) -> List[RenderedVariant]:
+    """
+    원본 이미지를 디스코드에서 보이는 크기로 줄이고 다시 압축한 이미지들을 만듭니다.
+    움직이는 이미지는 GIF, 멈춘 이미지는 PNG와 무손실 WebP로 만들고,
+    원본보다 커진 결과는 버립니다. 프로세스 풀에서 실행되므로 인자와 결과는 pickle할 수 있어야 합니다.
+    """
+    with Image.open(BytesIO(content)) as image:
+        if getattr(image, 'is_animated', False):
+            variants = render_animation(image, max_size)
+        else:
+            variants = render_static(image, max_size)
+
+    return [variant for variant in variants if len(variant.content) < len(content)]
+
+
+class VariantRenderer:
+    """
+    이미지 변환은 CPU를 오래 쓰기 때문에 이벤트 루프가 아닌 별도 프로세스에서 돌립니다.
+    봇은 스레드를 여럿 띄우므로 fork 대신 spawn으로 프로세스를 만듭니다.
+    """
+
+    def __init__(self, max_size: int, workers: int):
+        self.logger = logging.getLogger('blackangus:variant')
+        self.max_size = max_size
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        # 처음 쓸 때 만들어서 이모티콘을 만들지 않는 봇은 프로세스를 띄우지 않는다.
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self.pool
+
+    async def render(self, content: bytes) -> List[RenderedVariant]:
+        if self.workers == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        try:
+            with span('emoticon.render_variants', size=len(content)):
+                return await loop.run_in_executor(
+                    self.get_pool(), render_variants, content, self.max_size
+                )
+        except Exception:
+            # 변환에 실패해도 원본은 보낼 수 있으니 이모티콘은 그대로 만든다.
+            self.logger.exception('이모티콘 이미지를 변환하지 못했습니다.')
+            return []
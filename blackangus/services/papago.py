@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import httpx
+import pendulum
+
+from blackangus.config import PapagoConfig
+from blackangus.models.translation import TRANSLATION_CACHE_TTL, TranslationCacheModel
+from blackangus.utils.cache import TTLCache
+from blackangus.utils.metrics import record_cache
+from blackangus.utils.network.papago_client import (
+    PAPAGO_LANGUAGE_MAP,
+    PAPAGO_MAX_CHARACTERS,
+    PAPAGO_TIMEOUT,
+    PapagoException,
+    PapagoQuotaException,
+    request_translation,
+)
+from blackangus.utils.rate_limit import RateLimiter
+from blackangus.utils.retry import RetryableError, retry
+
+# 문장이 끝나는 곳, 긴 줄은 여기서 나눈다.
+SENTENCE_END = re.compile(r'(?<=[.!?。！？])(\s+)')
+
+
+def normalize_text(text: str) -> str:
+    # 한글 조합 방식이나 앞뒤, 겹친 공백만 다른 문장은 같은 문장으로 본다.
+    lines = unicodedata.normalize('NFC', text).strip().split('\n')
+    return '\n'.join(' '.join(line.split()) for line in lines)
+
+
+def split_text(text: str, limit: int) -> List[Tuple[str, str]]:
+    """
+    text를 limit 글자를 넘지 않는 조각으로 나눕니다.
+    (조각, 조각 뒤에 붙일 구분자) 목록을 돌려주므로 번역한 조각과 구분자를 이어 붙이면 원래 모양이 됩니다.
+    줄 단위로 나누고, 한 줄이 너무 길면 문장 단위로, 문장도 너무 길면 글자 수로 자릅니다.
+    """
+    pieces: List[Tuple[str, str]] = []
+    for line in text.split('\n'):
+        if len(line) <= limit:
+            pieces.append((line, '\n'))
+            continue
+
+        # 구분자를 캡쳐하므로 문장과 그 뒤의 공백이 번갈아 나온다.
+        parts = SENTENCE_END.split(line)
+        for (sentence, spaces) in zip(parts[::2], parts[1::2] + ['']):
+            for start in range(0, max(len(sentence), 1), limit):
+                pieces.append((sentence[start : start + limit], ''))
+            pieces[-1] = (pieces[-1][0], spaces)
+        pieces[-1] = (pieces[-1][0], '\n')
+    pieces[-1] = (pieces[-1][0], '')
+
+    # 짧은 조각은 한도를 넘지 않는 만큼 다시 이어 붙여서 요청 수를 줄인다.
+    # 빈 줄도 조각이므로 '아직 아무 조각도 없음'은 None으로 구분해야 줄바꿈을 잃지 않는다.
+    chunks: List[Tuple[str, str]] = []
+    current: Optional[str] = None
+    separator = ''
+    for (piece, piece_separator) in pieces:
+        if current is not None and len(current) + len(separator) + len(piece) > limit:
+            chunks.append((current, separator))
+            current = None
+        current = piece if current is None else current + separator + piece
+        separator = piece_separator
+    chunks.append((current or '', separator))
+
+    return chunks
+
+
+class PapagoService:
+    """
+    파파고 번역 API를 부르는 서비스.
+    같은 문장은 다시 번역하지 않도록 결과를 들고 있고, 긴 글은 API 한도에 맞게 나눠서 동시에 번역합니다.
+    초당 요청 수를 넘지 않게 간격을 벌리고, 하루 사용량을 다 쓰면 다음 날까지 요청하지 않습니다.
+    """
+
+    def __init__(self, config: PapagoConfig):
+        self.logger = logging.getLogger('blackangus:papago')
+        self.config = config
+        self.httpx_client = httpx.AsyncClient(timeout=PAPAGO_TIMEOUT)
+        # (원문 언어, 번역 언어, 원문의 sha256) -> 번역 결과
+        self.cache: TTLCache[str] = TTLCache(
+            'papago',
+            ttl=TRANSLATION_CACHE_TTL.total_seconds(),
+            max_entries=config.cache_entries,
+        )
+        self.semaphore = asyncio.Semaphore(config.concurrency)
+        self.rate_limiter = RateLimiter(config.requests_per_second)
+        # 하루 사용량을 다 쓴 경우 사용량이 초기화되는 시간
+        self.quota_reset_at: Optional[pendulum.DateTime] = None
+
+    async def translate(self, language_from: str, language_to: str, text: str) -> str:
+        """
+        text를 번역합니다. 언어는 '한국어', '영어'처럼 자연어로 입력해야 합니다.
+        """
+        if (
+            language_from not in PAPAGO_LANGUAGE_MAP
+            or language_to not in PAPAGO_LANGUAGE_MAP
+        ):
+            raise PapagoException('지원하지 않는 언어입니다.')
+
+        text = normalize_text(text)
+        if text == '':
+            raise PapagoException('번역할 텍스트를 입력해주세요.')
+
+        source = PAPAGO_LANGUAGE_MAP[language_from]
+        target = PAPAGO_LANGUAGE_MAP[language_to]
+        chunks = split_text(text, PAPAGO_MAX_CHARACTERS)
+
+        results = await asyncio.gather(
+            *[self.translate_chunk(source, target, chunk) for (chunk, _) in chunks]
+        )
+        return ''.join(
+            result + separator for (result, (_, separator)) in zip(results, chunks)
+        )
+
+    async def translate_chunk(self, source: str, target: str, text: str) -> str:
+        # 빈 줄만 있는 조각은 번역할 게 없다.
+        if text.strip() == '':
+            return text
+
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return await self.cache.get_or_fetch(
+            (source, target, digest),
+            lambda: self.fetch_translation(source, target, digest, text),
+        )
+
+    async def fetch_translation(
+        self, source: str, target: str, digest: str, text: str
+    ) -> str:
+        key = f'{source}:{target}:{digest}'
+        if self.config.persist_cache:
+            cached = await self.load_translation(key)
+            if cached is not None:
+                return cached
+
+        result = await self.request(source, target, text)
+
+        if self.config.persist_cache:
+            await self.save_translation(key, result)
+        return result
+
+    async def request(self, source: str, target: str, text: str) -> str:
+        if self.quota_reset_at is not None and pendulum.now() < self.quota_reset_at:
+            raise PapagoQuotaException('오늘 쓸 수 있는 파파고 번역 사용량을 모두 썼습니다.')
+
+        async def attempt() -> str:
+            async with self.semaphore:
+                await self.rate_limiter.acquire()
+                try:
+                    return await request_translation(
+                        self.httpx_client, self.config, source, target, text
+                    )
+                except RetryableError as e:
+                    # 한 요청이 거절당하면 다른 요청도 같이 늦춰서 429가 몰려오지 않게 한다.
+                    self.rate_limiter.defer(
+                        1.0 if e.retry_after is None else e.retry_after
+                    )
+                    raise
+
+        try:
+            return await retry(attempt, retry_on=(httpx.TransportError, RetryableError))
+        except PapagoQuotaException:
+            # 파파고 사용량은 한국 시간 자정에 초기화된다.
+            self.quota_reset_at = pendulum.tomorrow('Asia/Seoul')
+            raise
+        except (httpx.HTTPError, RetryableError) as e:
+            raise PapagoException(f'API 요청에 실패했습니다: {e}')
+
+    async def load_translation(self, key: str) -> Optional[str]:
+        try:
+            cached = await TranslationCacheModel.find_one(
+                {
+                    '_id': key,
+                    # TTL 인덱스는 바로 지워주지 않으므로 기한이 지난 번역은 직접 거른다.
+                    'created_at': {'$gt': datetime.utcnow() - TRANSLATION_CACHE_TTL},
+                }
+            )
+        except Exception as e:
+            # 저장해둔 번역을 못 읽어도 API로 번역하면 된다.
+            self.logger.warning('번역 결과를 읽지 못했습니다: %s', e)
+            return None
+
+        record_cache('papago_db', cached is not None)
+        return None if cached is None else cached.translated_text
+
+    async def save_translation(self, key: str, translated_text: str):
+        try:
+            await TranslationCacheModel(id=key, translated_text=translated_text).save()
+        except Exception as e:
+            self.logger.warning('번역 결과를 저장하지 못했습니다: %s', e)
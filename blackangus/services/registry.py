@@ -0,0 +1,21 @@
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar('T')
+
+# (서비스 클래스, 설정 JSON)마다 하나의 인스턴스만 만듭니다.
+_instances: Dict[Tuple[type, str], Any] = {}
+
+
+def get_service(service_class: Type[T], config: BaseModel) -> T:
+    """
+    같은 설정으로 만든 서비스는 프로세스 안에서 하나만 공유합니다.
+    서비스마다 boto3, httpx 클라이언트를 새로 만들지 않게 하기 위함입니다.
+    """
+    key = (service_class, config.json())
+
+    if key not in _instances:
+        _instances[key] = service_class(config)  # type: ignore
+
+    return _instances[key]
@@ -0,0 +1,105 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from blackangus.utils.metrics import record_cache
+
+V = TypeVar('V')
+
+
+@dataclasses.dataclass
+class CacheEntry(Generic[V]):
+    value: V
+    fetched_at: float
+
+
+class TTLCache(Generic[V]):
+    """
+    외부 API 응답을 메모리에 들고 있는 LRU 캐시.
+
+    ttl(초)이 지나지 않은 값은 그대로 돌려주고, ttl이 지났어도 stale_ttl 안이면
+    일단 예전 값을 돌려주면서 뒤에서 새로 받아옵니다(stale-while-revalidate).
+    같은 키를 동시에 여러 번 요청하면 실제 요청은 한 번만 보냅니다(single-flight).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_entries: int = 1024,
+    ):
+        self.logger = logging.getLogger('blackangus:cache')
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Hashable, CacheEntry[V]]' = OrderedDict()
+        self.inflight: Dict[Hashable, 'asyncio.Task[V]'] = {}
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry[V]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry.fetched_at >= self.ttl + self.stale_ttl:
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, value: V):
+        self.entries[key] = CacheEntry(value=value, fetched_at=time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def refresh(
+        self, key: Hashable, fetch: Callable[[], Awaitable[V]]
+    ) -> 'asyncio.Task[V]':
+        # 이미 받아오는 중이면 그 요청을 같이 기다린다.
+        task = self.inflight.get(key)
+        if task is not None:
+            return task
+
+        async def run() -> V:
+            try:
+                value = await fetch()
+                self.put(key, value)
+                return value
+            finally:
+                del self.inflight[key]
+
+        task = asyncio.create_task(run())
+        self.inflight[key] = task
+        return task
+
+    def refresh_in_background(self, key: Hashable, fetch: Callable[[], Awaitable[V]]):
+        def report(task: 'asyncio.Task[V]'):
+            if not task.cancelled() and task.exception() is not None:
+                self.logger.warning(
+                    '%s 캐시를 새로 받지 못해서 예전 값을 계속 씁니다: %s',
+                    self.name,
+                    task.exception(),
+                )
+
+        self.refresh(key, fetch).add_done_callback(report)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[V]]) -> V:
+        entry = self.peek(key)
+        if entry is not None:
+            record_cache(self.name, True)
+            if time.monotonic() - entry.fetched_at >= self.ttl:
+                self.refresh_in_background(key, fetch)
+            return entry.value
+
+        record_cache(self.name, False)
+        # 기다리던 쪽이 취소돼도 다른 쪽이 같이 기다리고 있을 수 있으니 요청은 끝까지 보낸다.
+        return await asyncio.shield(self.refresh(key, fetch))
@@ -0,0 +1,48 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from discord import Embed
+from discord.http import Route
+
+# 디스코드는 메세지 하나에 임베드를 10개까지, 임베드 글자 수는 모두 합쳐 6000자까지 받습니다.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS_PER_MESSAGE = 6000
+
+
+def group_embeds(embeds: Sequence[Embed]) -> List[List[Embed]]:
+    """임베드를 순서대로 메세지 하나에 들어갈 만큼씩 묶습니다."""
+    groups: List[List[Embed]] = []
+    characters = 0
+
+    for embed in embeds:
+        if (
+            len(groups) == 0
+            or len(groups[-1]) >= MAX_EMBEDS_PER_MESSAGE
+            or characters + len(embed) > MAX_EMBED_CHARACTERS_PER_MESSAGE
+        ):
+            groups.append([])
+            characters = 0
+
+        groups[-1].append(embed)
+        characters += len(embed)
+
+    return groups
+
+
+async def send_embeds(
+    channel: Any,
+    embeds: Sequence[Embed],
+    content: Optional[str] = None,
+):
+    """
+    임베드 여러 개를 되도록 적은 메세지로 보냅니다. content는 첫 메세지에 같이 보냅니다.
+    지금 쓰는 discord 라이브러리(1.7)의 send는 임베드를 하나만 받기 때문에 메세지 API를 직접 부릅니다.
+    """
+    route = Route('POST', '/channels/{channel_id}/messages', channel_id=channel.id)
+
+    groups = group_embeds(embeds) or [[]]
+    for (i, group) in enumerate(groups):
+        payload: Dict[str, Any] = {'embeds': [embed.to_dict() for embed in group]}
+        if i == 0 and content:
+            payload['content'] = content
+
+        await channel._state.http.request(route, json=payload)
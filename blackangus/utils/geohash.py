@@ -0,0 +1,62 @@
+from typing import List, Tuple
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int) -> str:
+    """
+    위도와 경도를 precision 글자의 geohash로 바꿉니다.
+    가까운 좌표는 같은 geohash가 되므로 위치를 칸 단위로 묶을 때 씁니다.
+    (5글자는 대략 5km, 6글자는 대략 1km 크기의 칸입니다.)
+    """
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    characters: List[str] = []
+    bits = 0
+    bit_count = 0
+    is_longitude = True
+
+    while len(characters) < precision:
+        # 경도와 위도를 번갈아가며 반으로 나눠서 어느 쪽에 있는지 한 비트씩 기록한다.
+        (value, value_range) = (
+            (longitude, longitude_range) if is_longitude else (latitude, latitude_range)
+        )
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits = bits << 1
+            value_range[1] = middle
+
+        is_longitude = not is_longitude
+        bit_count += 1
+        if bit_count == 5:
+            characters.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(characters)
+
+
+def decode_geohash(geohash: str) -> Tuple[float, float]:
+    """geohash 칸의 가운데 좌표(위도, 경도)를 반환합니다."""
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    is_longitude = True
+
+    for character in geohash:
+        bits = GEOHASH_ALPHABET.index(character)
+        for shift in range(4, -1, -1):
+            value_range = longitude_range if is_longitude else latitude_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            is_longitude = not is_longitude
+
+    return (
+        (latitude_range[0] + latitude_range[1]) / 2,
+        (longitude_range[0] + longitude_range[1]) / 2,
+    )
@@ -0,0 +1,383 @@
+import asyncio
+import bisect
+import logging
+import math
+import threading
+import time
+import urllib.parse
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+from blackangus.utils.tracing import record_finished_span, span
+
+# 기본 히스토그램 구간(초), 디스코드 봇 응답 시간 수준에 맞춰서 잡았습니다.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if len(names) == 0:
+        return ''
+
+    pairs = ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(names, values)
+    )
+    return f'{{{pairs}}}'
+
+
+class Metric(metaclass=ABCMeta):
+    """
+    Prometheus 형식으로 내보낼 수 있는 지표의 기본 클래스.
+    MongoDB 모니터링 콜백은 다른 스레드에서 불리기 때문에 값을 바꿀 때는 잠금을 겁니다.
+    """
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        pass
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+        for (suffix, labels, value) in self.samples():
+            lines.append(f'{self.name}{suffix}{labels} {value}')
+        return lines
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self.lock:
+            values = list(self.values.items())
+        for (key, value) in values:
+            yield '', format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self.label_values(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self.lock:
+            values = list(self.values.items())
+        for (key, value) in values:
+            yield '', format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨마다 [구간별 개수..., +Inf 개수], 합계
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self.label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+                self.sums[key] = 0.0
+            counts[index] += 1
+            self.sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self.lock:
+            values = [
+                (key, list(counts), self.sums[key])
+                for key, counts in self.counts.items()
+            ]
+
+        names = (*self.labelnames, 'le')
+        for (key, counts, total) in values:
+            cumulative = 0
+            for (bound, count) in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield '_bucket', format_labels(names, (*key, str(bound))), cumulative
+            yield '_sum', format_labels(self.labelnames, key), total
+            yield '_count', format_labels(self.labelnames, key), cumulative
+
+
+REGISTRY: List[Metric] = []
+
+COMMANDS_TOTAL = Counter(
+    'blackangus_commands_total',
+    '앱이 처리한 메세지 수',
+    ['app', 'result'],
+)
+QUEUE_DEPTH = Gauge(
+    'blackangus_queue_depth',
+    '앱 작업 큐에 쌓인 메세지 수',
+    ['app'],
+)
+STAGE_SECONDS = Histogram(
+    'blackangus_stage_seconds',
+    '앱의 단계(parse_command, present, send, action)별 처리 시간',
+    ['app', 'stage'],
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    'blackangus_external_call_seconds',
+    'MongoDB, S3, HTTP API, Playwright 등 외부 호출 시간',
+    ['service', 'operation', 'result'],
+)
+CACHE_REQUESTS_TOTAL = Counter(
+    'blackangus_cache_requests_total',
+    '캐시 조회 수',
+    ['cache', 'result'],
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    'blackangus_event_loop_lag_seconds',
+    '이벤트 루프가 예정보다 늦게 깨어난 시간',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+EVENT_LOOP_STALLS_TOTAL = Counter(
+    'blackangus_event_loop_stalls_total',
+    '감시 스레드가 알아챈 이벤트 루프 멈춤 횟수',
+)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """외부 호출 하나를 감싸서 걸린 시간과 성공 여부를 기록하고 스팬으로 남깁니다."""
+    started_at = time.perf_counter()
+    result = 'ok'
+    try:
+        with span(f'{service}.{operation}', service=service, operation=operation):
+            yield
+    except BaseException:
+        result = 'error'
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.observe(
+            time.perf_counter() - started_at,
+            service=service,
+            operation=operation,
+            result=result,
+        )
+
+
+@contextmanager
+def measure_stage(app: str, stage: str):
+    """앱의 처리 단계 하나를 스팬으로 남기고 단계별 시간 지표에도 기록합니다."""
+    with span(f'{app}.{stage}', app=app, stage=stage), STAGE_SECONDS.time(
+        app=app, stage=stage
+    ):
+        yield
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS_TOTAL.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """
+    pymongo가 재는 명령 시간을 그대로 가져다 씁니다.
+    motor는 컨텍스트를 복사해서 스레드 풀에서 명령을 실행하므로
+    여기서도 명령을 보낸 쪽의 현재 스팬 아래에 DB 스팬을 남길 수 있습니다.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        EXTERNAL_CALL_SECONDS.observe(
+            event.duration_micros / 1_000_000,
+            service='mongodb',
+            operation=event.command_name,
+            result='ok',
+        )
+        record_finished_span(
+            f'mongodb.{event.command_name}',
+            event.duration_micros,
+            service='mongodb',
+            operation=event.command_name,
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        EXTERNAL_CALL_SECONDS.observe(
+            event.duration_micros / 1_000_000,
+            service='mongodb',
+            operation=event.command_name,
+            result='error',
+        )
+        record_finished_span(
+            f'mongodb.{event.command_name}',
+            event.duration_micros,
+            error=str(event.failure),
+            service='mongodb',
+            operation=event.command_name,
+        )
+
+
+def instrument_boto3_client(client, service: str = 's3'):
+    """boto3 클라이언트의 모든 API 호출 시간을 기록하도록 이벤트를 겁니다."""
+
+    def before_call(context: dict, **kwargs):
+        context['blackangus_started_at'] = time.perf_counter()
+
+    def after_call(context: dict, http_response=None, model=None, **kwargs):
+        started_at = context.pop('blackangus_started_at', None)
+        if started_at is None:
+            return
+
+        success = http_response is not None and http_response.status_code < 400
+        elapsed = time.perf_counter() - started_at
+        operation = model.name if model is not None else 'unknown'
+        EXTERNAL_CALL_SECONDS.observe(
+            elapsed,
+            service=service,
+            operation=operation,
+            result='ok' if success else 'error',
+        )
+        record_finished_span(
+            f'{service}.{operation}',
+            int(elapsed * 1_000_000),
+            error=None if success else 'request failed',
+            service=service,
+            operation=operation,
+        )
+
+    client.meta.events.register(f'before-call.{service}', before_call)
+    client.meta.events.register(f'after-call.{service}', after_call)
+    return client
+
+
+async def handle_metrics_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    try:
+        request_line = await reader.readline()
+        # 헤더는 필요 없으니 버린다.
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+
+        parts = request_line.split()
+        url = (
+            urllib.parse.urlsplit(parts[1].decode('ascii')) if len(parts) >= 2 else None
+        )
+        if url is None or parts[0] != b'GET':
+            (status, body) = ('404 Not Found', b'not found\n')
+        elif url.path == '/metrics':
+            (status, body) = ('200 OK', render().encode('utf-8'))
+        elif url.path == '/debug/profile':
+            # 요청한 동안만 루프를 샘플링해서 flamegraph용 collapsed stack을 돌려준다.
+            from blackangus.utils.watchdog import profile_event_loop
+
+            query = urllib.parse.parse_qs(url.query)
+            try:
+                seconds = float(query.get('seconds', ['10'])[0])
+            except ValueError:
+                seconds = math.nan
+
+            if not 0 < seconds < math.inf:
+                (status, body) = ('400 Bad Request', b'invalid seconds\n')
+            else:
+                seconds = min(seconds, 60.0)
+                body = (await profile_event_loop(seconds)).encode('utf-8')
+                status = '200 OK'
+        else:
+            (status, body) = ('404 Not Found', b'not found\n')
+
+        writer.write(
+            f'HTTP/1.1 {status}\r\n'
+            'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n\r\n'.encode('ascii') + body
+        )
+        await writer.drain()
+    except Exception:
+        logging.getLogger('blackangus:metrics').exception('지표 요청을 처리하지 못했습니다.')
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    `GET /metrics`로 Prometheus 형식의 지표를 내보내는 HTTP 서버를 띄웁니다.
+    `GET /debug/profile?seconds=10`은 그동안 이벤트 루프를 샘플링한 결과를 돌려줍니다.
+    """
+    server = await asyncio.start_server(handle_metrics_request, host, port)
+    logging.getLogger('blackangus:metrics').info(
+        '지표 서버가 http://%s:%s/metrics 에서 실행 중입니다.', host, port
+    )
+    return server
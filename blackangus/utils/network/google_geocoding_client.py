@@ -1,9 +1,21 @@
+import logging
+import unicodedata
 import urllib.parse
-from typing import Tuple
+from datetime import datetime
+from typing import Optional, Tuple
 
 import httpx
 
 from blackangus.config import GoogleConfig
+from blackangus.models.geocode import GEOCODE_CACHE_TTL, GeocodeCacheModel
+from blackangus.utils.cache import TTLCache
+from blackangus.utils.metrics import external_call, record_cache
+
+# 사람들이 찾는 장소는 자주 겹치므로("강남역", "서울") 좌표를 메모리에도 들고 있습니다.
+# 메모리에 없으면 MongoDB에 저장해둔 좌표를 보고, 거기에도 없을 때만 API를 부릅니다.
+geocode_cache: TTLCache[Tuple[float, float]] = TTLCache(
+    'google_geocode', ttl=24 * 60 * 60, max_entries=1024
+)
 
 
 class GoogleAPIException(BaseException):
@@ -20,10 +32,11 @@ async def geocode_from_google(
     encoded_location = urllib.parse.quote(location)
 
     async with httpx.AsyncClient() as client:
-        response = await client.get(
-            'https://maps.googleapis.com/maps/api/geocode/json'
-            f'?address={encoded_location}&key={config.api_key}'
-        )
+        with external_call('google', 'geocode'):
+            response = await client.get(
+                'https://maps.googleapis.com/maps/api/geocode/json'
+                f'?address={encoded_location}&key={config.api_key}'
+            )
 
         if not response.is_success:
             raise GoogleAPIException(f'{response.status_code}: API 요청에 실패했습니다.')
@@ -40,3 +53,61 @@ async def geocode_from_google(
         longitude = response_data['results'][0]['geometry']['location']['lng']
 
         return latitude, longitude
+
+
+def normalize_address(location: str) -> str:
+    # 띄어쓰기, 대소문자, 한글 조합 방식만 다른 주소는 같은 주소로 본다.
+    return ' '.join(unicodedata.normalize('NFC', location).split()).lower()
+
+
+async def load_geocode(address: str) -> Optional[Tuple[float, float]]:
+    try:
+        cached = await GeocodeCacheModel.find_one(
+            {
+                '_id': address,
+                # TTL 인덱스는 바로 지워주지 않으므로 기한이 지난 좌표는 직접 거른다.
+                'created_at': {'$gt': datetime.utcnow() - GEOCODE_CACHE_TTL},
+            }
+        )
+    except Exception as e:
+        # 저장해둔 좌표를 못 읽어도 API로 찾으면 된다.
+        logging.getLogger('blackangus:geocode').warning('좌표를 읽지 못했습니다: %s', e)
+        return None
+
+    record_cache('google_geocode_db', cached is not None)
+    if cached is None:
+        return None
+    return cached.latitude, cached.longitude
+
+
+async def save_geocode(address: str, location: Tuple[float, float]):
+    try:
+        await GeocodeCacheModel(
+            id=address, latitude=location[0], longitude=location[1]
+        ).save()
+    except Exception as e:
+        logging.getLogger('blackangus:geocode').warning('좌표를 저장하지 못했습니다: %s', e)
+
+
+async def fetch_geocode(
+    config: GoogleConfig, address: str, location: str
+) -> Tuple[float, float]:
+    cached = await load_geocode(address)
+    if cached is not None:
+        return cached
+
+    # 정리한 주소는 캐시 키로만 쓰고, API에는 입력한 그대로 보낸다.
+    coordinates = await geocode_from_google(config, location)
+    await save_geocode(address, coordinates)
+    return coordinates
+
+
+async def geocode(config: GoogleConfig, location: str) -> Tuple[float, float]:
+    """
+    geocode_from_google과 같지만, 한 번 찾은 주소는 메모리와 MongoDB에서 바로 돌려줍니다.
+    같은 주소를 동시에 여러 번 찾으면 실제로는 한 번만 찾습니다.
+    """
+    address = normalize_address(location)
+    return await geocode_cache.get_or_fetch(
+        address, lambda: fetch_geocode(config, address, location)
+    )
@@ -1,5 +1,6 @@
 import datetime
-from typing import Tuple, List
+import itertools
+from typing import Any, Dict, Tuple, List, Optional
 from urllib.parse import urlencode
 
 import httpx
@@ -9,19 +10,31 @@ from blackangus.models.naver_map import (
     NaverMapDirectionModel,
     NaverMapDirectionProcessModel,
 )
+from blackangus.utils.cache import TTLCache
+from blackangus.utils.geohash import encode_geohash
+from blackangus.utils.metrics import external_call
+
+# 출발지와 도착지는 대략 150m 칸(geohash 7글자), 출발 시간은 분 단위로 묶어서 같은 경로 검색으로 봅니다.
+TRANSIT_GEOHASH_PRECISION = 7
+
+# 경로는 시간이 지나면 바로 달라지므로 잠깐만 들고 있습니다.
+# (출발지 칸, 도착지 칸, 출발 시간(분)) -> API가 돌려준 경로 목록
+transit_cache: 'TTLCache[List[Dict[str, Any]]]' = TTLCache(
+    'naver_transit', ttl=60, max_entries=256
+)
 
 
 class NaverMapClientException(BaseException):
     pass
 
 
-async def find_transit_path_from_locations(
+async def fetch_transit_paths(
     departure_time: pendulum.DateTime,
     location_from: Tuple[float, float],
     location_to: Tuple[float, float],
-) -> List[NaverMapDirectionModel]:
+) -> List[Dict[str, Any]]:
     """
-    네이버 지도 API를 통해 최적의 교통편을 찾아줍니다.
+    네이버 지도 API로 교통편을 찾아서 API가 돌려준 경로를 그대로 반환합니다.
     주의: 이것은 API를 후킹해서 쓰고 있는 것이기 때문에 막히거나 변경될 가능성이 있습니다.
 
     :param departure_time: 출발 시간
@@ -56,13 +69,12 @@ async def find_transit_path_from_locations(
         'includeDetailOperation': True,
     }
 
-    tz = pendulum.timezone('Asia/Seoul')  # type: ignore
-
     async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f'https://map.naver.com/v5/api/transit/directions/point-to-point?{urlencode(query_params)}',
-            headers=headers,
-        )
+        with external_call('naver_map', 'transit_directions'):
+            response = await client.get(
+                f'https://map.naver.com/v5/api/transit/directions/point-to-point?{urlencode(query_params)}',
+                headers=headers,
+            )
 
         if not response.is_success:
             raise NaverMapClientException(f'{response.status_code}: API 요청에 실패했습니다.')
@@ -72,95 +84,101 @@ async def find_transit_path_from_locations(
         if len(response_data.get('paths', list())) == 0:
             raise NaverMapClientException(f'갈 수 경로가 없습니다.')
 
-        results: List[NaverMapDirectionModel] = []
-
-        try:
-            for path in response_data['paths']:
-                direction_type = path['type']
-                labels = list(map(lambda x: x.get('labelText', ''), path['pathLabels']))
-                fare = path['fare']
-                distance = path['distance']
-                duration = path['duration']
-                walking_duration = path['walkingDuration']
-                transfers = path['transferCount']
-
-                if type(path['departureTime']) is datetime.datetime:
-                    departure_time = pendulum.instance(path['departureTime'], tz=tz)
-                else:
-                    departure_time = pendulum.parse(path['departureTime'], tz=tz)  # type: ignore
-
-                if type(path['arrivalTime']) is datetime.datetime:
-                    arrival_time = pendulum.instance(path['arrivalTime'], tz=tz)
-                else:
-                    arrival_time = pendulum.parse(path['arrivalTime'], tz=tz)  # type: ignore
-
-                processes: List[NaverMapDirectionProcessModel] = []
-
-                for process in path['legs'][0]['steps']:
-                    process_type = process['type']
-                    process_instruction = process['instruction']
-                    process_distance = process['distance']
-                    process_duration = process['duration']
-                    process_headsign = process['headsign']
-                    process_name = list(
-                        map(lambda x: x.get('longName', '없음'), process['routes'])
-                    )
-
-                    process_stations = process.get('stations', list())
-                    if len(process_stations) == 0:
-                        process_arrive_at = None
-                    else:
-                        process_arrive_at = process_stations[-1].get(
-                            'displayName', None
-                        )
-
-                    if type(process['departureTime']) is datetime.datetime:
-                        process_departure_time = pendulum.instance(
-                            process['departureTime'], tz=tz
-                        )
-                    else:
-                        process_departure_time = pendulum.parse(
-                            process['departureTime'], tz=tz
-                        )  # type: ignore
-
-                    if type(process['arrivalTime']) is datetime.datetime:
-                        process_arrival_time = pendulum.instance(
-                            path['arrivalTime'], tz=tz
-                        )
-                    else:
-                        process_arrival_time = pendulum.parse(
-                            path['arrivalTime'], tz=tz
-                        )  # type: ignore
-
-                    processes.append(
-                        NaverMapDirectionProcessModel(
-                            type=process_type,
-                            instruction=process_instruction,
-                            distance=process_distance,
-                            duration=process_duration,
-                            headsign=process_headsign,
-                            name=process_name,
-                            departure_time=process_departure_time,
-                            arrival_time=process_arrival_time,
-                            arrive_at=process_arrive_at,
-                        )
-                    )
-
-                results.append(
-                    NaverMapDirectionModel(
-                        type=direction_type,
-                        labels=labels,
-                        fare=fare,
-                        distance=distance,
-                        duration=duration,
-                        walking_duration=walking_duration,
-                        transfers=transfers,
-                        departure_time=departure_time,
-                        arrival_time=arrival_time,
-                        processes=processes,
-                    )
-                )
-        except Exception as e:
-            raise NaverMapClientException(f'결과 처리 과정 중 실패했습니다: {e}')
-
-        return results
+        return response_data['paths']
+
+
+async def find_transit_paths(
+    departure_time: pendulum.DateTime,
+    location_from: Tuple[float, float],
+    location_to: Tuple[float, float],
+) -> List[Dict[str, Any]]:
+    """
+    fetch_transit_paths와 같지만, 가까운 곳끼리 같은 분에 찾은 경로가 있으면 그 결과를 씁니다.
+    """
+    # 같은 분에 찾으면 같은 결과가 나오도록 초는 버리고 찾는다.
+    departure_time = departure_time.replace(second=0, microsecond=0)
+    key = (
+        encode_geohash(*location_from, TRANSIT_GEOHASH_PRECISION),
+        encode_geohash(*location_to, TRANSIT_GEOHASH_PRECISION),
+        int(departure_time.timestamp()) // 60,
+    )
+    return await transit_cache.get_or_fetch(
+        key, lambda: fetch_transit_paths(departure_time, location_from, location_to)
+    )
+
+
+def parse_time(value: Any) -> pendulum.DateTime:
+    tz = pendulum.timezone('Asia/Seoul')  # type: ignore
+
+    if type(value) is datetime.datetime:
+        return pendulum.instance(value, tz=tz)
+    return pendulum.parse(value, tz=tz)  # type: ignore
+
+
+def parse_transit_path(path: Dict[str, Any]) -> NaverMapDirectionModel:
+    processes: List[NaverMapDirectionProcessModel] = []
+
+    for process in path['legs'][0]['steps']:
+        process_stations = process.get('stations', list())
+        if len(process_stations) == 0:
+            process_arrive_at = None
+        else:
+            process_arrive_at = process_stations[-1].get('displayName', None)
+
+        processes.append(
+            NaverMapDirectionProcessModel(
+                type=process['type'],
+                instruction=process['instruction'],
+                distance=process['distance'],
+                duration=process['duration'],
+                headsign=process['headsign'],
+                name=list(map(lambda x: x.get('longName', '없음'), process['routes'])),
+                departure_time=parse_time(process['departureTime']),
+                arrival_time=parse_time(process['arrivalTime']),
+                arrive_at=process_arrive_at,
+            )
+        )
+
+    return NaverMapDirectionModel(
+        type=path['type'],
+        labels=list(map(lambda x: x.get('labelText', ''), path['pathLabels'])),
+        fare=path['fare'],
+        distance=path['distance'],
+        duration=path['duration'],
+        walking_duration=path['walkingDuration'],
+        transfers=path['transferCount'],
+        departure_time=parse_time(path['departureTime']),
+        arrival_time=parse_time(path['arrivalTime']),
+        processes=processes,
+    )
+
+
+def parse_transit_paths(
+    paths: List[Dict[str, Any]], count: Optional[int] = None
+) -> List[NaverMapDirectionModel]:
+    """
+    API가 돌려준 경로를 모델 객체로 바꿉니다. count를 주면 앞에서부터 count개만 바꿉니다.
+    """
+    try:
+        return [parse_transit_path(path) for path in itertools.islice(paths, count)]
+    except Exception as e:
+        raise NaverMapClientException(f'결과 처리 과정 중 실패했습니다: {e}')
+
+
+async def find_transit_path_from_locations(
+    departure_time: pendulum.DateTime,
+    location_from: Tuple[float, float],
+    location_to: Tuple[float, float],
+    count: Optional[int] = None,
+) -> List[NaverMapDirectionModel]:
+    """
+    네이버 지도 API를 통해 최적의 교통편을 찾아줍니다.
+
+    :param departure_time: 출발 시간
+    :param location_from: 출발 위치 (latitude, longitude 순서)
+    :param location_to: 도착 위치 (latitude, longitude 순서)
+    :param count: 주면 앞에서부터 count개의 경로만 반환합니다.
+    :return:
+    """
+    paths = await find_transit_paths(departure_time, location_from, location_to)
+    return parse_transit_paths(paths, count)
@@ -1,6 +1,10 @@
+from typing import Optional
+
 import httpx
 
 from blackangus.config import PapagoConfig
+from blackangus.utils.metrics import external_call
+from blackangus.utils.retry import RetryableError, parse_retry_after
 
 PAPAGO_LANGUAGE_MAP = {
     '한국어': 'ko',
@@ -19,21 +23,37 @@ PAPAGO_LANGUAGE_MAP = {
 }
 
 
+# 한 번에 번역할 수 있는 최대 글자 수
+PAPAGO_MAX_CHARACTERS = 5000
+PAPAGO_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# 잠시 뒤에 다시 시도하면 될 수도 있는 응답
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# 하루 사용량을 다 썼을 때 오는 오류 코드, 다음 날까지는 다시 시도해도 소용없다.
+QUOTA_EXCEEDED_CODE = '010'
+
+
 class PapagoException(BaseException):
     pass
 
 
-async def translate_from_papago(
-    config: PapagoConfig, language_from: str, language_to: str, text: str
+class PapagoQuotaException(PapagoException):
+    pass
+
+
+def error_code(response: httpx.Response) -> Optional[str]:
+    try:
+        return response.json().get('errorCode')
+    except ValueError:
+        return None
+
+
+async def request_translation(
+    client: httpx.AsyncClient, config: PapagoConfig, source: str, target: str, text: str
 ) -> str:
     """
-    파파고로 API를 번역합니다.
-
-    :param config: 파파고에 대한 API 설정
-    :param language_from: 원문 언어, 자연어로 입력해야합니다.
-    :param language_to: 번역될 언어, 자연어로 입력해야합니다.
-    :param text: 번역할 텍스트
-    :return: 번역된 결과
+    파파고 API로 text를 번역합니다. source와 target은 파파고의 언어 코드입니다.
+    429나 5xx 응답이면 다시 시도할 수 있도록 RetryableError를 냅니다.
     """
     headers = {
         'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
@@ -42,18 +62,27 @@ async def translate_from_papago(
     }
 
     data = {
-        'source': PAPAGO_LANGUAGE_MAP[language_from],
-        'target': PAPAGO_LANGUAGE_MAP[language_to],
+        'source': source,
+        'target': target,
         'text': text,
     }
 
-    async with httpx.AsyncClient() as client:
+    with external_call('papago', 'translate'):
         response = await client.post(
             'https://openapi.naver.com/v1/papago/n2mt', data=data, headers=headers
         )
 
-        if not response.is_success:
-            raise PapagoException(f'{response.status_code}: API 요청에 실패했습니다.')
+    if response.status_code == 429 and error_code(response) == QUOTA_EXCEEDED_CODE:
+        raise PapagoQuotaException('오늘 쓸 수 있는 파파고 번역 사용량을 모두 썼습니다.')
+
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        raise RetryableError(
+            f'{response.status_code}: API 요청에 실패했습니다.',
+            parse_retry_after(response.headers.get('retry-after')),
+        )
+
+    if not response.is_success:
+        raise PapagoException(f'{response.status_code}: API 요청에 실패했습니다.')
 
-        response_data = response.json()
-        return response_data['message']['result']['translatedText']
+    response_data = response.json()
+    return response_data['message']['result']['translatedText']
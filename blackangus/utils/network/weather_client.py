@@ -1,10 +1,18 @@
 import dataclasses
+import time
+from collections import Counter
 from typing import Tuple, Optional
 import urllib.parse
 
 import httpx
 
 from blackangus.config import WeatherConfig
+from blackangus.utils.cache import TTLCache
+from blackangus.utils.geohash import decode_geohash, encode_geohash
+from blackangus.utils.metrics import external_call
+
+# 날씨는 대략 5km 칸(geohash 5글자) 단위로 묶어서 가까운 주소끼리 같은 결과를 씁니다.
+WEATHER_GEOHASH_PRECISION = 5
 
 
 class WeatherAPIException(BaseException):
@@ -59,6 +67,19 @@ class AirPollutionModel:
     nh3: Optional[float] = None
 
 
+# OpenWeather의 날씨는 10분, 공기 오염도는 1시간쯤마다 바뀝니다.
+# geohash -> 결과
+weather_cache: 'TTLCache[WeatherModel]' = TTLCache(
+    'openweather_weather', ttl=10 * 60, stale_ttl=20 * 60, max_entries=1024
+)
+pollution_cache: 'TTLCache[AirPollutionModel]' = TTLCache(
+    'openweather_air_pollution', ttl=30 * 60, stale_ttl=60 * 60, max_entries=1024
+)
+
+# geohash -> 최근에 날씨를 찾은 횟수, 자주 찾는 곳은 미리 새로 받아둡니다.
+weather_requests: 'Counter[str]' = Counter()
+
+
 async def get_weather_from_openweather(
     config: WeatherConfig, location: Tuple[float, float]
 ) -> WeatherModel:
@@ -81,9 +102,10 @@ async def get_weather_from_openweather(
     )
 
     async with httpx.AsyncClient() as client:
-        response = await client.get(
-            'https://api.openweathermap.org/data/2.5/weather?' + data
-        )
+        with external_call('openweather', 'weather'):
+            response = await client.get(
+                'https://api.openweathermap.org/data/2.5/weather?' + data
+            )
 
         if not response.is_success:
             raise WeatherAPIException(f'{response.status_code}: API 요청에 실패했습니다.')
@@ -136,9 +158,10 @@ async def get_air_pollution_from_openweather(
     )
 
     async with httpx.AsyncClient() as client:
-        response = await client.get(
-            'https://api.openweathermap.org/data/2.5/air_pollution?' + data
-        )
+        with external_call('openweather', 'air_pollution'):
+            response = await client.get(
+                'https://api.openweathermap.org/data/2.5/air_pollution?' + data
+            )
 
         if not response.is_success:
             raise WeatherAPIException(f'{response.status_code}: API 요청에 실패했습니다.')
@@ -159,3 +182,71 @@ async def get_air_pollution_from_openweather(
             pm10=response_data['list'][0]['components'].get('pm10', None),
             nh3=response_data['list'][0]['components'].get('nh3', None),
         )
+
+
+def weather_bucket(location: Tuple[float, float]) -> Tuple[str, Tuple[float, float]]:
+    # 칸 안의 어느 주소로 찾든 같은 결과가 나오도록 칸의 가운데 좌표로 찾는다.
+    bucket = encode_geohash(location[0], location[1], WEATHER_GEOHASH_PRECISION)
+    return bucket, decode_geohash(bucket)
+
+
+async def get_weather(
+    config: WeatherConfig, location: Tuple[float, float]
+) -> WeatherModel:
+    """get_weather_from_openweather와 같지만, 가까운 곳을 최근에 찾았으면 그 결과를 씁니다."""
+    (bucket, center) = weather_bucket(location)
+    weather_requests[bucket] += 1
+    return await weather_cache.get_or_fetch(
+        bucket, lambda: get_weather_from_openweather(config, center)
+    )
+
+
+async def get_air_pollution(
+    config: WeatherConfig, location: Tuple[float, float]
+) -> AirPollutionModel:
+    """get_air_pollution_from_openweather와 같지만, 가까운 곳을 최근에 찾았으면 그 결과를 씁니다."""
+    (bucket, center) = weather_bucket(location)
+    return await pollution_cache.get_or_fetch(
+        bucket, lambda: get_air_pollution_from_openweather(config, center)
+    )
+
+
+def refresh_weather_bucket(config: WeatherConfig, bucket: str):
+    center = decode_geohash(bucket)
+    now = time.monotonic()
+
+    # 만료되기 전에 새로 받아둬서 다음 요청도 메모리에서 바로 돌려준다.
+    weather = weather_cache.peek(bucket)
+    if weather is None or now - weather.fetched_at >= weather_cache.ttl / 2:
+        weather_cache.refresh_in_background(
+            bucket, lambda: get_weather_from_openweather(config, center)
+        )
+
+    pollution = pollution_cache.peek(bucket)
+    if pollution is None or now - pollution.fetched_at >= pollution_cache.ttl / 2:
+        pollution_cache.refresh_in_background(
+            bucket, lambda: get_air_pollution_from_openweather(config, center)
+        )
+
+
+def refresh_popular_weather(
+    config: WeatherConfig, limit: int = 8, min_requests: int = 2
+) -> int:
+    """
+    최근에 min_requests번 넘게 찾은 곳 중 많이 찾은 limit곳의 날씨를 뒤에서 새로 받습니다.
+    찾은 횟수는 부를 때마다 반으로 줄여서, 한동안 안 찾은 곳은 목록에서 빠집니다.
+    """
+    buckets = [
+        bucket
+        for (bucket, count) in weather_requests.most_common(limit)
+        if count >= min_requests
+    ]
+    for bucket in buckets:
+        refresh_weather_bucket(config, bucket)
+
+    for bucket in list(weather_requests.keys()):
+        weather_requests[bucket] //= 2
+        if weather_requests[bucket] == 0:
+            del weather_requests[bucket]
+
+    return len(buckets)
@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    외부 API에 초당 rate번 넘게 요청하지 않도록 요청 사이의 간격을 벌립니다.
+    API가 너무 많이 요청했다고 알려주면 defer로 모든 요청을 한꺼번에 늦춥니다.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_at = 0.0
+
+    async def acquire(self):
+        # 자리를 먼저 잡고 기다리므로 동시에 불러도 interval 간격으로 차례대로 나간다.
+        now = time.monotonic()
+        wait = self.next_at - now
+        self.next_at = max(now, self.next_at) + self.interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def defer(self, seconds: float):
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+T = TypeVar('T')
+
+
+class RetryableError(Exception):
+    """
+    다시 시도하면 성공할 수도 있는 실패 (429, 5xx 응답 등).
+    retry_after(초)가 있으면 서버가 알려준 만큼 기다렸다가 다시 시도합니다.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 기다릴 시간(초)으로 바꿉니다."""
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    attempt번째 재시도 전에 기다릴 시간.
+    여러 요청이 한꺼번에 다시 몰리지 않게 0부터 지수 상한 사이에서 무작위로 고릅니다(full jitter).
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2**attempt)))
+
+
+async def retry(
+    operation: Callable[[], Awaitable[T]],
+    retry_on: Tuple[Type[BaseException], ...],
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 5.0,
+    max_retry_after: float = 30.0,
+) -> T:
+    """
+    operation을 실행하고, retry_on 예외가 나면 최대 attempts번까지 다시 시도합니다.
+    RetryableError에 retry_after가 있으면 그만큼 기다리되, max_retry_after보다 길면 포기합니다.
+    """
+    for attempt in range(attempts):
+        try:
+            return await operation()
+        except retry_on as e:
+            if attempt == attempts - 1:
+                raise
+
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is None:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            elif retry_after <= max_retry_after:
+                delay = retry_after
+            else:
+                raise
+
+            logging.getLogger('blackangus:retry').info(
+                '%s, %.2f초 뒤에 다시 시도합니다. (%d/%d)',
+                e,
+                delay,
+                attempt + 1,
+                attempts,
+            )
+            await asyncio.sleep(delay)
+
+    raise AssertionError('unreachable')
@@ -6,6 +6,8 @@ import httpx
 import pendulum
 from feedparser import FeedParserDict
 
+from blackangus.utils.metrics import external_call
+
 
 class RSSFetchException(BaseException):
     pass
@@ -24,7 +26,8 @@ async def fetch_rss_feed(
     timezone_seoul = pendulum.timezone('Asia/Seoul')  # type: ignore
 
     async with httpx.AsyncClient() as client:
-        response = await client.get(link)
+        with external_call('rss', 'fetch'):
+            response = await client.get(link)
 
         if 'xml' not in response.headers['content-type']:
             raise RSSFetchException('RSS Feed에서 XML을 읽어오는데 실패했습니다.')
@@ -0,0 +1,278 @@
+import dataclasses
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import orjson
+
+from blackangus.config import TracingConfig
+
+
+@dataclasses.dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    # 시작 시각은 epoch 마이크로초, 걸린 시간도 마이크로초
+    timestamp: int
+    duration: int = 0
+    attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    error: Optional[str] = None
+
+    # 같은 트레이스에서 끝난 스팬들을 모으는 목록, 루트 스팬과 공유합니다.
+    finished: List['Span'] = dataclasses.field(default_factory=list, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def to_zipkin(self) -> Dict[str, Any]:
+        tags = {
+            key: str(value)
+            for key, value in self.attributes.items()
+            if value is not None
+        }
+        if self.error is not None:
+            tags['error'] = self.error
+
+        value = {
+            'traceId': self.trace_id,
+            'id': self.span_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration': max(self.duration, 1),
+            'localEndpoint': {'serviceName': 'blackangus'},
+            'tags': tags,
+        }
+        if self.parent_id is not None:
+            value['parentId'] = self.parent_id
+        return value
+
+
+def new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def now_micros() -> int:
+    return time.time_ns() // 1000
+
+
+class TraceExporter(metaclass=ABCMeta):
+    """
+    끝난 트레이스를 별도 스레드에서 내보냅니다.
+    이벤트 루프에서 파일 쓰기나 HTTP 요청을 하지 않기 위함입니다.
+    """
+
+    def __init__(self, max_pending: int = 1024):
+        self.pending: 'queue.Queue[List[Span]]' = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(
+            target=self.loop, name='blackangus-trace-exporter', daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, spans: List[Span]):
+        try:
+            self.pending.put_nowait(spans)
+        except queue.Full:
+            logging.getLogger('blackangus:tracing').warning('트레이스를 버렸습니다.')
+
+    def loop(self):
+        while True:
+            spans = self.pending.get()
+            try:
+                self.export(spans)
+            except Exception:
+                logging.getLogger('blackangus:tracing').exception('트레이스를 내보내지 못했습니다.')
+
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        pass
+
+
+class JsonFileExporter(TraceExporter):
+    """트레이스 하나를 JSON 한 줄로 파일에 덧붙입니다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        super().__init__()
+
+    def export(self, spans: List[Span]):
+        line = orjson.dumps([span.to_dict() for span in spans])
+        with open(self.path, 'ab') as file:
+            file.write(line + b'\n')
+
+
+class ZipkinExporter(TraceExporter):
+    """로컬 수집기(Zipkin v2 JSON API를 받는 Zipkin, Jaeger, OTel Collector 등)로 보냅니다."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        super().__init__()
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=orjson.dumps([span.to_zipkin() for span in spans]),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+
+
+class Tracer:
+    enabled: bool = False
+    sample_rate: float = 0.0
+    slow_threshold: Optional[float] = None
+    exporter: Optional[TraceExporter] = None
+
+
+TRACER = Tracer()
+
+# 샘플링하지 않기로 한 트레이스 안에서는 이 값이 현재 스팬이 됩니다.
+NOT_RECORDING = Span(trace_id='', span_id='', parent_id=None, name='', timestamp=0)
+
+current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def configure(config: TracingConfig):
+    TRACER.enabled = config.enabled
+    TRACER.sample_rate = config.sample_rate
+    TRACER.slow_threshold = config.slow_threshold
+
+    if not config.enabled:
+        TRACER.exporter = None
+    elif config.exporter == 'zipkin':
+        TRACER.exporter = ZipkinExporter(config.endpoint)
+    else:
+        TRACER.exporter = JsonFileExporter(config.path)
+
+
+def format_breakdown(root: Span) -> str:
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in root.finished:
+        children.setdefault(span.parent_id, []).append(span)
+
+    lines: List[str] = []
+
+    def walk(span: Span, depth: int):
+        lines.append(f'{"  " * depth}{span.name}: {span.duration / 1000:.1f}ms')
+        for child in sorted(children.get(span.span_id, []), key=lambda x: x.timestamp):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return '\n'.join(lines)
+
+
+def finish_trace(root: Span):
+    seconds = root.duration / 1_000_000
+    slow = TRACER.slow_threshold is not None and seconds >= TRACER.slow_threshold
+
+    if slow:
+        logging.getLogger('blackangus:tracing').warning(
+            '느린 요청 (%.2f초):\n%s', seconds, format_breakdown(root)
+        )
+
+    # 샘플링된 트레이스와 느린 트레이스는 항상 내보낸다.
+    if TRACER.exporter is not None and (root.attributes.get('sampled') or slow):
+        TRACER.exporter.submit(root.finished)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    현재 트레이스 아래에 스팬을 엽니다. 트레이스가 없으면 새 루트 스팬이 됩니다.
+    트레이싱이 꺼져 있으면 아무것도 하지 않습니다.
+    """
+    parent = current_span.get()
+
+    if not TRACER.enabled or parent is NOT_RECORDING:
+        yield None
+        return
+
+    if parent is None:
+        sampled = random.random() < TRACER.sample_rate
+        # 샘플링하지 않더라도 느린 요청을 잡으려면 기록은 해야 한다.
+        if not sampled and TRACER.slow_threshold is None:
+            token = current_span.set(NOT_RECORDING)
+            try:
+                yield None
+            finally:
+                current_span.reset(token)
+            return
+
+        current = Span(
+            trace_id=new_id(16),
+            span_id=new_id(8),
+            parent_id=None,
+            name=name,
+            timestamp=now_micros(),
+            attributes={**attributes, 'sampled': sampled},
+        )
+    else:
+        current = Span(
+            trace_id=parent.trace_id,
+            span_id=new_id(8),
+            parent_id=parent.span_id,
+            name=name,
+            timestamp=now_micros(),
+            attributes=attributes,
+            finished=parent.finished,
+        )
+
+    token = current_span.set(current)
+    started_at = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        current_span.reset(token)
+        current.duration = int((time.perf_counter() - started_at) * 1_000_000)
+        current.finished.append(current)
+
+        if parent is None:
+            finish_trace(current)
+
+
+def record_finished_span(
+    name: str, duration_micros: int, error: Optional[str] = None, **attributes: Any
+):
+    """
+    이미 끝난 작업(예: MongoDB 명령)을 현재 스팬의 자식으로 남깁니다.
+    pymongo 모니터링 콜백처럼 직접 감쌀 수 없는 곳에서 씁니다.
+    """
+    parent = current_span.get()
+    if not TRACER.enabled or parent is None or parent is NOT_RECORDING:
+        return
+
+    parent.finished.append(
+        Span(
+            trace_id=parent.trace_id,
+            span_id=new_id(8),
+            parent_id=parent.span_id,
+            name=name,
+            timestamp=now_micros() - duration_micros,
+            duration=duration_micros,
+            attributes=attributes,
+            error=error,
+        )
+    )
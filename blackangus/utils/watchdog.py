@@ -0,0 +1,165 @@
+import asyncio
+import collections
+import dataclasses
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Counter, Deque, List, Optional
+
+from blackangus.config import WatchdogConfig
+from blackangus.utils.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS_TOTAL
+
+
+@dataclasses.dataclass
+class Stall:
+    started_at: float
+    # 멈춘 걸 알아챘을 때까지 지난 시간(초)
+    seconds: float
+    task: Optional[str]
+    stack: List[str]
+
+
+def describe_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{code.co_name} ({module}:{frame.f_lineno})'
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """flamegraph.pl이나 speedscope가 읽는 `바깥;...;안쪽` 형식으로 만듭니다."""
+    names: List[str] = []
+    while frame is not None:
+        names.append(describe_frame(frame).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def running_task_name(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    # 다른 스레드에서 asyncio.current_task를 부를 수는 없으니 내부 테이블을 읽기만 한다.
+    task = getattr(asyncio.tasks, '_current_tasks', {}).get(loop)
+    if task is None:
+        return None
+    return f'{task.get_name()} {task.get_coro()!r}'
+
+
+class LoopWatchdog:
+    """
+    이벤트 루프가 멈추는 것을 감시합니다.
+
+    루프 안에서는 interval마다 심장 박동을 남기면서 늦게 깨어난 시간을 기록하고,
+    별도 스레드에서는 마지막 박동이 threshold보다 오래되면 그때 루프 스레드가
+    실행하고 있던 스택을 잡아서 로그로 남깁니다. 루프가 막혀 있는 동안 잡은 스택이므로
+    루프를 막은 코드가 그대로 드러납니다.
+    """
+
+    def __init__(self, config: WatchdogConfig):
+        self.logger = logging.getLogger('blackangus:watchdog')
+        self.config = config
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.last_beat = time.monotonic()
+        self.reported_beat: Optional[float] = None
+        self.stalls: Deque[Stall] = collections.deque(maxlen=config.history)
+        self.stopped = threading.Event()
+
+    async def heartbeat(self):
+        loop = asyncio.get_running_loop()
+        interval = self.config.interval
+
+        while True:
+            started_at = loop.time()
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(interval)
+            EVENT_LOOP_LAG_SECONDS.observe(
+                max(0.0, loop.time() - started_at - interval)
+            )
+
+    def watch(self):
+        while not self.stopped.wait(self.config.interval / 2):
+            beat = self.last_beat
+            elapsed = time.monotonic() - beat
+            # 같은 멈춤은 한 번만 알린다.
+            if elapsed < self.config.threshold or self.reported_beat == beat:
+                continue
+
+            self.reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stall = Stall(
+                started_at=time.time() - elapsed,
+                seconds=elapsed,
+                task=running_task_name(self.loop),
+                stack=traceback.format_stack(frame) if frame is not None else [],
+            )
+            self.stalls.append(stall)
+            EVENT_LOOP_STALLS_TOTAL.inc()
+            self.logger.warning(
+                '이벤트 루프가 %.3f초 넘게 멈췄습니다. (작업: %s)\n%s',
+                stall.seconds,
+                stall.task,
+                ''.join(stall.stack),
+            )
+
+    def start(self) -> asyncio.Task:
+        """실행 중인 이벤트 루프에서 불러야 합니다. 심장 박동 태스크를 돌려줍니다."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+
+        threading.Thread(
+            target=self.watch, name='blackangus-watchdog', daemon=True
+        ).start()
+        return asyncio.create_task(self.heartbeat())
+
+    def stop(self):
+        self.stopped.set()
+
+
+class SamplingProfiler:
+    """
+    일정 간격으로 대상 스레드의 스택을 뽑아서 같은 스택끼리 셉니다.
+    결과는 flamegraph.pl, speedscope 등이 읽는 collapsed stack 형식입니다.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[collapse_stack(frame)] += 1
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.sample, name='blackangus-profiler', daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> str:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return ''.join(
+            f'{stack} {count}\n' for (stack, count) in self.samples.most_common()
+        )
+
+
+async def profile_event_loop(seconds: float, interval: float = 0.005) -> str:
+    """지금 돌고 있는 이벤트 루프 스레드를 seconds초 동안 샘플링합니다."""
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        result = profiler.stop()
+    return result
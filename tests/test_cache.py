@@ -0,0 +1,141 @@
+import asyncio
+import types
+
+import pytest
+
+from blackangus.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(
+        'blackangus.utils.cache.time', types.SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+class Source:
+    """부를 때마다 1씩 커지는 값을 돌려주는 가짜 API."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error = None
+
+    async def fetch(self) -> int:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_fresh_value_is_cached(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10)
+    source = Source()
+
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+    clock.now += 9
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+    assert source.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_value_is_fetched_again(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10, stale_ttl=5)
+    source = Source()
+
+    await cache.get_or_fetch('key', source.fetch)
+    clock.now += 15
+    assert await cache.get_or_fetch('key', source.fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_revalidating(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10, stale_ttl=5)
+    source = Source()
+
+    await cache.get_or_fetch('key', source.fetch)
+    clock.now += 12
+    source.release.clear()
+
+    # 새 값을 받는 동안에도 예전 값을 바로 돌려준다.
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+    await asyncio.sleep(0)
+    # 새로 받는 요청은 하나만 나간다.
+    assert source.calls == 2
+
+    source.release.set()
+    await cache.inflight['key']
+    assert await cache.get_or_fetch('key', source.fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_revalidation_keeps_stale_value(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10, stale_ttl=5)
+    source = Source()
+
+    await cache.get_or_fetch('key', source.fetch)
+    clock.now += 12
+    source.error = RuntimeError('API error')
+
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+    await asyncio.gather(cache.inflight['key'], return_exceptions=True)
+    assert await cache.get_or_fetch('key', source.fetch) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10)
+    source = Source()
+    source.release.clear()
+
+    waiters = [
+        asyncio.create_task(cache.get_or_fetch('key', source.fetch)) for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    source.release.set()
+
+    assert await asyncio.gather(*waiters) == [1] * 5
+    assert source.calls == 1
+    assert cache.inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_fetch(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10)
+    source = Source()
+    source.release.clear()
+
+    first = asyncio.create_task(cache.get_or_fetch('key', source.fetch))
+    second = asyncio.create_task(cache.get_or_fetch('key', source.fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    source.release.set()
+
+    assert await second == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache: TTLCache[int] = TTLCache('test', ttl=10, max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.peek('a') is not None
+
+    cache.put('c', 3)
+    assert cache.peek('b') is None
+    assert [key for key in cache.entries] == ['a', 'c']
@@ -0,0 +1,154 @@
+import asyncio
+import types
+from typing import List
+
+import discord
+import pytest
+
+from blackangus.apps.base import BaseResponseApp
+from blackangus.config import AppLimitConfig
+from blackangus.dispatcher import AppDispatcher, AppWorkQueue
+
+
+class FakeChannel:
+    def __init__(self):
+        self.id = 1
+        self.embeds = []
+
+    async def send(self, embed=None, **kwargs):
+        self.embeds.append(embed)
+
+
+def message(content: str = '!test'):
+    return types.SimpleNamespace(
+        clean_content=content, guild=None, channel=FakeChannel()
+    )
+
+
+class BlockingApp(BaseResponseApp):
+    """release가 설정될 때까지 action을 끝내지 않는 앱."""
+
+    def __init__(self, error: bool = False):
+        self.started: List[discord.Message] = []
+        self.finished: List[discord.Message] = []
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def action(self, context):
+        self.started.append(context)
+        await self.release.wait()
+        if self.error:
+            raise RuntimeError('broken app')
+        self.finished.append(context)
+
+
+def dispatcher(app: BaseResponseApp, **limits) -> AppDispatcher:
+    # 설정 파일의 bot.app_limits로 앱의 기본값을 덮어쓴다.
+    config = types.SimpleNamespace(
+        bot=types.SimpleNamespace(
+            app_limits={type(app).__name__: AppLimitConfig(**limits)}
+        )
+    )
+    return AppDispatcher(config, [app])  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_is_full():
+    app = BlockingApp()
+    queue = AppWorkQueue(app, concurrency=1, queue_size=1, timeout=5)
+
+    assert queue.submit(message())
+    # 작업자가 첫 메세지를 꺼내가야 큐에 자리가 난다.
+    await asyncio.sleep(0)
+    assert queue.submit(message())
+    assert not queue.submit(message())
+
+    app.release.set()
+    await queue.queue.join()
+    assert len(app.finished) == 2
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_replies_busy_when_rejected():
+    app = BlockingApp()
+    target = dispatcher(app, concurrency=1, queue_size=1)
+
+    first = message()
+    await target.dispatch(first)
+    await asyncio.sleep(0)
+    await target.dispatch(message())
+    rejected = message()
+    await target.dispatch(rejected)
+
+    assert target.queues[0].rejected == 1
+    assert first.channel.embeds == []
+    assert len(rejected.channel.embeds) == 1
+    assert '요청이 많아서' in rejected.channel.embeds[0].description
+
+    app.release.set()
+    await target.join()
+    await target.close()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_skips_apps_that_are_not_targets():
+    app = BlockingApp()
+    app.disabled = True
+    target = dispatcher(app)
+
+    await target.dispatch(message())
+
+    assert target.queues[0].workers == []
+    assert target.queues[0].queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_timeout_replies_and_keeps_worker_alive():
+    app = BlockingApp()
+    queue = AppWorkQueue(app, concurrency=1, queue_size=4, timeout=0.01)
+
+    slow = message()
+    queue.submit(slow)
+    await queue.queue.join()
+
+    assert len(slow.channel.embeds) == 1
+    assert '너무 오래' in slow.channel.embeds[0].description
+
+    # 시간 초과 뒤에도 같은 작업자가 다음 메세지를 처리한다.
+    app.release.set()
+    queue.submit(message())
+    await queue.queue.join()
+    assert len(app.finished) == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_error_does_not_stop_worker():
+    app = BlockingApp(error=True)
+    app.release.set()
+    queue = AppWorkQueue(app, concurrency=1, queue_size=4, timeout=5)
+
+    queue.submit(message())
+    queue.submit(message())
+    await queue.queue.join()
+
+    assert len(app.started) == 2
+    assert not any(worker.done() for worker in queue.workers)
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_workers():
+    app = BlockingApp()
+    queue = AppWorkQueue(app, concurrency=3, queue_size=4, timeout=5)
+    queue.submit(message())
+    await asyncio.sleep(0)
+
+    workers = list(queue.workers)
+    assert len(workers) == 3
+    await queue.close()
+
+    assert queue.workers == []
+    assert all(worker.cancelled() for worker in workers)
+    assert app.finished == []
@@ -0,0 +1,65 @@
+import types
+
+import pytest
+from discord import Embed
+
+from blackangus.utils.embeds import group_embeds, send_embeds
+
+
+def embeds(count, length=10):
+    return [Embed(title=str(i), description='x' * length) for i in range(count)]
+
+
+def test_group_embeds_by_count():
+    groups = group_embeds(embeds(25))
+
+    assert [len(group) for group in groups] == [10, 10, 5]
+
+
+def test_group_embeds_by_characters():
+    # 2001 + 2 + 2001 + 3 + 2001 + 4 > 6000
+    groups = group_embeds(embeds(4, length=2000))
+
+    assert [len(group) for group in groups] == [2, 2]
+    assert all(sum(len(embed) for embed in group) <= 6000 for group in groups)
+
+
+def test_group_embeds_keeps_order():
+    items = embeds(12)
+    groups = group_embeds(items)
+
+    assert [embed for group in groups for embed in group] == items
+    assert group_embeds([]) == []
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.payloads = []
+
+    async def request(self, route, json):
+        self.payloads.append((route.path, json))
+
+
+def fake_channel():
+    return types.SimpleNamespace(id=1, _state=types.SimpleNamespace(http=FakeHTTP()))
+
+
+@pytest.mark.asyncio
+async def test_send_embeds_sends_content_once():
+    channel = fake_channel()
+    await send_embeds(channel, embeds(15), content='결과')
+
+    payloads = [payload for (_, payload) in channel._state.http.payloads]
+    assert [len(payload['embeds']) for payload in payloads] == [10, 5]
+    assert payloads[0]['content'] == '결과'
+    assert 'content' not in payloads[1]
+
+
+@pytest.mark.asyncio
+async def test_send_embeds_without_embeds_sends_content():
+    channel = fake_channel()
+    await send_embeds(channel, [], content='결과')
+
+    assert channel._state.http.payloads == [
+        ('/channels/{channel_id}/messages', {'embeds': [], 'content': '결과'})
+    ]
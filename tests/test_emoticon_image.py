@@ -0,0 +1,241 @@
+from io import BytesIO
+
+import httpx
+import pytest
+from PIL import Image
+
+from blackangus.services.emoticon import (
+    EmoticonException,
+    ImageBuffer,
+    content_range_start,
+    download_file,
+    sniff_image_format,
+)
+
+
+def png(width=4, height=3) -> bytes:
+    output = BytesIO()
+    Image.new('RGB', (width, height)).save(output, format='PNG')
+    return output.getvalue()
+
+
+@pytest.mark.parametrize(
+    ('head', 'expected'),
+    [
+        (b'\x89PNG\r\n\x1a\n\x00\x00\x00\x0d', 'png'),
+        (b'GIF89a\x01\x00\x01\x00\x00\x00', 'gif'),
+        (b'GIF87a\x01\x00\x01\x00\x00\x00', 'gif'),
+        (b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01', 'jpg'),
+        (b'RIFF\x24\x00\x00\x00WEBP', 'webp'),
+        (b'RIFF\x24\x00\x00\x00WAVE', None),
+        (b'<!DOCTYPE html>', None),
+        (b'', None),
+    ],
+)
+def test_sniff_image_format(head, expected):
+    assert sniff_image_format(head) == expected
+
+
+def test_content_range_start():
+    assert content_range_start('bytes 100-199/200') == 100
+    assert content_range_start('bytes */200') is None
+    assert content_range_start(None) is None
+
+
+def test_image_buffer_reads_image():
+    content = png()
+    image = ImageBuffer(max_bytes=1024)
+    for start in range(0, len(content), 5):
+        image.write(content[start : start + 5])
+
+    downloaded = image.finish()
+    assert downloaded.extension == 'png'
+    assert downloaded.content == content
+    assert (downloaded.info.width, downloaded.info.height) == (4, 3)
+
+
+def test_image_buffer_rejects_non_image_early():
+    image = ImageBuffer(max_bytes=1024)
+    with pytest.raises(EmoticonException):
+        image.write(b'<html><body>not found</body></html>')
+
+
+def test_image_buffer_rejects_large_image():
+    image = ImageBuffer(max_bytes=16)
+    with pytest.raises(EmoticonException):
+        image.check_length(17)
+    with pytest.raises(EmoticonException):
+        image.write(png())
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Content-Length 없이 content를 조금씩 보내는 응답 본문."""
+
+    def __init__(self, content: bytes, size: int = 5):
+        self.content = content
+        self.size = size
+
+    async def __aiter__(self):
+        for start in range(0, len(self.content), self.size):
+            yield self.content[start : start + self.size]
+
+
+def serve(content: bytes) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=ChunkedStream(content))
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_download_reads_image():
+    content = png()
+    async with serve(content) as http:
+        downloaded = await download_file(http, 'https://example.com/a')
+
+    assert downloaded.extension == 'png'
+    assert downloaded.content == content
+    assert (downloaded.info.width, downloaded.info.height) == (4, 3)
+    assert downloaded.info.size == len(content)
+
+
+@pytest.mark.asyncio
+async def test_download_rejects_non_image():
+    async with serve(b'<html><body>not found</body></html>') as http:
+        with pytest.raises(EmoticonException):
+            await download_file(http, 'https://example.com/a')
+
+
+@pytest.mark.asyncio
+async def test_download_rejects_large_image():
+    async with serve(png()) as http:
+        with pytest.raises(EmoticonException):
+            await download_file(http, 'https://example.com/a', max_bytes=16)
+
+
+@pytest.mark.asyncio
+async def test_download_rejects_large_content_length():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=png())
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        with pytest.raises(EmoticonException):
+            await download_file(http, 'https://example.com/a', max_bytes=16)
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """content를 보내다가 중간에 연결이 끊기는 응답 본문."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    async def __aiter__(self):
+        yield self.content
+        raise httpx.ReadError('connection reset')
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr('blackangus.utils.retry.backoff_delay', lambda *args: 0)
+
+
+@pytest.mark.asyncio
+async def test_download_resumes_with_range(no_backoff):
+    content = png(64, 64)
+    half = len(content) // 2
+    ranges = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ranges.append(request.headers.get('range'))
+        if 'range' not in request.headers:
+            return httpx.Response(
+                200,
+                headers={'accept-ranges': 'bytes'},
+                stream=BrokenStream(content[:half]),
+            )
+        return httpx.Response(
+            206,
+            headers={
+                'content-range': f'bytes {half}-{len(content) - 1}/{len(content)}'
+            },
+            content=content[half:],
+        )
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        downloaded = await download_file(http, 'https://example.com/a.png')
+
+    assert ranges == [None, f'bytes={half}-']
+    assert downloaded.content == content
+
+
+@pytest.mark.asyncio
+async def test_download_restarts_when_server_ignores_range(no_backoff):
+    content = png(64, 64)
+    half = len(content) // 2
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(
+                200,
+                headers={'accept-ranges': 'bytes'},
+                stream=BrokenStream(content[:half]),
+            )
+        # Range를 무시하고 처음부터 보낸다.
+        return httpx.Response(200, content=content)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        downloaded = await download_file(http, 'https://example.com/a.png')
+
+    assert downloaded.content == content
+
+
+@pytest.mark.asyncio
+async def test_download_does_not_resume_without_range_support(no_backoff):
+    content = png(64, 64)
+    half = len(content) // 2
+    ranges = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ranges.append(request.headers.get('range'))
+        if len(ranges) == 1:
+            return httpx.Response(200, stream=BrokenStream(content[:half]))
+        return httpx.Response(200, content=content)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        downloaded = await download_file(http, 'https://example.com/a.png')
+
+    assert ranges == [None, None]
+    assert downloaded.content == content
+
+
+@pytest.mark.asyncio
+async def test_download_rejects_mismatched_content_range(no_backoff):
+    content = png(64, 64)
+    half = len(content) // 2
+    ranges = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ranges.append(request.headers.get('range'))
+        if len(ranges) == 1:
+            return httpx.Response(
+                200,
+                headers={'accept-ranges': 'bytes'},
+                stream=BrokenStream(content[:half]),
+            )
+        if len(ranges) == 2:
+            # 요청한 위치와 다른 곳부터 보낸다.
+            return httpx.Response(
+                206,
+                headers={'content-range': f'bytes 0-{len(content) - 1}/{len(content)}'},
+                content=content,
+            )
+        return httpx.Response(200, content=content)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+        downloaded = await download_file(http, 'https://example.com/a.png')
+
+    # 이어 받기를 포기하고 처음부터 다시 받는다.
+    assert ranges == [None, f'bytes={half}-', None]
+    assert downloaded.content == content
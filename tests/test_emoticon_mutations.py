@@ -0,0 +1,246 @@
+from io import BytesIO
+
+import httpx
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+from pymongo.errors import BulkWriteError
+
+from blackangus.config import EmoticonConfig
+from blackangus.models.emoticon.main import (
+    EmoticonImageInfoModel,
+    EmoticonModel,
+    EmoticonVariantModel,
+)
+from blackangus.services.emoticon import EmoticonException
+from blackangus.services.emoticon.main import (
+    EmoticonMutation,
+    EmoticonMutationResult,
+    EmoticonMutationType,
+    EmoticonService,
+)
+
+CREATE = EmoticonMutationType.CREATE
+RENAME = EmoticonMutationType.RENAME
+REMOVE = EmoticonMutationType.REMOVE
+
+
+def png() -> bytes:
+    output = BytesIO()
+    Image.new('RGB', (4, 4)).save(output, format='PNG')
+    return output.getvalue()
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Body, Key):
+        self.objects[Key] = Body
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self.objects.pop(item['Key'], None)
+
+
+def serve_images(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith('/missing'):
+        return httpx.Response(404)
+    return httpx.Response(200, content=png())
+
+
+@pytest_asyncio.fixture
+async def service(monkeypatch):
+    await init_beanie(
+        database=AsyncMongoMockClient()['blackangus'],
+        document_models=[EmoticonModel],
+    )
+
+    s3 = FakeS3()
+    monkeypatch.setattr(
+        'blackangus.services.emoticon.main.boto3.client', lambda *args, **kwargs: s3
+    )
+    monkeypatch.setattr(
+        'blackangus.services.emoticon.main.instrument_boto3_client',
+        lambda client: client,
+    )
+    service = EmoticonService(
+        EmoticonConfig(
+            s3_bucket='bucket',
+            s3_access_key='access',
+            s3_secret_key='secret',
+            s3_region='ap-northeast-2',
+            api_endpoint={},
+            variant_workers=0,
+        )
+    )
+    service.httpx_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(serve_images)
+    )
+    return service
+
+
+async def live_names():
+    emoticons = await EmoticonModel.find({'removed': False}).to_list()
+    return sorted(emoticon.name for emoticon in emoticons)
+
+
+async def add(name: str):
+    await EmoticonModel(
+        name=name,
+        original_url=f'https://example.com/{name}.png',
+        image_path=f'images/{name}.png',
+    ).create()
+
+
+@pytest.mark.asyncio
+async def test_apply_mutations_in_order(service):
+    await add('A')
+    await add('B')
+
+    result = await service.apply_mutations(
+        [
+            EmoticonMutation(CREATE, 'C', 'https://example.com/c.png'),
+            EmoticonMutation(RENAME, 'A', 'D'),
+            # 이름을 바꿔서 비운 이름은 같은 요청 안에서 다시 쓸 수 있다.
+            EmoticonMutation(CREATE, 'A', 'https://example.com/a.png'),
+            EmoticonMutation(REMOVE, 'B'),
+        ]
+    )
+
+    assert result == EmoticonMutationResult(created=2, modified=2)
+    assert await live_names() == ['A', 'C', 'D']
+    assert len(service.s3.objects) == 2
+    assert await service.search('D') == ['D']
+    assert await service.search('B') == []
+
+
+@pytest.mark.asyncio
+async def test_apply_mutations_keeps_search_index_in_sync(service):
+    await add('A')
+    # 색인을 먼저 읽어두면 이후 변경은 색인에 바로 반영된다.
+    assert await service.search('A') == ['A']
+
+    await service.apply_mutations(
+        [
+            EmoticonMutation(RENAME, 'A', 'AB'),
+            EmoticonMutation(CREATE, 'AC', 'https://example.com/ac.png'),
+        ]
+    )
+
+    assert await service.search('A') == ['AB', 'AC']
+
+
+@pytest.mark.parametrize(
+    'mutations',
+    [
+        # 이미 있는 이름을 추가
+        [EmoticonMutation(CREATE, 'A', 'https://example.com/a.png')],
+        # 같은 요청 안에서 겹치는 이름
+        [
+            EmoticonMutation(CREATE, 'C', 'https://example.com/c.png'),
+            EmoticonMutation(CREATE, 'C', 'https://example.com/c.png'),
+        ],
+        # 없는 이모티콘의 이름을 바꾸거나 삭제
+        [EmoticonMutation(RENAME, 'X', 'Y')],
+        [EmoticonMutation(REMOVE, 'A'), EmoticonMutation(REMOVE, 'A')],
+        # 이미 있는 이름으로 바꾸기
+        [EmoticonMutation(RENAME, 'A', 'B')],
+        # URL이나 새 이름이 빠짐
+        [EmoticonMutation(CREATE, 'C')],
+        [EmoticonMutation(RENAME, 'A')],
+    ],
+)
+@pytest.mark.asyncio
+async def test_apply_mutations_checks_everything_first(service, mutations):
+    await add('A')
+    await add('B')
+
+    with pytest.raises(EmoticonException):
+        await service.apply_mutations(
+            [EmoticonMutation(CREATE, 'Z', 'https://example.com/z.png'), *mutations]
+        )
+
+    # 검사에서 걸리면 아무것도 올리거나 쓰지 않는다.
+    assert await live_names() == ['A', 'B']
+    assert service.s3.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_apply_no_mutations(service):
+    assert await service.apply_mutations([]) == EmoticonMutationResult(
+        created=0, modified=0
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_removes_other_uploads(service):
+    with pytest.raises(EmoticonException):
+        await service.apply_mutations(
+            [
+                EmoticonMutation(CREATE, 'A', 'https://example.com/a.png'),
+                EmoticonMutation(CREATE, 'B', 'https://example.com/missing.png'),
+            ]
+        )
+
+    assert await live_names() == []
+    assert service.s3.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_bulk_write_reports_progress(service, monkeypatch):
+    await add('A')
+    assert await service.search('A') == ['A']
+
+    async def bulk_write(self, operations, ordered):
+        # 두 번째 작업에서 실패해서 첫 번째 작업만 반영된 상황
+        await self.insert_one(operations[0]._doc)
+        raise BulkWriteError(
+            {
+                'writeErrors': [{'index': 1, 'errmsg': 'E11000 duplicate key'}],
+                'nInserted': 1,
+                'nModified': 0,
+            }
+        )
+
+    collection = EmoticonModel.get_motor_collection()
+    monkeypatch.setattr(type(collection), 'bulk_write', bulk_write)
+
+    with pytest.raises(EmoticonException) as error:
+        await service.apply_mutations(
+            [
+                EmoticonMutation(CREATE, 'B', 'https://example.com/b.png'),
+                EmoticonMutation(CREATE, 'C', 'https://example.com/c.png'),
+            ]
+        )
+
+    assert '2번째 작업' in str(error.value)
+    assert '추가 1건' in str(error.value)
+    # 반영된 B의 이미지만 남고, 들어가지 못한 C의 이미지는 지운다.
+    [document] = await EmoticonModel.find({'name': 'B'}).to_list()
+    assert list(service.s3.objects) == [document.image_path]
+    # 색인은 DB에서 다시 읽는다.
+    assert await service.search('B') == ['B']
+
+
+@pytest.mark.asyncio
+async def test_duplicate_copies_image_metadata(service):
+    info = EmoticonImageInfoModel(format='png', width=4, height=4, frames=1, size=10)
+    variant = EmoticonVariantModel(
+        path='images/a_2x2.png', format='png', width=2, height=2, size=5
+    )
+    await EmoticonModel(
+        name='A',
+        original_url='https://example.com/a.png',
+        image_path='images/a.png',
+        image_info=info,
+        variants=[variant],
+    ).create()
+
+    duplicated = await service.duplicate('A', 'B')
+
+    assert duplicated.image_info == info
+    assert duplicated.variants == [variant]
+    assert duplicated.image_path == 'images/a.png'
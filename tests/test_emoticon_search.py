@@ -0,0 +1,81 @@
+import pytest
+
+from blackangus.services.emoticon.search import (
+    EmoticonSearchIndex,
+    deletions,
+    ngrams,
+    query_ngrams,
+)
+
+
+@pytest.fixture
+def index():
+    # DB에서 읽지 않고 이름을 바로 넣는다.
+    index = EmoticonSearchIndex()
+    index.loaded = True
+    index.add_all(['고양이', '고양이짤', '아기고양이', '고양', '강아지', 'Cat', 'cats'])
+    return index
+
+
+def test_ngrams():
+    assert ngrams('AbC') == {'a', 'b', 'c', 'ab', 'bc'}
+    assert query_ngrams('A') == {'a'}
+    assert query_ngrams('abc') == {'ab', 'bc'}
+    assert deletions('abc') == {'abc', 'bc', 'ac', 'ab'}
+
+
+def test_search_ranks_exact_then_prefix_then_short(index):
+    assert index.search('고양이') == ['고양이', '고양이짤', '아기고양이']
+    assert index.search('고양') == ['고양', '고양이', '고양이짤', '아기고양이']
+    assert index.search('고양', limit=2) == ['고양', '고양이']
+
+
+def test_search_is_case_insensitive(index):
+    assert index.search('CAT') == ['Cat', 'cats']
+
+
+def test_search_checks_order_of_grams(index):
+    # 'ab', 'ba' 조각이 모두 있어도 'aba'를 포함하지는 않는다.
+    index.add('abxba')
+    assert index.search('aba') == []
+    assert index.search('이고') == []
+    assert index.search('') == []
+    assert index.search('없는이름') == []
+
+
+def test_remove_keeps_name_while_duplicates_remain(index):
+    index.add('고양이')
+    index.remove('고양이')
+    assert '고양이' in index.search('고양이')
+
+    index.remove('고양이')
+    assert index.search('고양이') == ['고양이짤', '아기고양이']
+    assert index.suggest('고앙이') == []
+
+
+def test_changes_before_loading_only_bump_version():
+    index = EmoticonSearchIndex()
+    index.add('고양이')
+    index.remove('강아지')
+
+    assert index.version == 2
+    assert index.names == {}
+
+
+def test_suggest_finds_typos(index):
+    assert index.suggest('고앙이') == ['고양이']
+    assert index.suggest('강아ㅈ') == ['강아지']
+    assert index.suggest('') == []
+
+
+def test_suggest_limits_distance_for_short_queries(index):
+    # 세 글자 이하는 한 글자 오타까지만 추천한다.
+    assert index.suggest('cst') == ['Cat']
+    assert index.suggest('dgo') == []
+
+
+def test_suggest_ranks_by_distance_then_similarity(index):
+    assert index.suggest('고양이짤') == ['고양이짤', '고양이']
+    # 둘 다 한 글자 차이면 더 비슷한 쪽이 먼저 나온다.
+    assert index.suggest('고양이짜') == ['고양이', '고양이짤']
+    assert index.suggest('고양이짜', limit=1) == ['고양이']
@@ -0,0 +1,75 @@
+import unicodedata
+
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from blackangus.config import GoogleConfig
+from blackangus.models.geocode import GeocodeCacheModel
+from blackangus.utils.network import google_geocoding_client
+from blackangus.utils.network.google_geocoding_client import (
+    geocode,
+    geocode_cache,
+    normalize_address,
+)
+
+CONFIG = GoogleConfig(api_key='key')
+
+
+@pytest_asyncio.fixture
+async def requests(monkeypatch):
+    await init_beanie(
+        database=AsyncMongoMockClient()['blackangus'],
+        document_models=[GeocodeCacheModel],
+    )
+    geocode_cache.entries.clear()
+
+    sent = []
+
+    async def geocode_from_google(config, location):
+        sent.append(location)
+        return 37.5, 127.0
+
+    monkeypatch.setattr(
+        google_geocoding_client, 'geocode_from_google', geocode_from_google
+    )
+    yield sent
+    geocode_cache.entries.clear()
+
+
+@pytest.mark.parametrize(
+    'location',
+    ['강남역', ' 강남역 ', '강남역\t', unicodedata.normalize('NFD', '강남역')],
+)
+def test_normalize_address_ignores_spacing_and_composition(location):
+    assert normalize_address(location) == '강남역'
+
+
+def test_normalize_address_collapses_spaces_and_case():
+    assert normalize_address('  New   York ') == 'new york'
+
+
+@pytest.mark.asyncio
+async def test_same_address_is_looked_up_once(requests):
+    assert await geocode(CONFIG, 'New York') == (37.5, 127.0)
+    assert await geocode(CONFIG, ' new  york') == (37.5, 127.0)
+
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_saved_location_is_used_after_memory_is_cleared(requests):
+    await geocode(CONFIG, 'New York')
+    geocode_cache.entries.clear()
+
+    assert await geocode(CONFIG, 'NEW YORK') == (37.5, 127.0)
+    assert len(requests) == 1
+    assert await GeocodeCacheModel.get('new york') is not None
+
+
+@pytest.mark.asyncio
+async def test_address_is_sent_as_typed(requests):
+    await geocode(CONFIG, 'New York')
+
+    assert requests == ['New York']
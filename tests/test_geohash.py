@@ -0,0 +1,28 @@
+import pytest
+
+from blackangus.utils.geohash import decode_geohash, encode_geohash
+
+
+@pytest.mark.parametrize(
+    ('latitude', 'longitude', 'precision', 'expected'),
+    [
+        (57.64911, 10.40744, 11, 'u4pruydqqvj'),
+        (37.5665, 126.9780, 6, 'wydm9q'),
+        (0.0, 0.0, 1, 's'),
+        (-90.0, -180.0, 4, '0000'),
+    ],
+)
+def test_encode_geohash(latitude, longitude, precision, expected):
+    assert encode_geohash(latitude, longitude, precision) == expected
+
+
+def test_nearby_points_share_a_cell():
+    assert encode_geohash(37.5665, 126.9780, 5) == encode_geohash(37.5651, 126.9895, 5)
+
+
+def test_decode_returns_center_of_cell():
+    (latitude, longitude) = decode_geohash('u4pruydqqvj')
+
+    assert latitude == pytest.approx(57.64911, abs=1e-5)
+    assert longitude == pytest.approx(10.40744, abs=1e-5)
+    assert encode_geohash(latitude, longitude, 11) == 'u4pruydqqvj'
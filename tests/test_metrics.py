@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from blackangus.utils import metrics
+from blackangus.utils.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    escape_label,
+    format_labels,
+    start_metrics_server,
+)
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # 테스트에서 만든 지표가 전역 목록에 남지 않게 한다.
+    monkeypatch.setattr(metrics, 'REGISTRY', [])
+
+
+def test_escape_label():
+    assert escape_label('a"b\\c\nd') == 'a\\"b\\\\c\\nd'
+
+
+def test_format_labels():
+    assert format_labels((), ()) == ''
+    assert format_labels(('app', 'result'), ('Test', 'ok')) == (
+        '{app="Test",result="ok"}'
+    )
+
+
+def test_counter_and_gauge_render():
+    counter = Counter('test_total', '테스트 횟수', ['result'])
+    counter.inc(result='ok')
+    counter.inc(2, result='ok')
+    counter.inc(result='error')
+    gauge = Gauge('test_depth', '테스트 깊이')
+    gauge.set(3)
+    gauge.set(5)
+
+    assert counter.render() == [
+        '# HELP test_total 테스트 횟수',
+        '# TYPE test_total counter',
+        'test_total{result="ok"} 3',
+        'test_total{result="error"} 1',
+    ]
+    assert gauge.render()[-1] == 'test_depth 5'
+    assert metrics.REGISTRY == [counter, gauge]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', '테스트 시간', ['app'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, app='a')
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{app="a",le="0.1"} 2',
+        'test_seconds_bucket{app="a",le="1.0"} 3',
+        'test_seconds_bucket{app="a",le="+Inf"} 4',
+        'test_seconds_sum{app="a"} 2.65',
+        'test_seconds_count{app="a"} 4',
+    ]
+
+
+def test_histogram_time():
+    histogram = Histogram('test_seconds', '테스트 시간', buckets=(60.0,))
+    with histogram.time():
+        pass
+
+    assert histogram.render()[2] == 'test_seconds_bucket{le="60.0"} 1'
+
+
+async def request(port: int, path: str) -> bytes:
+    (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+@pytest.mark.asyncio
+async def test_metrics_server():
+    Counter('test_total', '테스트 횟수').inc()
+    server = await start_metrics_server('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        response = (await request(port, '/metrics')).decode('utf-8')
+        (head, body) = response.split('\r\n\r\n', 1)
+        assert head.startswith('HTTP/1.1 200 OK\r\n')
+        assert body == (
+            '# HELP test_total 테스트 횟수\n# TYPE test_total counter\ntest_total 1\n'
+        )
+
+        response = await request(port, '/unknown')
+        assert response.startswith(b'HTTP/1.1 404 Not Found\r\n')
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('seconds', ['abc', '-1', '0', 'nan', 'inf'])
+async def test_profile_rejects_invalid_seconds(seconds):
+    server = await start_metrics_server('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        response = await request(port, f'/debug/profile?seconds={seconds}')
+        assert response.startswith(b'HTTP/1.1 400 Bad Request\r\n')
+    finally:
+        server.close()
+        await server.wait_closed()
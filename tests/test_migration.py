@@ -0,0 +1,238 @@
+import hashlib
+import types
+
+import motor.motor_asyncio
+import pytest
+import pytest_asyncio
+from botocore.exceptions import ClientError
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from blackangus.migration.v1_to_v2 import V1V2Migrator
+from blackangus.models.emoticon.main import EmoticonModel
+from blackangus.models.migration import MigrationCheckpointModel
+
+V1_URL = 'mongodb://localhost/v1'
+V2_URL = 'mongodb://localhost'
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def put_object(self, Bucket, Body, Key, **kwargs):
+        self.uploads += 1
+        self.objects[Key] = (Body, kwargs.get('Metadata', {}))
+
+    def upload_fileobj(self, file, bucket, key, ExtraArgs=None):
+        self.put_object(bucket, file.read(), key, **(ExtraArgs or {}))
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        (body, metadata) = self.objects[Key]
+        return {'ETag': f'"{hashlib.md5(body).hexdigest()}"', 'Metadata': metadata}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setattr(
+        'blackangus.migration.v1_to_v2.boto3.client', lambda *args, **kwargs: s3
+    )
+    return s3
+
+
+@pytest_asyncio.fixture
+async def clients(monkeypatch):
+    clients = {V1_URL: AsyncMongoMockClient(V1_URL), V2_URL: AsyncMongoMockClient()}
+    # mongomock_motor는 get_default_database를 비동기로 감싸주지 않는다.
+    clients[V1_URL].get_default_database = lambda: clients[V1_URL]['v1']
+    monkeypatch.setattr(
+        motor.motor_asyncio, 'AsyncIOMotorClient', lambda url: clients[url]
+    )
+
+    # v1에는 라인 이모티콘 묶음 하나(이모티콘 두 개)와 이모티콘 세 개가 있다.
+    v1 = clients[V1_URL]['v1']
+    category = ObjectId()
+    await v1['lineconcategories'].insert_one(
+        {'_id': category, 'name': '라인', 'originId': 1, 'title': '라인 이모티콘'}
+    )
+    await v1['linecons'].insert_many(
+        [
+            {
+                'category': category,
+                'name': f'라인{i}',
+                'fullPath': f'/line/{i}.png',
+                'removed': False,
+            }
+            for i in range(2)
+        ]
+    )
+    await v1['emoticons'].insert_many(
+        [
+            {
+                'name': '고양이',
+                'path': '/web/cat.png',
+                'removed': False,
+                'equivalents': ['냥이'],
+            },
+            {'name': '강아지', 'path': '/web/dog.png', 'removed': False},
+            {'name': '삭제됨', 'path': '/web/removed.png', 'removed': True},
+            {'name': '오리', 'path': '/web/duck.png', 'removed': False},
+        ]
+    )
+    return clients
+
+
+@pytest.fixture
+def images(tmp_path):
+    for (path, content) in [
+        ('line/0.png', b'line-0'),
+        ('line/1.png', b'line-1'),
+        ('web/cat.png', b'cat'),
+        ('web/dog.png', b'dog'),
+        ('web/duck.png', b'duck'),
+    ]:
+        file = tmp_path / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(content)
+    return tmp_path
+
+
+@pytest.fixture
+def migrator(monkeypatch, s3, clients, images):
+    config = types.SimpleNamespace(
+        mongodb=types.SimpleNamespace(url=V2_URL, database_name='v2'),
+        emoticon=types.SimpleNamespace(
+            s3_bucket='bucket',
+            s3_region='ap-northeast-2',
+            s3_access_key='access',
+            s3_secret_key='secret',
+        ),
+    )
+    monkeypatch.setattr('blackangus.migration.v1_to_v2.load', lambda path: config)
+
+    def create(**kwargs):
+        return V1V2Migrator('config.toml', str(images), V1_URL, batch_size=2, **kwargs)
+
+    return create
+
+
+async def migrated_names():
+    emoticons = await EmoticonModel.find({'migrated_from_v1': True}).to_list()
+    return sorted(emoticon.name for emoticon in emoticons)
+
+
+@pytest.mark.asyncio
+async def test_migrate(migrator, s3):
+    report = await migrator().migrate()
+
+    assert report.migrated == {'linecons': 2, 'emoticons': 3}
+    assert report.failed == {}
+    assert await migrated_names() == ['강아지', '고양이', '냥이', '라인0', '라인1', '오리']
+    assert len(s3.objects) == 5
+
+
+@pytest.mark.asyncio
+async def test_migrate_again_changes_nothing(migrator, s3):
+    await migrator().migrate()
+    report = await migrator().migrate()
+
+    # 체크포인트 뒤부터 이어서 하므로 더 옮길 게 없다.
+    assert report.migrated == {}
+    assert await migrated_names() == ['강아지', '고양이', '냥이', '라인0', '라인1', '오리']
+    assert s3.uploads == 5
+
+
+@pytest.mark.asyncio
+async def test_migrate_without_checkpoints_skips_migrated(migrator, s3):
+    await migrator().migrate()
+    await MigrationCheckpointModel.find_all().delete()
+
+    report = await migrator().migrate()
+
+    # 같은 v1 문서는 같은 ID로 옮기므로 다시 넣지 않는다.
+    assert report.failed == {}
+    assert report.skipped.get('emoticons') == 4
+    assert await migrated_names() == ['강아지', '고양이', '냥이', '라인0', '라인1', '오리']
+    assert s3.uploads == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_item_freezes_checkpoint(migrator, images):
+    (images / 'web/dog.png').unlink()
+
+    report = await migrator().migrate()
+    assert report.failed == {'emoticons': 1}
+    assert '강아지' not in await migrated_names()
+    checkpoint = await MigrationCheckpointModel.get('v1_to_v2:emoticons')
+    assert checkpoint is None
+
+    # 파일을 채우고 다시 하면 실패한 것만 새로 옮긴다.
+    (images / 'web/dog.png').write_bytes(b'dog')
+    report = await migrator().migrate()
+    assert report.failed == {}
+    assert await migrated_names() == ['강아지', '고양이', '냥이', '라인0', '라인1', '오리']
+
+
+@pytest.mark.asyncio
+async def test_dry_run_writes_nothing(migrator, s3):
+    report = await migrator(dry_run=True).migrate()
+
+    assert report.migrated == {'linecons': 2, 'emoticons': 3}
+    assert await migrated_names() == []
+    assert await MigrationCheckpointModel.find_all().to_list() == []
+    assert s3.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_verify(migrator, s3):
+    await migrator().migrate()
+
+    report = await migrator().verify()
+    assert report.failed == {}
+    assert report.migrated == {'linecons': 2, 'emoticons': 3}
+
+    # S3의 파일이 원본과 다르면 실패로 남긴다.
+    key = next(key for key in s3.objects if key.endswith('.png'))
+    s3.objects[key] = (b'broken', {})
+    report = await migrator().verify()
+    assert sum(report.failed.values()) >= 1
+
+
+@pytest.mark.asyncio
+async def test_verify_fails_on_count_mismatch(migrator):
+    await migrator().migrate()
+    # 파일은 그대로 두고 같은 이미지를 쓰는 이름만 하나 지운다.
+    await EmoticonModel.find({'name': '냥이'}).delete()
+
+    report = await migrator().verify()
+
+    assert report.failed == {'emoticons_count': 1}
+    assert report.migrated == {'linecons': 2, 'emoticons': 3}
+
+
+@pytest.mark.asyncio
+async def test_same_file_is_uploaded_once(migrator, images, s3):
+    (images / 'web/duck.png').write_bytes(b'cat')
+
+    report = await migrator().migrate()
+
+    assert report.skipped == {'files': 1}
+    assert len(s3.objects) == 4
+    cat = await EmoticonModel.find_one({'name': '고양이'})
+    duck = await EmoticonModel.find_one({'name': '오리'})
+    assert cat is not None and duck is not None
+    assert cat.image_path == duck.image_path
+
+
+@pytest.mark.asyncio
+async def test_dry_run_and_verify_create_no_indexes(migrator, clients):
+    await migrator(dry_run=True).migrate()
+    await migrator().verify()
+
+    database = clients[V2_URL]['v2']
+    for name in await database.list_collection_names():
+        assert list(await database[name].index_information()) in ([], ['_id_'])
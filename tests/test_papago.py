@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from blackangus.services.papago import split_text
+
+
+def join(chunks):
+    return ''.join(chunk + separator for (chunk, separator) in chunks)
+
+
+@pytest.mark.parametrize(
+    ('text', 'limit'),
+    [
+        ('aaaa\nbbbb\n\ncccc', 9),
+        ('aaaa\n\n\nbbbb', 4),
+        ('\n\naaaa\n\n', 4),
+        ('첫 문장입니다. 두 번째 문장입니다! 세 번째?', 8),
+        ('', 5),
+    ],
+)
+def test_split_text_keeps_text(text, limit):
+    chunks = split_text(text, limit)
+
+    assert join(chunks) == text
+    assert all(len(chunk) <= limit for (chunk, _) in chunks)
+
+
+def test_split_text_random_round_trip():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('ab. !\n') for _ in range(rng.randint(0, 40)))
+        limit = rng.randint(1, 10)
+        chunks = split_text(text, limit)
+
+        assert join(chunks) == text, (text, limit)
+        assert all(len(chunk) <= limit for (chunk, _) in chunks)
+
+
+def test_split_text_packs_short_lines():
+    assert split_text('aa\nbb\ncc', 5) == [('aa\nbb', '\n'), ('cc', '')]
@@ -0,0 +1,108 @@
+import types
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from blackangus.utils.retry import (
+    RetryableError,
+    backoff_delay,
+    parse_retry_after,
+    retry,
+)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    # 실제로 기다리지 않고 기다린 시간만 기록한다.
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(
+        'blackangus.utils.retry.asyncio', types.SimpleNamespace(sleep=sleep)
+    )
+    return delays
+
+
+def failing(*errors):
+    """errors를 차례대로 낸 다음 'ok'를 돌려주는 작업."""
+    calls = []
+
+    async def operation():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return 'ok'
+
+    return (operation, calls)
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(' 3 ') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+
+def test_parse_retry_after_http_date():
+    moment = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(moment, usegmt=True)) == pytest.approx(
+        30, abs=2
+    )
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base_delay=0.5, max_delay=5.0)
+        assert 0 <= delay <= min(5.0, 0.5 * 2**attempt)
+
+
+@pytest.mark.asyncio
+async def test_retry_until_success(delays):
+    (operation, calls) = failing(RetryableError('503'), RetryableError('503'))
+
+    assert await retry(operation, retry_on=(RetryableError,)) == 'ok'
+    assert len(calls) == 3
+    assert len(delays) == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_after_attempts(delays):
+    (operation, calls) = failing(*[RetryableError('503')] * 3)
+
+    with pytest.raises(RetryableError):
+        await retry(operation, retry_on=(RetryableError,), attempts=3)
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_does_not_catch_other_errors(delays):
+    (operation, calls) = failing(ValueError('bad request'))
+
+    with pytest.raises(ValueError):
+        await retry(operation, retry_on=(RetryableError,))
+    assert len(calls) == 1
+    assert delays == []
+
+
+@pytest.mark.asyncio
+async def test_retry_waits_for_retry_after(delays):
+    (operation, _) = failing(RetryableError('429', retry_after=7))
+
+    assert await retry(operation, retry_on=(RetryableError,)) == 'ok'
+    assert delays == [7]
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_when_retry_after_is_too_long(delays):
+    (operation, calls) = failing(RetryableError('429', retry_after=600))
+
+    with pytest.raises(RetryableError):
+        await retry(operation, retry_on=(RetryableError,), max_retry_after=30)
+    assert len(calls) == 1
+    assert delays == []
@@ -0,0 +1,141 @@
+import logging
+from datetime import timedelta
+
+import orjson
+import pytest
+from pymongo import monitoring
+
+from blackangus.utils import tracing
+from blackangus.utils.metrics import MongoMetricsListener
+from blackangus.utils.tracing import (
+    TRACER,
+    JsonFileExporter,
+    Span,
+    record_finished_span,
+    span,
+)
+
+
+class FakeExporter:
+    def __init__(self):
+        self.traces = []
+
+    def submit(self, spans):
+        self.traces.append(list(spans))
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = FakeExporter()
+    monkeypatch.setattr(TRACER, 'enabled', True)
+    monkeypatch.setattr(TRACER, 'sample_rate', 1.0)
+    monkeypatch.setattr(TRACER, 'slow_threshold', None)
+    monkeypatch.setattr(TRACER, 'exporter', exporter)
+    return exporter
+
+
+def test_span_does_nothing_when_disabled(monkeypatch):
+    monkeypatch.setattr(TRACER, 'enabled', False)
+
+    with span('root') as root:
+        assert root is None
+        assert tracing.current_span.get() is None
+
+
+def test_nested_spans_share_a_trace(exporter):
+    with span('root', app='test') as root:
+        with span('child') as child:
+            record_finished_span('mongodb.find', 1500, service='mongodb')
+
+    assert root is not None and child is not None
+    assert child.trace_id == root.trace_id
+    assert child.parent_id == root.span_id
+    assert root.attributes == {'app': 'test', 'sampled': True}
+
+    # 루트 스팬이 끝날 때 트레이스 하나로 한 번만 내보낸다.
+    assert len(exporter.traces) == 1
+    names = [finished.name for finished in exporter.traces[0]]
+    assert names == ['mongodb.find', 'child', 'root']
+    assert exporter.traces[0][0].parent_id == child.span_id
+    assert exporter.traces[0][0].duration == 1500
+    assert tracing.current_span.get() is None
+
+
+def test_span_records_error(exporter):
+    with pytest.raises(ValueError):
+        with span('root'):
+            raise ValueError('bad input')
+
+    assert exporter.traces[0][0].error == 'ValueError: bad input'
+
+
+def test_unsampled_trace_is_not_recorded(exporter, monkeypatch):
+    monkeypatch.setattr(TRACER, 'sample_rate', 0.0)
+
+    with span('root') as root:
+        with span('child') as child:
+            record_finished_span('mongodb.find', 1500)
+
+    assert root is None and child is None
+    assert exporter.traces == []
+
+
+def test_slow_unsampled_trace_is_exported(exporter, monkeypatch, caplog):
+    monkeypatch.setattr(TRACER, 'sample_rate', 0.0)
+    monkeypatch.setattr(TRACER, 'slow_threshold', 0.0)
+
+    with caplog.at_level(logging.WARNING, logger='blackangus:tracing'):
+        with span('root'):
+            with span('child'):
+                pass
+
+    assert [finished.name for finished in exporter.traces[0]] == ['child', 'root']
+    assert '느린 요청' in caplog.text
+    assert '  child:' in caplog.text
+
+
+def test_to_zipkin():
+    value = Span(
+        trace_id='a' * 32,
+        span_id='b' * 16,
+        parent_id='c' * 16,
+        name='child',
+        timestamp=10,
+        attributes={'app': 'test', 'guild_id': None, 'count': 3},
+        error='ValueError: bad input',
+    ).to_zipkin()
+
+    assert value['parentId'] == 'c' * 16
+    # 0마이크로초 스팬은 Zipkin이 받지 않는다.
+    assert value['duration'] == 1
+    assert value['tags'] == {
+        'app': 'test',
+        'count': '3',
+        'error': 'ValueError: bad input',
+    }
+
+
+def test_json_file_exporter_appends_a_line_per_trace(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    exporter = JsonFileExporter(str(path))
+    spans = [Span(trace_id='a', span_id='b', parent_id=None, name='root', timestamp=1)]
+
+    exporter.export(spans)
+    exporter.export(spans)
+
+    lines = path.read_bytes().splitlines()
+    assert len(lines) == 2
+    assert orjson.loads(lines[0])[0]['name'] == 'root'
+
+
+def test_mongo_listener_records_command_span(exporter):
+    event = monitoring.CommandSucceededEvent(
+        timedelta(microseconds=1500), {'ok': 1}, 'find', 1, ('localhost', 27017), 1
+    )
+    with span('root'):
+        MongoMetricsListener().succeeded(event)
+
+    [command, _] = exporter.traces[0]
+    assert command.name == 'mongodb.find'
+    assert command.duration == 1500
+    assert command.attributes == {'service': 'mongodb', 'operation': 'find'}
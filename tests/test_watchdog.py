@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+from blackangus.config import WatchdogConfig
+from blackangus.utils.metrics import start_metrics_server
+from blackangus.utils.watchdog import LoopWatchdog, collapse_stack, profile_event_loop
+
+
+def blocking_call(seconds: float):
+    # 이벤트 루프를 막는 코드, 스택에 이 함수 이름이 남아야 한다.
+    time.sleep(seconds)
+
+
+def test_collapse_stack_is_outermost_first():
+    def inner():
+        return collapse_stack(sys._getframe())
+
+    names = [name.split(' ')[0] for name in inner().split(';')]
+    assert names[-2:] == ['test_collapse_stack_is_outermost_first', 'inner']
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_stall_once():
+    watchdog = LoopWatchdog(WatchdogConfig(interval=0.01, threshold=0.05))
+    heartbeat = watchdog.start()
+
+    try:
+        await asyncio.sleep(0.05)
+        assert len(watchdog.stalls) == 0
+
+        blocking_call(0.3)
+        await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+        heartbeat.cancel()
+
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert stall.seconds >= 0.05
+    assert 'blocking_call' in ''.join(stall.stack)
+    assert 'test_watchdog_reports_stall_once' in (stall.task or '')
+
+
+@pytest.mark.asyncio
+async def test_profile_event_loop_samples_blocking_code():
+    async def block():
+        await asyncio.sleep(0.01)
+        blocking_call(0.1)
+
+    task = asyncio.create_task(block())
+    result = await profile_event_loop(0.2, interval=0.005)
+    await task
+
+    lines = result.splitlines()
+    assert len(lines) > 0
+    # 'a;b;c 횟수' 형식
+    (stack, count) = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert any('blocking_call' in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint():
+    server = await start_metrics_server('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /debug/profile?seconds=0.05 HTTP/1.1\r\n\r\n')
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert response.startswith(b'HTTP/1.1 200 OK\r\n')